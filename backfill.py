@@ -0,0 +1,142 @@
+import glob
+import gzip
+import logging
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from typing import List, Optional, Tuple
+
+from config import DATABASE_PATH
+from database import Database
+from hltv_scraper import HLTVScraper
+import page_store
+
+logger = logging.getLogger(__name__)
+
+# Scraper of a pool process, only used for parsing
+_scraper = None
+
+
+def _init_worker():
+    global _scraper
+    logging.basicConfig(format='%(asctime)s - %(name)s - %(levelname)s - %(message)s', level=logging.WARNING)
+    _scraper = HLTVScraper()
+
+
+def parse_page(path: str) -> Tuple[str, Optional[List[dict]]]:
+    """Parse one /results page file (.html or .html.gz) in a pool process
+
+    Returns:
+        (path, results as dicts for Database.archive_results), results are None on errors
+    """
+    try:
+        opener = gzip.open if path.endswith('.gz') else open
+        with opener(path, 'rb') as f:
+            html = f.read().decode('utf-8', errors='replace')
+        return path, [result.to_dict() for result in _scraper._parse_results_page(html)]
+    except Exception as e:
+        logger.error(f"Error parsing {path}: {e}")
+        return path, None
+
+
+def stored_pages(db) -> List[str]:
+    """Files of all distinct /results pages in the page store"""
+    store = page_store.from_config(db)
+    if store is None:
+        return []
+    files = dict.fromkeys(store.path(fetch['sha256']) for fetch in store.fetches('results'))
+    return [path for path in files if os.path.exists(path)]
+
+
+def recorded_pages(directory: str) -> List[str]:
+    """Recorded /results page files in a directory"""
+    return sorted(glob.glob(os.path.join(directory, '*.html')) + glob.glob(os.path.join(directory, '*.html.gz')))
+
+
+def backfill(db: Database, paths: List[str], workers: int, batch_size: int) -> dict:
+    """Parse pages across a process pool and archive their results in bulk transactions
+
+    Only this process writes to the database; results (and team form) are
+    archived idempotently, so a backfill can be interrupted and re-run.
+    """
+    stats = {'pages': 0, 'failed': 0, 'empty': 0, 'results': 0, 'batches': 0, 'unwritten': 0}
+    start = time.perf_counter()
+    pending = []
+
+    def flush():
+        if not pending:
+            return
+        if db.archive_results(pending):
+            stats['results'] += len(pending)
+            stats['batches'] += 1
+        else:
+            stats['unwritten'] += len(pending)
+        pending.clear()
+
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker) as pool:
+        # Small chunks keep all processes busy while results stream back in order
+        for path, results in pool.map(parse_page, paths, chunksize=4):
+            stats['pages'] += 1
+            if results is None:
+                stats['failed'] += 1
+            elif not results:
+                stats['empty'] += 1
+                logger.warning(f"No results on {path}")
+            else:
+                pending.extend(results)
+                if len(pending) >= batch_size:
+                    flush()
+
+            if stats['pages'] % 100 == 0:
+                elapsed = time.perf_counter() - start
+                logger.info(f"{stats['pages']}/{len(paths)} pages ({stats['pages'] / elapsed:.1f} pages/s)")
+        flush()
+
+    stats['seconds'] = time.perf_counter() - start
+    return stats
+
+
+def main():
+    """Rebuild the results archive from stored or recorded /results pages, without HLTV requests
+
+    python backfill.py --store                 # /results pages kept by the page store
+    python backfill.py --dir recorded/         # recorded *.html / *.html.gz files
+    """
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Backfill the results archive from /results pages")
+    parser.add_argument('--store', action='store_true', help='parse the /results pages of the page store')
+    parser.add_argument('--dir', help='parse recorded *.html / *.html.gz files in this directory')
+    parser.add_argument('--database', default=DATABASE_PATH, help='database to write to (default: DATABASE_PATH)')
+    parser.add_argument('--workers', type=int, default=os.cpu_count(), help='parser processes')
+    parser.add_argument('--batch', type=int, default=2000, help='results per transaction')
+    parser.add_argument('--limit', type=int, help='at most N pages')
+    args = parser.parse_args()
+
+    logging.basicConfig(format='%(asctime)s - %(name)s - %(levelname)s - %(message)s', level=logging.INFO)
+    if not args.store and not args.dir:
+        parser.error("use --store and/or --dir")
+
+    db = Database(args.database)
+    # The page store is indexed in the bot's database, whichever database is written
+    paths = (stored_pages(Database(DATABASE_PATH)) if args.store else []) + (recorded_pages(args.dir) if args.dir else [])
+    paths = paths[:args.limit] if args.limit else paths
+    if not paths:
+        print("No pages found")
+        return
+
+    print(f"Parsing {len(paths)} pages with {args.workers} processes...")
+    stats = backfill(db, paths, args.workers, args.batch)
+    seconds = stats['seconds']
+    print(
+        f"{stats['pages']} pages in {seconds:.1f}s ({stats['pages'] / seconds:.1f} pages/s), "
+        f"{stats['results']} results archived in {stats['batches']} transactions "
+        f"({stats['results'] / seconds:.0f} results/s)"
+    )
+    if stats['failed'] or stats['empty'] or stats['unwritten']:
+        print(f"{stats['failed']} pages failed, {stats['empty']} without results, "
+              f"{stats['unwritten']} results not written")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,89 @@
+"""Import-time budget check
+
+Imports each module in a fresh interpreter with `python -X importtime` and
+fails (exit code 1) if the median cumulative import time exceeds its budget,
+or if an import pulls in the scraping/parsing stack, which must only be
+loaded on first use.
+
+Usage:
+    python benchmarks/import_time.py [--runs 5] [--scale 1.0]
+"""
+import argparse
+import os
+import re
+import statistics
+import subprocess
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Budget per module in milliseconds (cumulative, including dependencies)
+BUDGETS_MS = {
+    'config': 30,
+    'database': 30,
+    'hltv_scraper': 50,
+    'snapshots': 50,
+    'scraper_worker': 200,
+    'bot': 600,
+}
+
+# Must not be imported just by importing one of the modules above
+LAZY_MODULES = ('cloudscraper', 'requests', 'bs4', 'lxml')
+
+_LINE = re.compile(r'import time:\s+\d+ \|\s+(\d+) \|\s?(\S.*)$')
+
+
+def measure(module: str):
+    """Import module in a fresh interpreter
+
+    Returns:
+        (cumulative import time in ms, eagerly imported lazy modules)
+    """
+    code = (f"import sys, {module}; "
+            f"print(','.join(m for m in {LAZY_MODULES!r} if m in sys.modules))")
+    env = dict(os.environ, DATABASE_PATH=os.devnull)
+    proc = subprocess.run([sys.executable, '-X', 'importtime', '-c', code],
+                          cwd=ROOT, env=env, capture_output=True, text=True, check=True)
+
+    cumulative_us = None
+    for line in proc.stderr.splitlines():
+        match = _LINE.match(line)
+        if match and match.group(2) == module:  # top level entries are not indented
+            cumulative_us = int(match.group(1))
+    if cumulative_us is None:
+        raise RuntimeError(f"No import time reported for {module}")
+
+    eager = [m for m in proc.stdout.strip().split(',') if m]
+    return cumulative_us / 1000, eager
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--runs', type=int, default=5, help='imports per module (median is used)')
+    parser.add_argument('--scale', type=float, default=1.0, help='multiply all budgets, e.g. on slow CI machines')
+    args = parser.parse_args()
+
+    failed = False
+    for module, budget in BUDGETS_MS.items():
+        timings = []
+        eager = []
+        for _ in range(args.runs):
+            ms, eager = measure(module)
+            timings.append(ms)
+        median = statistics.median(timings)
+        limit = budget * args.scale
+
+        status = 'ok'
+        if median > limit:
+            status = 'OVER BUDGET'
+            failed = True
+        if eager:
+            status = f"EAGER IMPORT: {', '.join(eager)}"
+            failed = True
+        print(f"{module:<16} {median:8.1f} ms  (budget {limit:6.0f} ms)  {status}")
+
+    return 1 if failed else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,473 @@
+"""Memory soak test: days of scheduled jobs and commands in accelerated time
+
+Runs a complete embedded-mode TelegramBot against a simulated HLTV (or
+recorded pages) on a simulated clock: results ingestion, match/schedule/team
+refreshes, daily summaries, pre-match alerts, outbox delivery and a steady
+stream of user commands including page buttons. Nothing talks to HLTV or
+Telegram; a simulated day takes a few minutes, mostly parsing.
+
+After a warmup of one simulated day (every daily job has run once, caches,
+snapshots and the archive are filled), traced memory is sampled every
+simulated hour and tracemalloc snapshots are compared by allocation site.
+Live Match objects, soup tags and the scraper's caches are counted
+alongside. Fails (exit code 1) if retained memory grows by more than
+`--max-growth-kb` per simulated day (least-squares slope over the hourly
+samples) or if soup tags are still alive at the end.
+
+The simulated HLTV has one match every 20 minutes, so new matches, match
+pages and results keep coming like on the real site.
+
+Usage:
+    python benchmarks/memory_soak.py [--days 2] [--users 40] [--max-growth-kb 64]
+    python benchmarks/memory_soak.py --recorded recorded/  # matches*, results*, rankings*, match_page* .html(.gz)
+"""
+import argparse
+import asyncio
+import gc
+import glob
+import gzip
+import linecache
+import os
+import random
+import re
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime
+from types import SimpleNamespace
+from urllib.parse import parse_qs, urlparse
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from parse_memory import match_html, page_html, ranked_team_html, result_html, results_body  # noqa: E402
+
+TEAMS = ['Vitality', 'Natus Vincere', 'FaZe', 'G2', 'Spirit', 'MOUZ', 'Astralis', 'Heroic', 'Liquid', 'FURIA',
+         'Complexity', 'Eternal Fire', 'The MongolZ', 'Virtus.pro', 'Falcons', 'BIG', 'ENCE', 'Cloud9',
+         'paiN', 'MIBR', 'SAW', '3DMAX', 'Monte', 'GamerLegion']
+MATCH_INTERVAL = 20 * 60  # One match starts every 20 minutes
+MATCH_DURATION = 2 * 3600
+FIRST_MATCH_ID = 2400000
+CHROME = 40  # Sidebar entries per page - small pages keep the simulation fast
+
+
+class SimClock:
+    """Simulated wall clock, advanced by the soak loop"""
+
+    def __init__(self, now: float):
+        self.now = now
+
+
+class SimTime:
+    """Stand-in for the `time` module of the bot's modules: time() and monotonic() follow the clock"""
+
+    def __init__(self, clock: SimClock):
+        self._clock = clock
+
+    def time(self):
+        return self._clock.now
+
+    def monotonic(self):
+        return self._clock.now
+
+    def __getattr__(self, name):
+        return getattr(time, name)
+
+
+def sim_datetime(clock: SimClock):
+    """datetime class whose now() follows the clock"""
+    class SimDatetime(datetime):
+        @classmethod
+        def now(cls, tz=None):
+            return datetime.fromtimestamp(clock.now, tz)
+    return SimDatetime
+
+
+class World:
+    """Simulated HLTV: matches, match pages, results and rankings derived from the clock"""
+
+    def __init__(self, clock: SimClock, recorded: dict):
+        self.clock = clock
+        self.recorded = recorded  # endpoint -> recorded page files, replayed in turn
+        self._replayed = {}
+        # Three days of results before the simulation starts
+        self.epoch = int(clock.now // 3600 * 3600 - 3 * 86400)
+        self.requests = 0
+
+    def match(self, k: int) -> dict:
+        team1 = TEAMS[k % len(TEAMS)]
+        team2 = TEAMS[(k * 7 + 3) % len(TEAMS)]
+        if team2 == team1:
+            team2 = TEAMS[(k + 1) % len(TEAMS)]
+        return {'id': FIRST_MATCH_ID + k, 'team1': team1, 'team2': team2, 'event': f"Event {k // 60}",
+                'kickoff': self.epoch + k * MATCH_INTERVAL, 'stars': (k * 5) % 4}
+
+    def _index(self, t: float) -> int:
+        return int((t - self.epoch) // MATCH_INTERVAL)
+
+    def matches_page(self, day=None) -> str:
+        now = self.clock.now
+        if day is None:
+            first, last = self._index(now - MATCH_DURATION) + 1, self._index(now + 2 * 86400)
+        else:
+            start = datetime.combine(day, datetime.min.time()).timestamp()
+            first, last = self._index(start - 1) + 1, self._index(start + 86400 - 1)
+        matches = [self.match(k) for k in range(max(first, 0), last + 1)]
+        return page_html('<div class="matches-list">' + ''.join(
+            match_html(m['id'], m['team1'], m['team2'], m['event'], m['stars'], live=m['kickoff'] <= now)
+            for m in matches) + '</div>', CHROME)
+
+    def match_page(self, match_id: int) -> str:
+        kickoff = self.match(match_id - FIRST_MATCH_ID)['kickoff']
+        return page_html(f'<div class="timeAndEvent"><div class="time" data-unix="{kickoff * 1000}">19:00</div></div>', 5)
+
+    def results_page(self, offset: int) -> str:
+        newest = self._index(self.clock.now - MATCH_DURATION)
+        results = []
+        for k in range(newest - offset, max(newest - offset - 100, -1), -1):
+            m = self.match(k)
+            results.append(result_html(m['id'], m['team1'], m['team2'], m['event'], m['kickoff'] * 1000,
+                                       m['stars'], (2, k % 2)))
+        return page_html(results_body(results), CHROME)
+
+    def rankings_page(self) -> str:
+        return page_html(''.join(ranked_team_html(rank + 1, team) for rank, team in enumerate(TEAMS)), CHROME)
+
+    def page(self, url: str) -> bytes:
+        self.requests += 1
+        parsed = urlparse(url)
+        query = parse_qs(parsed.query)
+        if parsed.path.startswith('/ranking'):
+            endpoint = 'rankings'
+        elif parsed.path.startswith('/results'):
+            endpoint = 'results'
+        elif re.match(r'/matches/\d+', parsed.path):
+            endpoint = 'match_page'
+        else:
+            endpoint = 'matches'
+
+        files = self.recorded.get(endpoint)
+        if files:
+            turn = self._replayed.get(endpoint, 0)
+            self._replayed[endpoint] = turn + 1
+            path = files[turn % len(files)]
+            opener = gzip.open if path.endswith('.gz') else open
+            with opener(path, 'rb') as f:
+                return f.read()
+
+        if endpoint == 'rankings':
+            html = self.rankings_page()
+        elif endpoint == 'results':
+            html = self.results_page(int(query.get('offset', ['0'])[0]))
+        elif endpoint == 'match_page':
+            html = self.match_page(int(parsed.path.split('/')[2]))
+        elif 'selectedDate' in query:
+            html = self.matches_page(datetime.strptime(query['selectedDate'][0], '%Y-%m-%d').date())
+        else:
+            html = self.matches_page()
+        return html.encode('utf-8')
+
+
+class FakeResponse:
+    status_code = 200
+    ok = True
+    encoding = 'utf-8'
+
+    def __init__(self, content: bytes):
+        self.content = content
+
+    @property
+    def text(self):
+        return self.content.decode('utf-8')
+
+    def raise_for_status(self):
+        pass
+
+    def iter_content(self, chunk_size):
+        for i in range(0, len(self.content), chunk_size):
+            yield self.content[i:i + chunk_size]
+
+    def close(self):
+        pass
+
+
+class FakeSession:
+    """HTTP session serving the simulated HLTV"""
+
+    def __init__(self, world: World):
+        self.world = world
+
+    def get(self, url, timeout=None, stream=False):
+        return FakeResponse(self.world.page(url))
+
+
+class Chat:
+    """Fake Telegram updates for command handlers; remembers the last page buttons"""
+
+    def __init__(self):
+        self.markup = None
+        self.replies = 0
+
+    def message(self):
+        chat = self
+
+        class Message:
+            async def reply_text(self, text, reply_markup=None, **kwargs):
+                chat.replies += 1
+                chat.keep(reply_markup)
+                return Message()
+
+            async def edit_text(self, text, reply_markup=None, **kwargs):
+                chat.keep(reply_markup)
+        return Message()
+
+    def keep(self, markup):
+        if markup is not None:
+            self.markup = markup
+
+    def update(self, user_id: int, callback_data=None):
+        query = None
+        if callback_data is not None:
+            async def answer(*args, **kwargs):
+                pass
+
+            async def edit_message_text(text, reply_markup=None, **kwargs):
+                self.keep(reply_markup)
+            query = SimpleNamespace(data=callback_data, answer=answer, edit_message_text=edit_message_text)
+        return SimpleNamespace(effective_user=SimpleNamespace(id=user_id), effective_chat=SimpleNamespace(id=user_id),
+                               message=self.message(), callback_query=query)
+
+
+def install_clock(clock: SimClock, modules):
+    """Point the modules' `time` and `datetime` at the simulated clock"""
+    sim_time = SimTime(clock)
+    sim_dt = sim_datetime(clock)
+    for module in modules:
+        if getattr(module, 'time', None) is time:
+            module.time = sim_time
+        if getattr(module, 'datetime', None) is datetime:
+            module.datetime = sim_dt
+
+
+def live_objects() -> dict:
+    """Live Match objects and soup tags (the latter should be gone after every parse)"""
+    from hltv_scraper import Match
+    from bs4.element import Tag
+
+    gc.collect()
+    counts = {'matches': 0, 'tags': 0}
+    for obj in gc.get_objects():
+        if isinstance(obj, Match):
+            counts['matches'] += 1
+        elif isinstance(obj, Tag):
+            counts['tags'] += 1
+    return counts
+
+
+def top_sites(snapshot, baseline, limit: int) -> str:
+    """Allocation sites with the largest retained growth"""
+    ignore = (tracemalloc.Filter(False, tracemalloc.__file__), tracemalloc.Filter(False, '<frozen importlib._bootstrap*'),
+              tracemalloc.Filter(False, linecache.__file__))
+    stats = snapshot.filter_traces(ignore).compare_to(baseline.filter_traces(ignore), 'lineno')
+    lines = []
+    for stat in stats[:limit]:
+        if stat.size_diff <= 0:
+            break
+        frame = stat.traceback[0]
+        source = linecache.getline(frame.filename, frame.lineno).strip()
+        location = f"{os.path.relpath(frame.filename, ROOT) if frame.filename.startswith(ROOT) else frame.filename}:{frame.lineno}"
+        lines.append(f"  {stat.size_diff / 1024:+9.1f} KB {stat.count_diff:+7d} blocks  {location}\n      {source}")
+    return '\n'.join(lines) or '  (no growth)'
+
+
+def slope(rows) -> float:
+    """Least-squares growth in bytes per second of (time, bytes) samples"""
+    n = len(rows)
+    mean_t = sum(t for t, _ in rows) / n
+    mean_b = sum(b for _, b in rows) / n
+    var = sum((t - mean_t) ** 2 for t, _ in rows)
+    return sum((t - mean_t) * (b - mean_b) for t, b in rows) / var if var else 0.0
+
+
+async def soak(args) -> int:
+    import bot as bot_module
+    import database
+    import hltv_scraper
+    import page_store
+    import paging
+    import scraper_worker
+    import snapshots
+    from config import DAILY_SUMMARY_TIME, SCHEDULE_CHECK_MINUTES
+
+    # Traced from the start: objects replaced after the warmup must count as freed
+    tracemalloc.start(args.frames)
+    clock = SimClock(time.time())
+    install_clock(clock, (bot_module, database, hltv_scraper, page_store, paging, scraper_worker, snapshots))
+    bot_module.TODAY_EDIT_INTERVAL = 0  # Progressive /today edits must not wait in real time
+
+    recorded = {}
+    if args.recorded:
+        for endpoint in ('matches', 'results', 'rankings', 'match_page'):
+            files = sorted(glob.glob(os.path.join(args.recorded, f"{endpoint}*.html*")))
+            if files:
+                recorded[endpoint] = files
+    world = World(clock, recorded)
+
+    bot = bot_module.TelegramBot()
+    bot.scraper._session = FakeSession(world)
+    bot.scraper._request_delay = 0
+    bot.scheduler.start(paused=True)  # Jobs are run by the soak loop on the simulated clock
+    db, scraper, worker = bot.db, bot.scraper, bot.worker
+
+    rng = random.Random(args.seed)
+    users = list(range(1000, 1000 + args.users))
+    for user_id in users:
+        for team in rng.sample(TEAMS, rng.randint(1, 3)):
+            db.add_favorite(user_id, team)
+        db.set_min_stars(user_id, rng.randint(0, 2))
+        db.set_alert_lead(user_id, rng.choice((0, 15, 30)))
+    chat = Chat()
+
+    async def deliver():
+        # Stands in for deliver_outbox, which would send to Telegram
+        for message in db.claim_outbox_messages(100, 60):
+            db.mark_outbox_sent(message['id'])
+
+    async def prematch_alerts():
+        now = datetime.fromtimestamp(clock.now).astimezone()
+        for job in bot.scheduler.get_jobs():
+            if job.id.startswith('prematch:') and job.next_run_time <= now:
+                job.remove()
+                await bot.send_prematch_alert(*job.args)
+
+    async def command():
+        user_id = rng.choice(users)
+        name = rng.choice(('today', 'alltoday', 'favgames', 'week', 'favweek', 'history', 'form', 'page'))
+        if name == 'page':
+            if chat.markup is None:
+                return
+            button = rng.choice([b for row in chat.markup.inline_keyboard for b in row])
+            await bot.button_callback(chat.update(user_id, button.callback_data), SimpleNamespace(args=[]))
+            return
+        team_args = rng.choice(TEAMS).split() if name in ('history', 'form') else []
+        await getattr(bot, f"{name}_command")(chat.update(user_id), SimpleNamespace(args=team_args))
+
+    summary_hour, summary_minute = map(int, DAILY_SUMMARY_TIME.split(':'))
+
+    def seconds_until(hour: int, minute: int) -> float:
+        now = datetime.fromtimestamp(clock.now)
+        at = now.replace(hour=hour, minute=minute, second=0, microsecond=0)
+        return ((at - now).total_seconds()) % 86400
+
+    # name -> (seconds until first run, interval in seconds or a function of nothing, job)
+    jobs = {
+        'check_results': (30, lambda: worker.poll_minutes * 60, bot.check_match_results),
+        'refresh_cache': (0, 1800, bot.refresh_match_cache),
+        'refresh_schedule': (120, SCHEDULE_CHECK_MINUTES * 60, bot.refresh_schedule),
+        'load_teams': (0, 86400, bot.load_teams),
+        'daily_team_refresh': (seconds_until(3, 0), 86400, bot.load_teams),
+        'daily_summary': (seconds_until(summary_hour, summary_minute), 86400, bot.send_daily_summary),
+        'purge_outbox': (seconds_until(4, 0), 86400, bot.purge_outbox),
+        'deliver_outbox': (0, 60, deliver),
+        'prematch_alerts': (0, 60, prematch_alerts),
+        'command': (60, args.command_minutes * 60, command),
+    }
+    due = {name: clock.now + first for name, (first, _, _) in jobs.items()}
+
+    start = clock.now
+    warmup_end = start + args.warmup_hours * 3600
+    end = warmup_end + args.days * 86400
+    baseline = None
+    baseline_traced = 0
+    next_snapshot = warmup_end
+    next_sample = warmup_end
+    rows = []
+    real_start = time.perf_counter()
+
+    print(f"Simulating {args.warmup_hours}h warmup + {args.days} days, {args.users} users, "
+          f"a command every {args.command_minutes} min{' (recorded pages)' if recorded else ''}\n")
+    print(f"{'sim time':<17} {'traced':>9} {'growth':>9} {'matches':>8} {'tags':>6} "
+          f"{'dt cache':>9} {'pages':>6} {'jobs':>5} {'requests':>9}")
+
+    while clock.now < end:
+        clock.now = min(due.values())
+        for name, (_, interval, job) in jobs.items():
+            if due[name] <= clock.now:
+                await job()
+                due[name] = clock.now + (interval() if callable(interval) else interval)
+
+        if clock.now >= next_sample:
+            # Many samples: bounded caches filling and emptying average out in the slope
+            gc.collect()
+            if baseline is None:
+                baseline = tracemalloc.take_snapshot()
+                baseline_traced = tracemalloc.get_traced_memory()[0]
+            traced = tracemalloc.get_traced_memory()[0]
+            rows.append((clock.now, traced - baseline_traced))
+            next_sample += args.sample_minutes * 60
+
+        if clock.now >= next_snapshot:
+            counts = live_objects()
+            traced = tracemalloc.get_traced_memory()[0]
+            stamp = datetime.fromtimestamp(clock.now).strftime('%a %d.%m %H:%M')
+            print(f"{stamp:<17} {traced / 1024:7.0f}KB {(traced - baseline_traced) / 1024:+8.0f}KB "
+                  f"{counts['matches']:8d} {counts['tags']:6d} {len(scraper._datetime_cache):9d} "
+                  f"{len(bot.result_pages._sets):6d} {len(bot.scheduler.get_jobs()):5d} {world.requests:9d}")
+            next_snapshot += args.snapshot_hours * 3600
+
+    counts = live_objects()
+    snapshot = tracemalloc.take_snapshot()
+    rows.append((clock.now, tracemalloc.get_traced_memory()[0] - baseline_traced))
+    growth_per_day = slope(rows) * 86400
+    print(f"\n{args.days} simulated days in {time.perf_counter() - real_start:.0f}s, "
+          f"{world.requests} HLTV requests, {chat.replies} replies, {len(rows)} memory samples")
+    print(f"Largest growth by allocation site since the end of the warmup:\n{top_sites(snapshot, baseline, args.top)}\n")
+
+    failed = False
+    if growth_per_day > args.max_growth_kb * 1024:
+        print(f"Retained memory grew {growth_per_day / 1024:.1f} KB per simulated day "
+              f"(limit {args.max_growth_kb} KB)  FAILED")
+        failed = True
+    else:
+        print(f"Retained memory grew {growth_per_day / 1024:.1f} KB per simulated day "
+              f"(limit {args.max_growth_kb} KB)  ok")
+    if counts['tags'] > args.max_tags:
+        print(f"{counts['tags']} soup tags still alive after the last parse (limit {args.max_tags})  FAILED")
+        failed = True
+
+    bot.scheduler.shutdown(wait=False)
+    return 1 if failed else 0
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--days', type=float, default=2, help='simulated days after the warmup')
+    parser.add_argument('--warmup-hours', type=float, default=24,
+                        help='simulated hours before measuring (at least a day, so every daily job ran)')
+    parser.add_argument('--sample-minutes', type=float, default=60, help='simulated minutes between memory samples')
+    parser.add_argument('--snapshot-hours', type=float, default=12, help='simulated hours between printed rows')
+    parser.add_argument('--users', type=int, default=40, help='users with favorites')
+    parser.add_argument('--command-minutes', type=float, default=10, help='simulated minutes between commands')
+    parser.add_argument('--max-growth-kb', type=float, default=64, help='allowed retained growth per simulated day')
+    parser.add_argument('--max-tags', type=int, default=0, help='allowed live soup tags at the end')
+    parser.add_argument('--frames', type=int, default=1, help='traceback depth recorded by tracemalloc')
+    parser.add_argument('--top', type=int, default=10, help='allocation sites to show')
+    parser.add_argument('--recorded', help='replay recorded pages from this directory instead')
+    parser.add_argument('--seed', type=int, default=1)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        # Before the bot's modules read their configuration
+        os.environ['DATABASE_PATH'] = os.path.join(tmp, 'soak.db')
+        os.environ.setdefault('TELEGRAM_BOT_TOKEN', '123456:soak-test')
+        os.environ['PAGE_STORE_DIR'] = os.path.join(tmp, 'pages')
+        os.environ['SCRAPER_MODE'] = 'embedded'
+        import logging
+        logging.basicConfig(level=logging.CRITICAL)
+        return asyncio.run(soak(args))
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,236 @@
+"""Peak memory of parsing HLTV pages: full soup tree vs. streaming
+
+Parses /results, /matches and rankings pages both ways, each in a fresh
+interpreter, and reports the peak of Python allocations (tracemalloc) and
+the growth of the peak RSS (which includes lxml's own C allocations):
+
+- soup:   the whole page as one BeautifulSoup tree, then find_all containers
+          (how the scraper parsed pages before)
+- stream: HLTVScraper._parse_*_page fed in STREAM_CHUNK_SIZE chunks, like a
+          streamed response (iter_containers)
+
+Fails (exit code 1) if streaming does not parse the same items or does not
+lower the tracemalloc peak at least `--min-ratio` times.
+
+Usage:
+    python benchmarks/parse_memory.py [--results 100] [--matches 120] [--teams 30] [--min-ratio 3]
+    python benchmarks/parse_memory.py --page results=recorded/results.html.gz
+"""
+import argparse
+import gzip
+import importlib
+import json
+import os
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+KINDS = ('results', 'matches', 'rankings')
+
+
+def _chrome(size: int) -> str:
+    """Navigation, sidebars and inline scripts around the actual content, like on HLTV"""
+    links = ''.join(f'<li><a href="/news/{i}/headline-{i}" class="newsline"><img src="/img/{i}.png" alt="">'
+                    f'<div class="newstext">Headline number {i} of the sidebar</div></a></li>' for i in range(size))
+    script = json.dumps({'ads': [{'slot': i, 'sizes': [[300, 250], [728, 90]], 'targeting': 'x' * 40}
+                                 for i in range(size)]})
+    return f'<ul class="sidebar">{links}</ul><script>window.__config = {script};</script>'
+
+
+def _slug(team1: str, team2: str, event: str) -> str:
+    return f"{team1}-vs-{team2}-{event}".lower().replace(' ', '-')
+
+
+def page_html(body: str, chrome: int = 300) -> str:
+    """A full page around the content"""
+    chrome = _chrome(chrome)
+    return f'<!DOCTYPE html><html><head><title>HLTV</title></head><body>{chrome}<div class="contentCol">{body}</div>{chrome}</body></html>'
+
+
+def result_html(match_id: int, team1: str, team2: str, event: str, unix_ms: int, stars: int, score=(2, 1)) -> str:
+    """A /results container"""
+    rating = '<i class="fa fa-star star"></i>' * stars
+    return (
+        f'<div class="result-con" data-zonedgrouping-entry-unix="{unix_ms}">'
+        f'<a href="/matches/{match_id}/{_slug(team1, team2, event)}" class="a-reset">'
+        f'<div class="result"><table><tr>'
+        f'<td class="team-cell"><div class="line-align team1"><div class="team team-won">{team1}</div>'
+        f'<img alt="{team1}" src="https://img-cdn.hltv.org/teamlogo/{match_id}-1.svg" class="team-logo"></div></td>'
+        f'<td class="result-score"><span class="score-won">{score[0]}</span> - <span class="score-lost">{score[1]}</span></td>'
+        f'<td class="team-cell"><div class="line-align team2"><img alt="{team2}" '
+        f'src="https://img-cdn.hltv.org/teamlogo/{match_id}-2.svg" class="team-logo"><div class="team">{team2}</div></div></td>'
+        f'<td class="event"><img alt="" src="/img/event/{match_id % 7}.png" class="event-logo">'
+        f'<span class="event-name">{event}</span></td>'
+        f'<td class="star-cell"><div class="map-and-stars"><div class="stars">{rating}</div>'
+        f'<div class="map map-text">bo3</div></div></td>'
+        f'</tr></table></div></a></div>'
+    )
+
+
+def results_body(results: list, featured: int = 5) -> str:
+    """Featured results (repeated further down) and the chronological list, 20 per day headline"""
+    listed = ''.join(
+        f'<div class="results-sublist"><div class="standard-headline">Results {i // 20}</div>'
+        + ''.join(results[i:i + 20]) + '</div>'
+        for i in range(0, len(results), 20)
+    )
+    return f'<div class="big-results">{"".join(results[:featured])}</div><div class="results-all">{listed}</div>'
+
+
+def match_html(match_id: int, team1: str, team2: str, event: str, stars: int, live: bool = False) -> str:
+    """A /matches container"""
+    rating = ''.join('<i class="fa fa-star{}"></i>'.format('' if s < stars else ' faded') for s in range(5))
+    return (
+        f'<div class="match-wrapper" data-match-id="{match_id}" data-stars="{stars}">'
+        f'<div class="match match-new">'
+        f'<a href="/matches/{match_id}/{_slug(team1, team2, event)}" class="match-top">'
+        f'<div class="match-meta"><div class="match-time">19:00</div>'
+        f'<div class="match-meta">bo3</div></div><div class="match-rating{" matchLive" if live else ""}">{rating}</div></a>'
+        f'<div class="match-teams"><div class="match-team team1"><img class="match-team-logo" src="/logo/{match_id}-1.png">'
+        f'<div class="match-teamname text-ellipsis">{team1}</div></div>'
+        f'<div class="match-team team2"><img class="match-team-logo" src="/logo/{match_id}-2.png">'
+        f'<div class="match-teamname text-ellipsis">{team2}</div></div></div>'
+        f'<div class="match-event"><div class="match-event-name">{event}</div></div>'
+        f'</div></div>'
+    )
+
+
+def ranked_team_html(rank: int, name: str) -> str:
+    """A rankings container"""
+    players = ''.join(f'<div class="player">Player {rank}-{p}<img src="/p/{rank}{p}.png"></div>' for p in range(5))
+    return (
+        f'<div class="ranked-team standard-box"><div class="ranking-header"><span class="position">#{rank}</span>'
+        f'<div class="teamLine"><span class="name">{name}</span><span class="points">({1000 - rank} points)</span></div></div>'
+        f'<div class="lineup-con">{players}</div></div>'
+    )
+
+
+def synthetic_page(kind: str, count: int) -> str:
+    """A page with `count` containers in the markup the scraper's parsers expect"""
+    if kind == 'results':
+        body = results_body([result_html(2370000 + i, f"Team {i}", f"Team {i + 1}", f"Event {i % 7}",
+                                         1700000000000 - i * 3600000, i % 4, (2, i % 2)) for i in range(count)])
+    elif kind == 'matches':
+        body = '<div class="matches-list">' + ''.join(
+            match_html(2380000 + i, f"Team {i}", f"Team {i + 1}", f"Event {i % 7}", i % 4) for i in range(count)) + '</div>'
+    else:
+        body = ''.join(ranked_team_html(i + 1, f"Team {i}") for i in range(count))
+    return page_html(body)
+
+
+def _parse_soup(scraper, kind: str, data: bytes) -> list:
+    """The previous full-tree parsers"""
+    from hltv_scraper import parse_html
+
+    soup = parse_html(data.decode('utf-8'), kind)
+    if kind == 'results':
+        scope = soup.find('div', class_='results-all') or soup
+        return [r.match_id for r in map(scraper._parse_result_container, scope.find_all('div', class_='result-con')) if r]
+    if kind == 'matches':
+        divs = [d for d in soup.find_all('div', class_=True) if 'match' in d['class'] and len(d['class']) <= 3]
+        return [m.match_id for m in (scraper._parse_match_container(d) for d in divs) if m]
+    return [c.find('span', class_='name').get_text(strip=True).lower() for c in soup.find_all('div', class_='ranked-team')]
+
+
+def _parse_stream(scraper, kind: str, data: bytes) -> list:
+    from hltv_scraper import STREAM_CHUNK_SIZE
+
+    chunks = (data[i:i + STREAM_CHUNK_SIZE] for i in range(0, len(data), STREAM_CHUNK_SIZE))
+    if kind == 'results':
+        return [r.match_id for r in scraper._parse_results_page(chunks)]
+    if kind == 'matches':
+        return [m.match_id for m in scraper._parse_matches_page(chunks, kind)]
+    return scraper._parse_rankings_page(chunks)
+
+
+def child(kind: str, mode: str, path: str, measure: str):
+    """Parse one page in this (fresh) interpreter and print the measurement as JSON"""
+    from hltv_scraper import HLTVScraper
+
+    # The parsers import these lazily - import them before measuring
+    for module in ('bs4', 'lxml.etree'):
+        importlib.import_module(module)
+
+    with open(path, 'rb') as f:
+        data = f.read()
+    scraper = HLTVScraper()
+    parse = _parse_soup if mode == 'soup' else _parse_stream
+
+    rss_before = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    if measure == 'tracemalloc':
+        tracemalloc.start()
+    start = time.perf_counter()
+    parsed = parse(scraper, kind, data)
+    seconds = time.perf_counter() - start
+    peak = tracemalloc.get_traced_memory()[1] if measure == 'tracemalloc' else None
+    rss_growth = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss - rss_before
+
+    print(json.dumps({'parsed': parsed, 'peak': peak, 'rss_kb': rss_growth, 'seconds': seconds}))
+
+
+def run(kind: str, mode: str, path: str, measure: str) -> dict:
+    env = dict(os.environ, DATABASE_PATH=os.devnull)
+    proc = subprocess.run([sys.executable, __file__, '--child', kind, mode, path, measure],
+                          cwd=ROOT, env=env, capture_output=True, text=True, check=True)
+    return json.loads(proc.stdout.strip().splitlines()[-1])
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--results', type=int, default=100, help='results on the synthetic /results page')
+    parser.add_argument('--matches', type=int, default=120, help='matches on the synthetic /matches page')
+    parser.add_argument('--teams', type=int, default=30, help='teams on the synthetic rankings page')
+    parser.add_argument('--page', action='append', default=[], metavar='KIND=FILE',
+                        help='use a recorded page (.html or .html.gz) instead, e.g. results=page.html.gz')
+    parser.add_argument('--min-ratio', type=float, default=3.0, help='required tracemalloc peak reduction')
+    parser.add_argument('--child', nargs=4, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        child(*args.child)
+        return 0
+
+    recorded = dict(page.split('=', 1) for page in args.page)
+    counts = {'results': args.results, 'matches': args.matches, 'rankings': args.teams}
+    failed = False
+    with tempfile.TemporaryDirectory() as tmp:
+        print(f"{'page':<10} {'size':>8} {'mode':<7} {'items':>6} {'py peak':>10} {'rss growth':>11} {'time':>8}")
+        for kind in KINDS:
+            if kind in recorded:
+                opener = gzip.open if recorded[kind].endswith('.gz') else open
+                with opener(recorded[kind], 'rb') as f:
+                    data = f.read()
+            else:
+                data = synthetic_page(kind, counts[kind]).encode('utf-8')
+            path = os.path.join(tmp, f"{kind}.html")
+            with open(path, 'wb') as f:
+                f.write(data)
+
+            measured = {}
+            for mode in ('soup', 'stream'):
+                traced = run(kind, mode, path, 'tracemalloc')
+                plain = run(kind, mode, path, 'rss')
+                measured[mode] = traced
+                print(f"{kind:<10} {len(data) / 1024:6.0f}KB {mode:<7} {len(traced['parsed']):6d} "
+                      f"{traced['peak'] / 1e6:8.2f}MB {plain['rss_kb'] / 1024:9.1f}MB {plain['seconds'] * 1000:6.0f}ms")
+
+            soup, stream = measured['soup'], measured['stream']
+            if soup['parsed'] != stream['parsed']:
+                print(f"{kind}: streaming parsed different items than the soup parser")
+                failed = True
+            ratio = soup['peak'] / max(stream['peak'], 1)
+            status = 'ok' if ratio >= args.min_ratio else 'NOT ENOUGH'
+            failed |= status != 'ok'
+            print(f"{kind:<10} peak reduced {ratio:.1f}x (required {args.min_ratio:.1f}x)  {status}\n")
+
+    return 1 if failed else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -1,9 +1,17 @@
+import asyncio
+import hashlib
+import html
 import logging
+import os
+import time
 from datetime import datetime, timedelta
+from typing import List, Optional, Tuple
 from telegram import Update, InlineKeyboardButton, InlineKeyboardMarkup
+from telegram.constants import MessageLimit
+from telegram.error import BadRequest, Forbidden, RetryAfter
 from telegram.ext import (
-    Application, CommandHandler, CallbackQueryHandler, 
-    ContextTypes, ConversationHandler, MessageHandler, filters
+    Application, BaseUpdateProcessor, CommandHandler, CallbackQueryHandler, 
+    ContextTypes, ConversationHandler, MessageHandler, TypeHandler, filters
 )
 from apscheduler.schedulers.asyncio import AsyncIOScheduler
 from apscheduler.triggers.cron import CronTrigger
@@ -11,31 +19,276 @@ import pytz
 
 from config import (
     TELEGRAM_BOT_TOKEN, TIMEZONE, DAILY_SUMMARY_TIME, 
-    MIN_STARS_FOR_IMPORTANT, DATABASE_PATH
+    MIN_STARS_FOR_IMPORTANT, DATABASE_PATH,
+    OUTBOX_POLL_SECONDS, OUTBOX_BATCH_SIZE, OUTBOX_MAX_ATTEMPTS,
+    OUTBOX_BASE_BACKOFF, OUTBOX_MAX_BACKOFF, OUTBOX_LEASE_SECONDS,
+    OUTBOX_RETENTION_DAYS, MAX_ALERT_LEAD_MINUTES,
+    RESULTS_NOTIFY_MAX_AGE_HOURS, SCRAPER_MODE, SNAPSHOT_POLL_SECONDS,
+    BOT_MODE, WEBHOOK_URL, WEBHOOK_LISTEN, WEBHOOK_PORT, WEBHOOK_PATH, WEBHOOK_SECRET,
+    WEBHOOK_MAX_CONNECTIONS, MAX_CONCURRENT_UPDATES, TELEGRAM_API_BASE_URL,
+    METRICS_PORT, METRICS_ADDR, LOOP_LAG_THRESHOLD_MS, ADMIN_USER_IDS,
+    TODAY_MAX_EDITS, TODAY_EDIT_INTERVAL, TODAY_RESOLVE_BATCH,
+    PAGE_SIZE, RESULT_PAGES_TTL_MINUTES, RESULT_PAGES_MAX, SCHEDULE_CHECK_MINUTES, HISTORY_LIMIT,
+    FORM_RANKED_TOP
 )
-from database import Database
-from hltv_scraper import HLTVScraper
+import metrics
+from database import Database, parse_score
+from loop_monitor import LoopMonitor
+import page_store
+from paging import ResultSet, ResultSetCache, parse_callback, render_page
+import profiling
+import tracing
+from hltv_scraper import HLTVScraper, Match
+from scraper_worker import ScraperWorker
+from snapshots import MATCHES, RESULTS, SCHEDULE, SnapshotScraper, load_matches, restore_snapshots
+
+# Startzeit des Prozesses (for the time-to-first-response metric)
+PROCESS_START = time.monotonic()
 
-# Logging konfigurieren
-logging.basicConfig(
-    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
-    level=logging.INFO
-)
 logger = logging.getLogger(__name__)
 
 # Conversation States
 AWAITING_TEAM_NAME = 1
 
-# Globale Instanzen
-db = Database(DATABASE_PATH)
-scraper = HLTVScraper()
-scraper.set_database(db)  # Connect database to scraper for team validation
+# Only subscribe to the update types we have handlers for
+ALLOWED_UPDATES = [Update.MESSAGE, Update.CALLBACK_QUERY]
+
+# Shown below /today while match times are still being resolved
+TODAY_LOADING = "\n<i>⏳ Loading more matches...</i>"
+
+# Handler group running after all command handlers
+METRICS_GROUP = 99
+
+
+class ChatOrderedUpdateProcessor(BaseUpdateProcessor):
+    """Process updates of different chats concurrently, those of one chat in arrival order
+    
+    The /add and /remove conversations keep their state per chat and user - a
+    team name processed before its /add would be lost or land in the wrong step.
+    """
+    
+    def __init__(self, max_concurrent_updates: int):
+        super().__init__(max_concurrent_updates)
+        self._chats = {}  # chat id -> [lock, updates holding or waiting for it]
+    
+    async def do_process_update(self, update: object, coroutine) -> None:
+        chat = update.effective_chat if isinstance(update, Update) else None
+        if chat is None:
+            await coroutine
+            return
+        
+        entry = self._chats.setdefault(chat.id, [asyncio.Lock(), 0])
+        entry[1] += 1
+        try:
+            async with entry[0]:
+                await coroutine
+        finally:
+            entry[1] -= 1
+            if not entry[1]:
+                del self._chats[chat.id]
+    
+    async def initialize(self) -> None:
+        pass
+    
+    async def shutdown(self) -> None:
+        pass
+
+
+def split_message(header: str, parts: List[str], separator: str = "\n\n",
+                  limit: int = MessageLimit.MAX_TEXT_LENGTH) -> List[Tuple[str, int]]:
+    """Join parts into as few messages as possible, splitting only at Telegram's length limit
+    
+    Every message starts with the header. Parts are never split across messages
+    (a single oversized part is truncated).
+    
+    Returns:
+        List of (message text, number of parts in this message)
+    """
+    messages = []
+    current, count = header, 0
+    for part in parts:
+        part = part[:limit - len(header)]
+        candidate = f"{current}{separator}{part}" if count else f"{current}{part}"
+        if len(candidate) > limit:
+            messages.append((current, count))
+            candidate, count = f"{header}{part}", 0
+        current, count = candidate, count + 1
+    if count:
+        messages.append((current, count))
+    return messages
+
+
+def matches_on_date(matches: List[Match], day) -> List[Match]:
+    """Filter matches by kickoff date
+    
+    Blocking: accessing Match.time may lazily fetch match pages, so call this
+    from a worker thread (asyncio.to_thread) inside handlers.
+    """
+    return [m for m in matches if m.time and m.time.date() == day]
+
+
+def today_result_set(results: List[Match], upcoming: List[Match], min_stars: int, day,
+                     pending: bool = False) -> ResultSet:
+    """Build the /today result set from finished and upcoming matches
+    
+    Only pass matches whose time is known (see TelegramBot._split_by_known_time),
+    then rendering never fetches match pages. `pending` while more are loading.
+    """
+    if pending:
+        empty_text = f"🔍 Searching for matches with {min_stars}+ stars..."
+    else:
+        empty_text = (
+            f"No matches with {min_stars}+ stars found for today. 😔\n"
+            f"Use /setminstar <number> to change the minimum rating."
+        )
+    entries = [(r.stars, "✅ Finished:", r.format_for_telegram()) for r in results]
+    entries += [(m.stars, "🕐 Upcoming:", m.format_for_telegram()) for m in sorted(upcoming, key=lambda m: m.time)]
+    return ResultSet(
+        f"<b>⭐ Important Matches Today ({day.strftime('%d.%m.%Y')}, {min_stars}+ stars):</b>",
+        entries,
+        empty_text
+    )
+
+
+def alltoday_result_set(results: List[Match], upcoming: List[Match], day) -> ResultSet:
+    """Build the /alltoday result set, grouped by star rating (finished first, then by kickoff)
+    
+    Blocking like matches_on_date: pass upcoming matches already filtered by it.
+    """
+    by_stars = {}
+    for result in results:
+        by_stars.setdefault(result.stars, ([], []))[0].append(result)
+    for match in sorted(upcoming, key=lambda m: m.time):
+        by_stars.setdefault(match.stars, ([], []))[1].append(match)
+    
+    entries = []
+    for stars in sorted(by_stars, reverse=True):
+        finished, later = by_stars[stars]
+        count = len(finished) + len(later)
+        stars_str = "☆" * stars if stars > 0 else "No rating"
+        section = f"{stars_str} ({count} match{'es' if count != 1 else ''}):"
+        entries += [(stars, section, m.format_for_telegram()) for m in finished + later]
+    
+    return ResultSet(
+        f"<b>🎮 All Matches Today ({day.strftime('%d.%m.%Y')}):</b>",
+        entries,
+        f"No matches found for today ({day.strftime('%d.%m.%Y')}). 😔"
+    )
+
+
+def format_team_result(result: Match, team: str) -> str:
+    """One /history line: date, win/loss and score from the team's point of view, opponent"""
+    team = team.lower()
+    own_is_team1 = result.team1.lower() == team or (result.team2.lower() != team and team in result.team1.lower())
+    opponent = result.team2 if own_is_team1 else result.team1
+    score = result.score or ""
+    icon = "•"  # Unusual score format (e.g. forfeit) - shown as is
+    parsed = parse_score(score)
+    if parsed:
+        own, other = parsed if own_is_team1 else parsed[::-1]
+        score = f"{own}-{other}"
+        icon = "✅" if own > other else "❌" if own < other else "➖"
+    date = result._time.strftime('%d.%m.%y') if result._time else "?"
+    return (
+        f"{date} {icon} <a href=\"{result.get_match_url()}\">{html.escape(score)} vs {html.escape(opponent)}</a>\n"
+        f"<i>{html.escape(result.event)}</i>"
+    )
+
+
+def week_result_set(schedule: dict, title: str, empty_text: str) -> ResultSet:
+    """Build a result set from the week-ahead schedule index, one section per day
+    
+    Schedule matches are detached from the scraper, so formatting never fetches.
+    """
+    today = datetime.now().date()
+    entries = []
+    for day in sorted(schedule):
+        if day == today:
+            section = f"Today ({day.strftime('%d.%m.')}):"
+        elif day == today + timedelta(days=1):
+            section = f"Tomorrow ({day.strftime('%d.%m.')}):"
+        else:
+            section = f"{day.strftime('%A %d.%m.')}:"
+        # Known kickoff times first, in order
+        matches = sorted(schedule[day], key=lambda m: (m._time is None, m._time or datetime.max))
+        entries += [(m.stars, section, m.format_for_telegram()) for m in matches]
+    return ResultSet(title, entries, empty_text)
+
+
+class ProgressiveMessage:
+    """A reply that is edited in place as more data arrives
+    
+    Intermediate edits are dropped when they come faster than `min_interval`
+    or would use up the last of `max_edits`, which is kept for the final state.
+    """
+    
+    def __init__(self, message, text: str, max_edits: int, min_interval: float):
+        self.message = message
+        self.text = text
+        self.max_edits = max_edits
+        self.min_interval = min_interval
+        self.edits = 0
+        self._last_edit = time.monotonic()
+    
+    async def update(self, text: str, final: bool = False, reply_markup=None):
+        if (text == self.text and reply_markup is None) or self.edits >= self.max_edits:
+            return
+        wait = self.min_interval - (time.monotonic() - self._last_edit)
+        if not final and (wait > 0 or self.edits >= self.max_edits - 1):
+            return
+        if final and wait > 0:
+            await asyncio.sleep(wait)
+        
+        try:
+            await self.message.edit_text(text, parse_mode='HTML', reply_markup=reply_markup,
+                                         disable_web_page_preview=True)
+        except RetryAfter as e:
+            if not final:
+                return
+            await asyncio.sleep(e.retry_after)
+            await self.message.edit_text(text, parse_mode='HTML', reply_markup=reply_markup,
+                                         disable_web_page_preview=True)
+        except BadRequest as e:
+            if 'not modified' not in str(e).lower():
+                raise
+        self.text = text
+        self.edits += 1
+        self._last_edit = time.monotonic()
 
 
 class TelegramBot:
     def __init__(self):
-        self.application = Application.builder().token(TELEGRAM_BOT_TOKEN).build()
+        self.db = Database(DATABASE_PATH)
+        if SCRAPER_MODE == 'external':
+            # A separate scraper_worker.py process scrapes HLTV, we only read its snapshots
+            self.scraper = SnapshotScraper(self.db)
+        else:
+            self.scraper = HLTVScraper()
+            self.scraper.set_database(self.db)  # Connect database to scraper for team validation
+            self.scraper.set_page_store(page_store.from_config(self.db))  # Raw pages for offline re-parsing
+        self.application = (
+            Application.builder()
+            .token(TELEGRAM_BOT_TOKEN)
+            .base_url(TELEGRAM_API_BASE_URL)
+            # Bounded parallel update processing, ordered per chat for the conversations
+            .concurrent_updates(ChatOrderedUpdateProcessor(MAX_CONCURRENT_UPDATES))
+            .post_init(self.post_init)
+            .post_shutdown(self.post_shutdown)
+            .build()
+        )
         self.scheduler = AsyncIOScheduler(timezone=pytz.timezone(TIMEZONE))
+        metrics.instrument_scheduler(self.scheduler)
+        # Scraping jobs run in-process unless a separate scraper worker publishes snapshots
+        self.worker = ScraperWorker(self.db, self.scraper) if SCRAPER_MODE != 'external' else None
+        self._results_version = None  # Last processed results snapshot version
+        self.startup_metrics = {}  # Seconds since process start: ready, first_response
+        # Result sets of /today and /alltoday, paged by the inline buttons
+        self.result_pages = ResultSetCache(RESULT_PAGES_TTL_MINUTES * 60, RESULT_PAGES_MAX)
+        # /favgames views: user_id -> ((favorites, matches generation), next match per favorite)
+        self.favgames_cache = {}
+        self._favgames_generation = 0
+        # Reports handlers/jobs that block the event loop with synchronous calls
+        self.loop_monitor = LoopMonitor(LOOP_LAG_THRESHOLD_MS / 1000) if LOOP_LAG_THRESHOLD_MS > 0 else None
         self.setup_handlers()
         self.setup_scheduler()
 
@@ -44,9 +297,16 @@ class TelegramBot:
         self.application.add_handler(CommandHandler("start", self.start_command))
         self.application.add_handler(CommandHandler("help", self.help_command))
         self.application.add_handler(CommandHandler("today", self.today_command))
+        self.application.add_handler(CommandHandler("alltoday", self.alltoday_command))
         self.application.add_handler(CommandHandler("favgames", self.favgames_command))
+        self.application.add_handler(CommandHandler("week", self.week_command))
+        self.application.add_handler(CommandHandler("favweek", self.favweek_command))
+        self.application.add_handler(CommandHandler("history", self.history_command))
+        self.application.add_handler(CommandHandler("form", self.form_command))
         self.application.add_handler(CommandHandler("setminstar", self.setminstar_command))
+        self.application.add_handler(CommandHandler("setalert", self.setalert_command))
         self.application.add_handler(CommandHandler("favorites", self.favorites_command))
+        self.application.add_handler(CommandHandler("profile", self.profile_command))
         
         # Conversation Handler for adding favorites
         add_conv_handler = ConversationHandler(
@@ -70,6 +330,9 @@ class TelegramBot:
         
         # Callback Query Handler
         self.application.add_handler(CallbackQueryHandler(self.button_callback))
+        
+        # Runs after the command handlers answered the update
+        self.application.add_handler(TypeHandler(Update, self.record_first_response), group=METRICS_GROUP)
 
     def setup_scheduler(self):
         """Set up scheduled tasks"""
@@ -81,45 +344,82 @@ class TelegramBot:
             id='daily_summary'
         )
         
-        # Check every 30 minutes for results of favorite matches
-        self.scheduler.add_job(
-            self.check_match_results,
-            'interval',
-            minutes=30,
-            id='check_results'
-        )
+        if self.worker:
+            # Check for results of favorite matches - the interval adapts to whether
+            # a followed match is live (see ScraperWorker.adjust_poll_interval).
+            # The first check runs right after startup, not one idle interval later
+            self.scheduler.add_job(
+                self.check_match_results,
+                'interval',
+                minutes=self.worker.poll_minutes,
+                next_run_time=datetime.now(self.scheduler.timezone) + timedelta(seconds=30),
+                id='check_results',
+                max_instances=1,
+                coalesce=True
+            )
+            
+            # Refresh match cache every 30 minutes to ensure fresh data
+            self.scheduler.add_job(
+                self.refresh_match_cache,
+                'interval',
+                minutes=30,
+                id='refresh_cache'
+            )
+            
+            # Refetch the days of the week-ahead schedule that are due
+            self.scheduler.add_job(
+                self.refresh_schedule,
+                'interval',
+                minutes=SCHEDULE_CHECK_MINUTES,
+                id='refresh_schedule',
+                max_instances=1,
+                coalesce=True
+            )
+            
+            # Refresh team list daily
+            self.scheduler.add_job(
+                self.load_teams,
+                'cron',
+                hour=3,
+                minute=0,
+                id='daily_team_refresh'
+            )
+        else:
+            # The scraper worker publishes snapshots - just pick up new versions
+            self.scheduler.add_job(
+                self.check_match_results,
+                'interval',
+                seconds=SNAPSHOT_POLL_SECONDS,
+                id='check_results',
+                max_instances=1,
+                coalesce=True
+            )
+            self.scheduler.add_job(
+                self.refresh_match_cache,
+                'interval',
+                seconds=SNAPSHOT_POLL_SECONDS,
+                id='refresh_cache',
+                max_instances=1,
+                coalesce=True
+            )
         
-        # Refresh match cache every 30 minutes to ensure fresh data
+        # Deliver queued messages (decoupled from the jobs producing them)
         self.scheduler.add_job(
-            self.refresh_match_cache,
+            self.deliver_outbox,
             'interval',
-            minutes=30,
-            id='refresh_cache'
-        )
-        
-        # Initial cache warmup
-        self.scheduler.add_job(
-            self.refresh_match_cache,
-            'date',
-            run_date=datetime.now() + timedelta(seconds=10),
-            id='initial_cache_warmup'
-        )
-        
-        # Load team list immediately on startup
-        self.scheduler.add_job(
-            self.load_teams,
-            'date',
-            run_date=datetime.now() + timedelta(seconds=1),
-            id='initial_team_load'
+            seconds=OUTBOX_POLL_SECONDS,
+            id='deliver_outbox',
+            max_instances=1,
+            coalesce=True
         )
         
-        # Refresh team list daily
+        # Clean up delivered messages daily
         self.scheduler.add_job(
-            self.load_teams,
+            self.purge_outbox,
             'cron',
-            hour=3,
+            hour=4,
             minute=0,
-            id='daily_team_refresh'
+            id='purge_outbox'
         )
     
     async def setup_bot_commands(self):
@@ -133,8 +433,14 @@ class TelegramBot:
             BotCommand("remove", "Remove a favorite team"),
             BotCommand("favorites", "Show your favorite teams"),
             BotCommand("setminstar", "Set minimum star rating 1-5 (e.g., /setminstar 2)"),
+            BotCommand("setalert", "Minutes before kickoff to alert you (0 = off)"),
             BotCommand("today", "Show today's important matches"),
+            BotCommand("alltoday", "Show all of today's matches"),
             BotCommand("favgames", "Show upcoming games for your favorite teams"),
+            BotCommand("week", "Show the important matches of the next 7 days"),
+            BotCommand("favweek", "Show when your favorite teams play this week"),
+            BotCommand("history", "Show a team's recent results (e.g., /history Vitality)"),
+            BotCommand("form", "Show a team's form (e.g., /form Vitality)"),
         ]
         
         # Set commands for all private chats (direct messages)
@@ -151,6 +457,8 @@ class TelegramBot:
         
         logger.info("Bot commands updated successfully for all scopes")
 
+    @tracing.traced(root=True)
+    @profiling.profiled()
     async def start_command(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
         """Handler for /start Command"""
         welcome_text = (
@@ -158,8 +466,14 @@ class TelegramBot:
             "I keep you informed about the most important CS2 matches of the day "
             "<b>Available Commands:</b>\n"
             "/today - Show today's important matches\n"
+            "/alltoday - Show all of today's matches\n"
             "/favgames - Show upcoming games for your favorite teams\n"
+            "/week - Show the important matches of the next 7 days\n"
+            "/favweek - Show when your favorite teams play this week\n"
+            "/history <team> - Show a team's recent results\n"
+            "/form <team> - Show a team's form\n"
             "/setminstar <number> - Set minimum star rating (1-5)\n"
+            "/setalert <minutes> - Get alerted before your favorites play\n"
             "/favorites - Show your favorite teams\n"
             "/add - Add a favorite team\n"
             "/remove - Remove a favorite team\n"
@@ -169,6 +483,8 @@ class TelegramBot:
         )
         await update.message.reply_text(welcome_text, parse_mode='HTML')
 
+    @tracing.traced(root=True)
+    @profiling.profiled()
     async def help_command(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
         """Handler for /help Command"""
         help_text = (
@@ -179,161 +495,104 @@ class TelegramBot:
             "/favorites - Shows your list of favorite teams\n\n"
             "/setminstar &lt;number&gt; - Set minimum star rating (1-5)\n"
             "  Example: /setminstar 2\n\n"
+            "/setalert &lt;minutes&gt; - Minutes before kickoff to alert you (0 = off, default 15)\n"
+            "  Example: /setalert 30\n\n"
             "/today - Shows today's important matches (based on your star rating)\n\n"
+            "/alltoday - Shows all of today's matches, with buttons to page and filter by stars\n\n"
             "/favgames - Shows upcoming games for your favorite teams\n\n"
+            "/week - Shows the important matches of the next 7 days (based on your star rating)\n\n"
+            "/favweek - Shows when your favorite teams play in the next 7 days\n\n"
+            "/history &lt;team&gt; - Shows a team's recent results\n"
+            "  Example: /history Vitality\n\n"
+            "/form &lt;team&gt; - Shows a team's form: wins, maps and results against top teams\n"
+            "  Example: /form Vitality\n\n"
             "<b>Automatic Notifications:</b>\n"
             "• Daily summary at 09:00 (respects your star rating setting)\n"
-            "• Notifications about your favorite teams' games\n\n"
+            "• Notifications about your favorite teams' games\n"
+            "• Alerts shortly before your favorite teams play\n\n"
             "Have fun! 🎯"
         )
         await update.message.reply_text(help_text, parse_mode='HTML')
 
+    @tracing.traced(root=True)
+    @profiling.profiled()
     async def today_command(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
-        """Handler for /today Command - shows important matches today (based on user's min_stars setting)"""
-        user_id = update.effective_user.id
-        min_stars = db.get_min_stars(user_id)
-        
-        await update.message.reply_text(f"🔍 Searching for matches with {min_stars}+ stars...")
+        """Handler for /today Command - shows important matches today (based on user's min_stars setting)
         
+        Answers right away with what the cached snapshot knows, then edits that
+        message as fresh data arrives and unknown match times are resolved.
+        """
+        user_id = update.effective_user.id
+        min_stars = self.db.get_min_stars(user_id)
         today = datetime.now().date()
         
-        # Get upcoming important matches
-        upcoming_matches = scraper.get_todays_matches(min_stars=min_stars)
-        upcoming_today = [m for m in upcoming_matches if m.time and m.time.date() == today]
-        
-        # Get today's results (filter for important ones)
-        results = scraper.get_recent_results(hours=24)
-        important_results = [r for r in results if r.stars >= min_stars]
-        
-        # Combine both
-        all_important = []
-        
-        # Add finished matches
-        for result in important_results:
-            all_important.append({
-                'match': result,
-                'status': 'finished'
-            })
-        
-        # Add upcoming matches
-        for match in upcoming_today:
-            all_important.append({
-                'match': match,
-                'status': 'upcoming'
-            })
-        
-        if not all_important:
-            await update.message.reply_text(
-                f"No matches with {min_stars}+ stars found for today. 😔\n"
-                f"Use /setminstar <number> to change the minimum rating."
-            )
-            return
-        
-        # Build message
-        message = f"<b>⭐ Important Matches Today ({today.strftime('%d.%m.%Y')}):</b>\n"
-        message += f"<i>Total: {len(all_important)} matches ({min_stars}+ stars)</i>\n\n"
-        
-        # Show finished matches first
-        finished = [item for item in all_important if item['status'] == 'finished']
-        upcoming = [item for item in all_important if item['status'] == 'upcoming']
-        
-        if finished:
-            message += "<b>✅ Finished:</b>\n\n"
-            for item in finished:
-                result = item['match']
-                message += f"{result.format_for_telegram()}\n\n"
-        
-        if upcoming:
-            message += "<b>🕐 Upcoming:</b>\n\n"
-            # Sort by time
-            upcoming.sort(key=lambda x: x['match'].time if x['match'].time else datetime.max)
-            for item in upcoming:
-                match = item['match']
-                message += f"{match.format_for_telegram()}\n\n"
-        
-        await update.message.reply_text(message, parse_mode='HTML', disable_web_page_preview=True)
+        # 1. Cached snapshot only - never waits for HLTV
+        cached = [m for m in self.scraper.get_cached_matches() if m.stars >= min_stars]
+        upcoming, unresolved = self._split_by_known_time(cached, today)
+        results = [r for r in self.scraper.get_cached_results(hours=24) if r.stars >= min_stars]
+        result_set = await profiling.to_thread(today_result_set, results, upcoming, min_stars, today, True)
+        text, _ = render_page(result_set, page_size=PAGE_SIZE, footer=TODAY_LOADING)
+        reply = await update.message.reply_text(text, parse_mode='HTML', disable_web_page_preview=True)
+        progress = ProgressiveMessage(reply, text, TODAY_MAX_EDITS, TODAY_EDIT_INTERVAL)
+        
+        # 2. Fresh data (scraping runs in worker threads, so concurrent users
+        # share in-flight HLTV requests instead of blocking the bot)
+        matches = await profiling.to_thread(self.scraper.get_todays_matches, min_stars=min_stars)
+        results = await profiling.to_thread(self.scraper.get_recent_results, hours=24)
+        results = [r for r in results if r.stars >= min_stars]
+        upcoming, unresolved = self._split_by_known_time(matches, today)
+        
+        # 3. Resolve unknown match times a few at a time, editing in between
+        for i in range(0, len(unresolved), TODAY_RESOLVE_BATCH):
+            result_set = await profiling.to_thread(today_result_set, results, upcoming, min_stars, today, True)
+            text, _ = render_page(result_set, page_size=PAGE_SIZE, footer=TODAY_LOADING)
+            await progress.update(text)
+            batch = unresolved[i:i + TODAY_RESOLVE_BATCH]
+            upcoming += await profiling.to_thread(matches_on_date, batch, today)
+        
+        # 4. Final state, cached so that the page buttons never re-run any of the above
+        result_set = await profiling.to_thread(today_result_set, results, upcoming, min_stars, today)
+        token = self.result_pages.put(result_set)
+        text, markup = render_page(result_set, page_size=PAGE_SIZE, token=token)
+        await progress.update(text, final=True, reply_markup=markup)
+
+    def _split_by_known_time(self, matches: List[Match], day) -> Tuple[List[Match], List[Match]]:
+        """Split into matches known to be on `day` and matches whose time is still unknown"""
+        on_day, unknown = [], []
+        for match in matches:
+            kickoff = self.scraper.get_cached_match_time(match)
+            if kickoff is None:
+                unknown.append(match)
+            elif kickoff.date() == day:
+                on_day.append(match)
+        return on_day, unknown
 
+    @tracing.traced(root=True)
+    @profiling.profiled()
     async def alltoday_command(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
-        """Handler for /alltoday Command - shows ALL matches for today (upcoming + finished)"""
-        await update.message.reply_text("🔍 Searching for all matches today...")
+        """Handler for /alltoday Command - shows ALL matches for today (upcoming + finished), paged"""
+        reply = await update.message.reply_text("🔍 Searching for all matches today...")
         
         today = datetime.now().date()
         
-        # Get upcoming matches
-        upcoming_matches = scraper.get_todays_matches(min_stars=0, use_cache=True)
-        upcoming_today = [m for m in upcoming_matches if m.time and m.time.date() == today]
-        
-        # Get today's results
-        results = scraper.get_recent_results(hours=24)
-        
-        # Combine both lists
-        all_matches = []
-        
-        # Add results first (mark them as finished)
-        for result in results:
-            all_matches.append({
-                'match': result,
-                'status': 'finished',
-                'sort_key': 0  # Finished matches sort first
-            })
-        
-        # Add upcoming matches
-        for match in upcoming_today:
-            all_matches.append({
-                'match': match,
-                'status': 'upcoming',
-                'sort_key': match.time.timestamp() if match.time else float('inf')
-            })
-        
-        if not all_matches:
-            await update.message.reply_text(
-                f"No matches found for today ({today.strftime('%d.%m.%Y')}). 😔"
-            )
-            return
-        
-        # Build message with grouping by star rating
-        message = f"<b>🎮 All Matches Today ({today.strftime('%d.%m.%Y')}):</b>\n"
-        message += f"<i>Total: {len(all_matches)} matches</i>\n\n"
-        
-        # Group by stars
-        by_stars = {}
-        for item in all_matches:
-            match = item['match']
-            stars = match.stars
-            if stars not in by_stars:
-                by_stars[stars] = {'finished': [], 'upcoming': []}
-            by_stars[stars][item['status']].append(match)
-        
-        # Show in descending star order
-        for stars in sorted(by_stars.keys(), reverse=True):
-            stars_str = "☆" * stars if stars > 0 else "No rating"
-            star_data = by_stars[stars]
-            total_count = len(star_data['finished']) + len(star_data['upcoming'])
-            
-            message += f"<b>{stars_str} ({total_count} match{'es' if total_count != 1 else ''}):</b>\n\n"
-            
-            # Show finished matches first
-            for result in star_data['finished'][:8]:
-                message += f"{result.format_for_telegram()}\n\n"
-            
-            # Then show upcoming matches
-            for match in star_data['upcoming'][:8]:
-                message += f"{match.format_for_telegram()}\n\n"
-            
-            remaining = total_count - 16
-            if remaining > 0:
-                message += f"<i>... and {remaining} more</i>\n"
-            message += "\n"
+        upcoming_matches = await profiling.to_thread(self.scraper.get_todays_matches, min_stars=0, use_cache=True)
+        upcoming_today = await profiling.to_thread(matches_on_date, upcoming_matches, today)
+        results = await profiling.to_thread(self.scraper.get_recent_results, hours=24)
         
-        await update.message.reply_text(message, parse_mode='HTML', disable_web_page_preview=True)
+        result_set = await profiling.to_thread(alltoday_result_set, results, upcoming_today, today)
+        token = self.result_pages.put(result_set)
+        text, markup = render_page(result_set, page_size=PAGE_SIZE, token=token)
+        await reply.edit_text(text, parse_mode='HTML', reply_markup=markup, disable_web_page_preview=True)
 
+    @tracing.traced(root=True)
+    @profiling.profiled()
     async def setminstar_command(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
         """Handler for /setminstar Command - set minimum star rating"""
         user_id = update.effective_user.id
         
         # Check if argument provided
         if not context.args or len(context.args) == 0:
-            current_min = db.get_min_stars(user_id)
+            current_min = self.db.get_min_stars(user_id)
             await update.message.reply_text(
                 f"Your current minimum star rating: {current_min}\n\n"
                 f"Usage: /setminstar <number>\n"
@@ -352,7 +611,7 @@ class TelegramBot:
                 )
                 return
             
-            db.set_min_stars(user_id, min_stars)
+            self.db.set_min_stars(user_id, min_stars)
             await update.message.reply_text(
                 f"✅ Minimum star rating set to {min_stars}!\n\n"
                 f"You will now see matches with {min_stars}+ stars in /today and daily reminders."
@@ -364,10 +623,219 @@ class TelegramBot:
                 "Example: /setminstar 2"
             )
 
+    @tracing.traced(root=True)
+    @profiling.profiled()
+    async def setalert_command(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
+        """Handler for /setalert Command - set pre-match alert lead time"""
+        user_id = update.effective_user.id
+        
+        if not context.args:
+            current_lead = self.db.get_alert_lead(user_id)
+            current_text = f"{current_lead} minutes before kickoff" if current_lead > 0 else "off"
+            await update.message.reply_text(
+                f"Your pre-match alerts: {current_text}\n\n"
+                f"Usage: /setalert <minutes>\n"
+                f"Example: /setalert 30\n\n"
+                f"Use /setalert 0 to turn alerts off."
+            )
+            return
+        
+        try:
+            minutes = int(context.args[0])
+        except ValueError:
+            await update.message.reply_text(
+                "Please provide a valid number.\n"
+                "Example: /setalert 30"
+            )
+            return
+        
+        if minutes < 0 or minutes > MAX_ALERT_LEAD_MINUTES:
+            await update.message.reply_text(
+                f"Please use a number between 0 and {MAX_ALERT_LEAD_MINUTES}.\n"
+                "Example: /setalert 30"
+            )
+            return
+        
+        self.db.set_alert_lead(user_id, minutes)
+        self.schedule_prematch_alerts(user_id)
+        
+        if minutes == 0:
+            await update.message.reply_text("🔕 Pre-match alerts turned off.")
+        else:
+            await update.message.reply_text(
+                f"🔔 You'll be alerted {minutes} minutes before your favorite teams play."
+            )
+
+    @tracing.traced(root=True)
+    async def profile_command(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
+        """Handler for /profile Command - admin-only control of the profiler"""
+        if update.effective_user.id not in ADMIN_USER_IDS:
+            await update.message.reply_text("This command is only available to admins.")
+            return
+        
+        profiler = profiling.PROFILER
+        args = context.args or []
+        
+        if args[:1] == ['on'] and len(args) >= 2:
+            targets = {t.strip() for t in args[1].split(',') if t.strip()}
+            try:
+                rate = float(args[2]) if len(args) > 2 else 1.0
+                if not 0 < rate <= 1:
+                    raise ValueError
+            except ValueError:
+                await update.message.reply_text("Sample rate must be a number between 0 and 1.")
+                return
+            profiler.configure(targets, rate)
+            await update.message.reply_text(
+                f"🔬 Profiling {', '.join(sorted(targets))} ({rate:.0%} of runs)."
+            )
+        elif args[:1] == ['off']:
+            profiler.configure(set(), profiler.sample_rate)
+            await update.message.reply_text("Profiling turned off.")
+        elif args[:1] == ['last']:
+            recent = profiler.recent(limit=1)
+            if not recent:
+                await update.message.reply_text("No profiles recorded yet.")
+                return
+            with open(recent[0], encoding='utf-8') as f:
+                summary = f.read()
+            limit = MessageLimit.MAX_TEXT_LENGTH - 20
+            await update.message.reply_text(f"<pre>{html.escape(summary[:limit])}</pre>", parse_mode='HTML')
+        else:
+            targets = ', '.join(sorted(profiler.targets)) or 'nothing'
+            recent = [os.path.basename(path)[:-len('.txt')] for path in profiler.recent()]
+            await update.message.reply_text(
+                f"Profiling: {targets} ({profiler.sample_rate:.0%} of runs)\n"
+                f"Recent profiles: {', '.join(recent) or 'none'}\n\n"
+                "Usage:\n"
+                "/profile on <job/handler,...|all> [sample rate] - e.g. /profile on refresh_match_cache\n"
+                "/profile off\n"
+                "/profile last - hot spots of the newest profile"
+            )
+
+    @tracing.traced(root=True)
+    @profiling.profiled()
+    async def week_command(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
+        """Handler for /week Command - important matches of the next days from the schedule index"""
+        user_id = update.effective_user.id
+        min_stars = self.db.get_min_stars(user_id)
+        
+        # Only reads the prefetched index (see ScraperWorker.refresh_schedule), never HLTV
+        schedule = await profiling.to_thread(self.scraper.get_schedule, min_stars=min_stars)
+        result_set = week_result_set(
+            schedule,
+            f"<b>📅 Important Matches This Week ({min_stars}+ stars):</b>",
+            f"No matches with {min_stars}+ stars scheduled for the next days yet. 😔"
+        )
+        await self._reply_result_set(update, result_set)
+
+    @tracing.traced(root=True)
+    @profiling.profiled()
+    async def favweek_command(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
+        """Handler for /favweek Command - favorite teams' matches of the next days from the schedule index"""
+        user_id = update.effective_user.id
+        favorites = self.db.get_favorites(user_id)
+        
+        if not favorites:
+            await update.message.reply_text(
+                "You haven't added any favorite teams yet.\n"
+                "Use /add to add a team and get notified about their games!"
+            )
+            return
+        
+        schedule = await profiling.to_thread(self.scraper.get_schedule)
+        schedule = {
+            day: [m for m in matches if any(m.has_team(team) for team in favorites)]
+            for day, matches in schedule.items()
+        }
+        result_set = week_result_set(
+            schedule,
+            "<b>📅 Your Favorite Teams This Week:</b>",
+            f"No scheduled matches for your favorite teams in the next days. 😔\n"
+            f"Your favorites: {', '.join(favorites)}"
+        )
+        await self._reply_result_set(update, result_set)
+
+    @tracing.traced(root=True)
+    @profiling.profiled()
+    async def history_command(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
+        """Handler for /history Command - a team's recent results from the local results archive"""
+        if not context.args:
+            await update.message.reply_text(
+                "Usage: /history <team>\n"
+                "Example: /history Vitality"
+            )
+            return
+        
+        team = ' '.join(context.args).strip()
+        rows = await profiling.to_thread(self.db.get_team_results, team, HISTORY_LIMIT)
+        if not rows:
+            await update.message.reply_text(
+                f"No results of {team} archived yet. 😔\n"
+                f"Results are collected as they are published on HLTV."
+            )
+            return
+        
+        results = [Match.from_dict(row) for row in rows]
+        # The archive may hold a longer name for what the user typed (e.g. "navi")
+        name = next((t for t in (results[0].team1, results[0].team2) if team.lower() in t.lower()), team)
+        message = f"<b>📜 Recent Results of {html.escape(name)}:</b>\n\n"
+        message += "\n\n".join(format_team_result(result, name) for result in results)
+        await update.message.reply_text(message, parse_mode='HTML', disable_web_page_preview=True)
+
+    @tracing.traced(root=True)
+    @profiling.profiled()
+    async def form_command(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
+        """Handler for /form Command - a team's form from the incrementally updated aggregates"""
+        if not context.args:
+            await update.message.reply_text(
+                "Usage: /form <team>\n"
+                "Example: /form Vitality"
+            )
+            return
+        
+        team = ' '.join(context.args).strip()
+        form = await profiling.to_thread(self.db.get_team_form, team)
+        if form is None:
+            await update.message.reply_text(
+                f"No results of {team} archived yet. 😔\n"
+                f"Results are collected as they are published on HLTV."
+            )
+            return
+        
+        matches = form['wins'] + form['losses'] + form['draws']
+        icons = ''.join({'W': '✅', 'L': '❌'}.get(outcome, '➖') for outcome in form['recent'])
+        map_diff = form['maps_won'] - form['maps_lost']
+        draws = f" - {form['draws']}D" if form['draws'] else ""
+        message = (
+            f"<b>📈 Form of {html.escape(form['team'])}</b>\n\n"
+            f"Last {len(form['recent'])}: {icons} ({form['recent']})\n"
+            f"Matches: {matches} ({form['wins']}W - {form['losses']}L{draws}), "
+            f"win rate {form['wins'] / matches:.0%}\n"
+            f"Maps: {form['maps_won']}-{form['maps_lost']} ({map_diff:+d})\n"
+        )
+        if form['ranked_matches']:
+            message += (
+                f"vs top {FORM_RANKED_TOP}: {form['ranked_wins']}/{form['ranked_matches']} won "
+                f"({form['ranked_wins'] / form['ranked_matches']:.0%})\n"
+            )
+        if form['last_played_at']:
+            message += f"Last match: {datetime.fromtimestamp(form['last_played_at']).strftime('%d.%m.%Y')}\n"
+        await update.message.reply_text(message, parse_mode='HTML')
+
+    async def _reply_result_set(self, update: Update, result_set: ResultSet):
+        """Answer with the first page of a result set and cache it for the page buttons"""
+        token = self.result_pages.put(result_set)
+        text, markup = render_page(result_set, page_size=PAGE_SIZE, token=token)
+        await update.message.reply_text(text, parse_mode='HTML', reply_markup=markup,
+                                        disable_web_page_preview=True)
+
+    @tracing.traced(root=True)
+    @profiling.profiled()
     async def favgames_command(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
         """Handler for /favgames Command - shows upcoming games for favorite teams"""
         user_id = update.effective_user.id
-        favorites = db.get_favorites(user_id)
+        favorites = self.db.get_favorites(user_id)
         
         if not favorites:
             await update.message.reply_text(
@@ -378,8 +846,10 @@ class TelegramBot:
         
         await update.message.reply_text("🔍 Searching for upcoming games...")
         
+        # Read before the matches: if they are replaced meanwhile, the next call recomputes
+        generation = self.scraper.get_matches_generation()
         # Get all upcoming matches (HLTV shows only future matches)
-        matches = scraper.get_todays_matches(min_stars=0)
+        matches = await profiling.to_thread(self.scraper.get_todays_matches, min_stars=0)
         
         if not matches:
             await update.message.reply_text(
@@ -387,14 +857,16 @@ class TelegramBot:
             )
             return
         
-        # Find matches for each favorite team
-        team_games = {}
-        for team in favorites:
-            team_matches = [m for m in matches if m.has_team(team)]
-            if team_matches:
-                # Sort by time and get the next match
-                team_matches.sort(key=lambda m: m.time if m.time else datetime.max)
-                team_games[team] = team_matches[0]
+        # Same favorites and same match snapshot: the next matches are still the same
+        key = (tuple(favorites), generation)
+        cached = self.favgames_cache.get(user_id)
+        metrics.CACHE_LOOKUPS.inc(cache='favgames', result='hit' if cached and cached[0] == key else 'miss')
+        if cached and cached[0] == key:
+            team_games = cached[1]
+        else:
+            # Find matches for each favorite team (sorting may lazily fetch match times)
+            team_games = await profiling.to_thread(self._next_match_per_team, matches, favorites)
+            self._cache_favgames(user_id, key, team_games)
         
         if not team_games:
             await update.message.reply_text(
@@ -411,10 +883,37 @@ class TelegramBot:
         
         await update.message.reply_text(message, parse_mode='HTML', disable_web_page_preview=True)
 
+    def _cache_favgames(self, user_id: int, key: tuple, team_games: dict):
+        """Keep a user's /favgames view for its (favorites, matches generation) key
+        
+        A new generation drops all views of the previous one (and the matches
+        they hold on to); a view computed from an older one is not kept.
+        """
+        generation = key[1]
+        if generation > self._favgames_generation:
+            self.favgames_cache.clear()
+            self._favgames_generation = generation
+        if generation == self._favgames_generation:
+            self.favgames_cache[user_id] = (key, team_games)
+
+    @staticmethod
+    def _next_match_per_team(matches: List[Match], favorites: List[str]) -> dict:
+        """Find the next match of each favorite team (blocking, see matches_on_date)"""
+        team_games = {}
+        for team in favorites:
+            team_matches = [m for m in matches if m.has_team(team)]
+            if team_matches:
+                # Sort by time and get the next match
+                team_matches.sort(key=lambda m: m.time if m.time else datetime.max)
+                team_games[team] = team_matches[0]
+        return team_games
+
+    @tracing.traced(root=True)
+    @profiling.profiled()
     async def favorites_command(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
         """Handler for /favorites Command"""
         user_id = update.effective_user.id
-        favorites = db.get_favorites(user_id)
+        favorites = self.db.get_favorites(user_id)
         
         if not favorites:
             await update.message.reply_text(
@@ -429,6 +928,8 @@ class TelegramBot:
         
         await update.message.reply_text(message, parse_mode='HTML')
 
+    @tracing.traced(root=True)
+    @profiling.profiled()
     async def add_favorite_command(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
         """Handler for /add Command"""
         user_id = update.effective_user.id
@@ -440,7 +941,7 @@ class TelegramBot:
             # Search for team
             await update.message.reply_text(f"🔍 Searching for '{team_name}'...")
             
-            found, correct_name = scraper.search_team(team_name)
+            found, correct_name = self.scraper.search_team(team_name)
             if not found:
                 await update.message.reply_text(
                     f"❌ Team '{team_name}' not found.\n\n"
@@ -452,7 +953,8 @@ class TelegramBot:
                 )
                 return ConversationHandler.END
             
-            if db.add_favorite(user_id, correct_name):
+            if self.db.add_favorite(user_id, correct_name):
+                self.schedule_prematch_alerts(user_id)
                 await update.message.reply_text(
                     f"✅ {correct_name} has been added to your favorites!\n\n"
                     "You'll now be notified about all games and results of this team."
@@ -475,6 +977,8 @@ class TelegramBot:
             )
             return AWAITING_TEAM_NAME
 
+    @tracing.traced(root=True)
+    @profiling.profiled()
     async def add_favorite_finish(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
         """Finish Adding Favorites (bulk or single)"""
         user_id = update.effective_user.id
@@ -495,22 +999,27 @@ class TelegramBot:
         
         for team_name in team_names:
             # Search for team
-            found, correct_name = scraper.search_team(team_name)
+            found, correct_name = self.scraper.search_team(team_name)
             if not found:
                 results.append(f"❌ {team_name} - not found")
                 continue
             
-            if db.add_favorite(user_id, correct_name):
+            if self.db.add_favorite(user_id, correct_name):
                 results.append(f"✅ {correct_name} - added to favorites")
             else:
                 results.append(f"ℹ️ {correct_name} - already in favorites")
         
+        # Pick up pre-match alerts for the changed favorites
+        self.schedule_prematch_alerts(user_id)
+        
         # Send summary
         message = "<b>Results:</b>\n\n" + "\n".join(results)
         await update.message.reply_text(message, parse_mode='HTML')
         
         return ConversationHandler.END
 
+    @tracing.traced(root=True)
+    @profiling.profiled()
     async def remove_favorite_command(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
         """Handler for /remove Command"""
         user_id = update.effective_user.id
@@ -519,7 +1028,8 @@ class TelegramBot:
         if context.args and len(context.args) > 0:
             team_name = ' '.join(context.args).strip()
             
-            if db.remove_favorite(user_id, team_name):
+            if self.db.remove_favorite(user_id, team_name):
+                self.schedule_prematch_alerts(user_id)
                 await update.message.reply_text(
                     f"✅ {team_name} has been removed from your favorites."
                 )
@@ -530,7 +1040,7 @@ class TelegramBot:
             return ConversationHandler.END
         else:
             # Show current favorites and start conversation for bulk remove
-            favorites = db.get_favorites(user_id)
+            favorites = self.db.get_favorites(user_id)
             
             if not favorites:
                 await update.message.reply_text(
@@ -547,6 +1057,8 @@ class TelegramBot:
             await update.message.reply_text(message, parse_mode='HTML')
             return AWAITING_TEAM_NAME
 
+    @tracing.traced(root=True)
+    @profiling.profiled()
     async def remove_favorite_finish(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
         """Finish Removing Favorites (bulk or single)"""
         user_id = update.effective_user.id
@@ -566,43 +1078,70 @@ class TelegramBot:
         results = []
         
         for team_name in team_names:
-            if db.remove_favorite(user_id, team_name):
+            if self.db.remove_favorite(user_id, team_name):
                 results.append(f"✅ {team_name} - removed from favorites")
             else:
                 results.append(f"❌ {team_name} - was not in favorites")
         
+        # Pick up pre-match alerts for the changed favorites
+        self.schedule_prematch_alerts(user_id)
+        
         # Send summary
         message = "<b>Results:</b>\n\n" + "\n".join(results)
         await update.message.reply_text(message, parse_mode='HTML')
         
         return ConversationHandler.END
 
+    @tracing.traced(root=True)
+    @profiling.profiled()
     async def cancel(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
         """Handler for /cancel Command"""
         await update.message.reply_text("Action cancelled.")
         return ConversationHandler.END
 
+    @tracing.traced(root=True)
+    @profiling.profiled()
     async def button_callback(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
-        """Handler for inline button callbacks"""
+        """Handler for inline button callbacks (paging of /today and /alltoday)"""
         query = update.callback_query
+        paging = parse_callback(query.data or '')
+        if paging is None:
+            await query.answer()
+            return
+        
+        token, page, min_stars = paging
+        result_set = self.result_pages.get(token)
+        if result_set is None:
+            await query.answer("This list has expired. Run the command again for fresh matches.", show_alert=True)
+            return
         await query.answer()
+        
+        text, markup = render_page(result_set, page, min_stars, PAGE_SIZE, token)
+        try:
+            await query.edit_message_text(text, parse_mode='HTML', reply_markup=markup,
+                                          disable_web_page_preview=True)
+        except BadRequest as e:
+            if 'not modified' not in str(e).lower():
+                raise
 
+    @tracing.traced(root=True)
+    @profiling.profiled()
     async def send_daily_summary(self):
-        """Send daily summary to all users (respecting their min_stars setting)"""
-        logger.info("Sending daily summary at 9:00 AM...")
+        """Queue daily summary for all users (respecting their min_stars setting)"""
+        logger.info("Queueing daily summary...")
         
         # Send to all users who have set preferences or favorites
-        users = db.get_all_users_with_favorites()
+        users = self.db.get_all_users_with_favorites()
+        today = datetime.now().date()
         
         for user_id in users:
             try:
                 # Get user's min_stars setting
-                min_stars = db.get_min_stars(user_id)
+                min_stars = self.db.get_min_stars(user_id)
                 
                 # Get today's matches with user's min_stars
-                matches = scraper.get_todays_matches(min_stars=min_stars)
-                today = datetime.now().date()
-                today_matches = [m for m in matches if m.time and m.time.date() == today]
+                matches = await profiling.to_thread(self.scraper.get_todays_matches, min_stars=min_stars)
+                today_matches = await profiling.to_thread(matches_on_date, matches, today)
                 
                 if not today_matches:
                     continue
@@ -614,109 +1153,372 @@ class TelegramBot:
                 for match in today_matches[:15]:  # Max 15 matches
                     message += f"{match.format_for_telegram()}\n\n"
                 
-                await self.application.bot.send_message(
-                    chat_id=user_id,
-                    text=message,
-                    parse_mode='HTML',
-                    disable_web_page_preview=True
-                )
-                logger.info(f"Sent daily summary to user {user_id}")
+                # One summary per user and day, even if the job runs again after a restart
+                if self.db.enqueue_message(user_id, message, dedup_key=f"daily_summary:{user_id}:{today}"):
+                    logger.info(f"Queued daily summary for user {user_id}")
                 
             except Exception as e:
-                logger.error(f"Error sending daily summary to user {user_id}: {e}")
+                logger.error(f"Error queueing daily summary for user {user_id}: {e}")
 
+    @tracing.traced(root=True)
+    @profiling.profiled()
     async def check_match_results(self):
-        """Check results of favorite team matches"""
+        """Notify users about finished matches of their favorite teams"""
         logger.info("Checking match results...")
         
-        results = scraper.get_recent_results(hours=1)
+        if self.worker:
+            # Ingest new results into the results snapshot (None if HLTV failed)
+            await profiling.to_thread(self.worker.ingest_results)
+            self.worker.adjust_poll_interval(self.scheduler, 'check_results')
         
-        if not results:
+        # Notifications are derived from the results snapshot, whoever published it
+        snapshot = await profiling.to_thread(load_matches, self.db, RESULTS)
+        if snapshot is None or snapshot[0] == self._results_version:
             return
+        version, _, results = snapshot
+        
+        # New results changed the team form shown with every match
+        self.scraper.set_team_form(await profiling.to_thread(self.db.get_team_forms))
         
-        # For each user with favorites
-        users = db.get_all_users_with_favorites()
+        # Don't notify about old results (first run or after a long downtime)
+        notify_since = datetime.now() - timedelta(hours=RESULTS_NOTIFY_MAX_AGE_HOURS)
+        notify_results = [r for r in results if r._time is None or r._time >= notify_since]
+        
+        # For each user with favorites: one message with all their results of this cycle
+        users = self.db.get_all_users_with_favorites()
         for user_id in users:
-            favorites = db.get_favorites(user_id)
+            favorites = self.db.get_favorites(user_id)
             
             # Find matches with favorite teams
-            for result in results:
-                for team in favorites:
-                    if result.has_team(team):
-                        # Check if already sent
-                        if not db.was_notification_sent(user_id, result.match_id, 'result'):
-                            message = (
-                                f"🏁 <b>Match Finished!</b>\n\n"
-                                f"{result}\n\n"
-                                f"Your favorite team: {team}"
-                            )
-                            try:
-                                await self.application.bot.send_message(
-                                    chat_id=user_id,
-                                    text=message,
-                                    parse_mode='HTML'
-                                )
-                                db.mark_notification_sent(user_id, result.match_id, 'result')
-                            except Exception as e:
-                                logger.error(f"Error sending to user {user_id}: {e}")
+            pending = []
+            for result in notify_results:
+                team = next((t for t in favorites if result.has_team(t)), None)
+                if team:
+                    pending.append((result, team))
+            if not pending:
+                continue
+            
+            already_sent = self.db.get_sent_notifications(user_id, [r.match_id for r, _ in pending], 'result')
+            pending = [(r, team) for r, team in pending if r.match_id not in already_sent]
+            if not pending:
+                continue
+            
+            if len(pending) == 1:
+                header = "🏁 <b>Match Finished!</b>\n\n"
+            else:
+                header = f"🏁 <b>{len(pending)} Matches Finished!</b>\n\n"
+            parts = [f"{result}\n\nYour favorite team: {team}" for result, team in pending]
+            
+            # Split only at Telegram's length limit - each chunk carries its own matches
+            offset = 0
+            for message, count in split_message(header, parts):
+                chunk = pending[offset:offset + count]
+                offset += count
+                match_ids = [r.match_id for r, _ in chunk]
+                digest = hashlib.sha1(','.join(match_ids).encode()).hexdigest()[:16]
+                # Message and notification marks are written in one transaction
+                self.db.enqueue_message(
+                    user_id, message,
+                    dedup_key=f"results:{user_id}:{digest}",
+                    notifications=[(user_id, match_id, 'result') for match_id in match_ids]
+                )
+            logger.info(f"Queued {len(pending)} result notification(s) for user {user_id}")
+        
+        self._results_version = version
     
+    @tracing.traced(root=True)
+    @profiling.profiled()
+    async def deliver_outbox(self):
+        """Drain the outbox: send due messages, retry failures with exponential backoff"""
+        messages = self.db.claim_outbox_messages(OUTBOX_BATCH_SIZE, OUTBOX_LEASE_SECONDS)
+        
+        for message in messages:
+            try:
+                with metrics.TELEGRAM_SEND_SECONDS.time():
+                    await self.application.bot.send_message(
+                        chat_id=message['chat_id'],
+                        text=message['text'],
+                        parse_mode=message['parse_mode'],
+                        disable_web_page_preview=bool(message['disable_web_page_preview'])
+                    )
+                self.db.mark_outbox_sent(message['id'])
+                metrics.TELEGRAM_MESSAGES.inc(result='sent')
+            except RetryAfter as e:
+                # Flood control - wait as long as Telegram tells us
+                logger.warning(f"Flood control for chat {message['chat_id']}, retrying in {e.retry_after}s")
+                self.db.reschedule_outbox_message(message['id'], e.retry_after, str(e))
+                metrics.TELEGRAM_MESSAGES.inc(result='flood_control')
+            except (Forbidden, BadRequest) as e:
+                # User blocked the bot or message is invalid - retrying won't help
+                logger.error(f"Dropping message {message['id']} for chat {message['chat_id']}: {e}")
+                self.db.mark_outbox_failed(message['id'], str(e))
+                metrics.TELEGRAM_MESSAGES.inc(result='failed')
+            except Exception as e:
+                if message['attempts'] >= OUTBOX_MAX_ATTEMPTS:
+                    logger.error(f"Giving up on message {message['id']} after {message['attempts']} attempts: {e}")
+                    self.db.mark_outbox_failed(message['id'], str(e))
+                    metrics.TELEGRAM_MESSAGES.inc(result='failed')
+                else:
+                    metrics.TELEGRAM_MESSAGES.inc(result='retry')
+                    delay = min(OUTBOX_BASE_BACKOFF * 2 ** (message['attempts'] - 1), OUTBOX_MAX_BACKOFF)
+                    logger.warning(f"Error sending message {message['id']} to {message['chat_id']}, retrying in {delay}s: {e}")
+                    self.db.reschedule_outbox_message(message['id'], delay, str(e))
+    
+    @tracing.traced(root=True)
+    @profiling.profiled()
+    async def purge_outbox(self):
+        """Remove old delivered messages from the outbox"""
+        removed = self.db.purge_outbox(OUTBOX_RETENTION_DAYS)
+        if removed:
+            logger.info(f"Purged {removed} old outbox messages")
+    
+    @tracing.traced(root=True)
+    @profiling.profiled()
     async def refresh_match_cache(self):
-        """Refresh the match cache and preload datetimes for important matches"""
+        """Refresh the match snapshot, then (re)schedule pre-match alerts"""
         try:
-            logger.info("Refreshing match cache...")
-            # Force refresh by using use_cache=False
-            matches = scraper.get_todays_matches(min_stars=0, use_cache=False)
-            logger.info(f"Cache refreshed with {len(matches)} matches")
+            if self.worker:
+                await profiling.to_thread(self.worker.refresh_matches)
+                self.worker.adjust_poll_interval(self.scheduler, 'check_results')
+            elif not await profiling.to_thread(self.scraper.sync, MATCHES):
+                return  # No new snapshot from the scraper worker
             
-            # Preload datetimes for important matches (1+ stars) to ensure they're cached
-            important_matches = [m for m in matches if m.stars >= 1]
-            if important_matches:
-                logger.info(f"Preloading datetimes for {len(important_matches)} important matches...")
-                scraper.preload_match_datetimes(important_matches, max_matches=20)
-                logger.info("Datetime preloading completed")
+            self.schedule_prematch_alerts()
         except Exception as e:
             logger.error(f"Error refreshing match cache: {e}")
     
+    def schedule_prematch_alerts(self, user_id: Optional[int] = None):
+        """(Re)schedule one-shot pre-match alert jobs from the cached match snapshot
+        
+        Only kickoff times that are already cached are used, so this never
+        causes HLTV requests. Jobs are moved when a kickoff time changes and
+        removed when the match or favorite is gone.
+        
+        Args:
+            user_id: Only reschedule this user's alerts (after they changed their
+                     favorites or lead time). The refresh job rescans all users.
+        """
+        matches = self.scraper.get_cached_matches()
+        now = datetime.now().astimezone()
+        user_ids = [user_id] if user_id is not None else self.db.get_all_users_with_favorites()
+        wanted = {}
+        
+        for uid in user_ids:
+            lead_minutes = self.db.get_alert_lead(uid)
+            if lead_minutes <= 0:
+                continue
+            favorites = self.db.get_favorites(uid)
+            if not favorites:
+                continue
+            
+            for match in matches:
+                team = next((t for t in favorites if match.has_team(t)), None)
+                if team is None:
+                    continue
+                kickoff = self.scraper.get_cached_match_time(match)
+                if kickoff is None:
+                    continue
+                kickoff = kickoff.astimezone()  # naive local time -> aware
+                if kickoff <= now:
+                    continue
+                # If we're already inside the lead window, alert right away
+                run_date = max(kickoff - timedelta(minutes=lead_minutes), now + timedelta(seconds=1))
+                wanted[f"prematch:{uid}:{match.match_id}"] = (run_date, uid, match.match_id, team)
+        
+        # Drop alerts that are no longer wanted
+        prefix = 'prematch:' if user_id is None else f"prematch:{user_id}:"
+        for job in self.scheduler.get_jobs():
+            if job.id.startswith(prefix) and job.id not in wanted:
+                job.remove()
+        
+        scheduled = 0
+        for job_id, (run_date, uid, match_id, team) in wanted.items():
+            if self.db.was_notification_sent(uid, match_id, 'prematch'):
+                continue
+            job = self.scheduler.get_job(job_id)
+            if job is None:
+                self.scheduler.add_job(
+                    self.send_prematch_alert,
+                    'date',
+                    run_date=run_date,
+                    args=[uid, match_id, team],
+                    id=job_id,
+                    misfire_grace_time=300
+                )
+                scheduled += 1
+            elif job.next_run_time != run_date:
+                # Kickoff time or lead time changed
+                job.reschedule('date', run_date=run_date)
+                scheduled += 1
+        
+        if scheduled:
+            logger.info(f"Scheduled {scheduled} pre-match alerts ({len(wanted)} total)")
+    
+    @tracing.traced(root=True)
+    @profiling.profiled()
+    async def send_prematch_alert(self, user_id: int, match_id: str, team: str):
+        """Queue a pre-match alert for a user"""
+        match = next((m for m in self.scraper.get_cached_matches() if m.match_id == match_id), None)
+        if match is None:
+            return
+        
+        kickoff = self.scraper.get_cached_match_time(match)
+        minutes_left = max(0, int((kickoff - datetime.now()).total_seconds() // 60)) if kickoff else None
+        starts_in = f"in {minutes_left} minutes" if minutes_left else "now"
+        
+        message = (
+            f"⏰ <b>Match starting {starts_in}!</b>\n\n"
+            f"{match.format_for_telegram()}\n\n"
+            f"Your favorite team: {team}"
+        )
+        self.db.enqueue_message(
+            user_id, message,
+            dedup_key=f"prematch:{user_id}:{match_id}",
+            notifications=[(user_id, match_id, 'prematch')]
+        )
+    
+    @tracing.traced(root=True)
+    @profiling.profiled()
+    async def refresh_schedule(self):
+        """Refetch the due days of the week-ahead schedule index"""
+        try:
+            await profiling.to_thread(self.worker.refresh_schedule)
+        except Exception as e:
+            logger.error(f"Error refreshing schedule: {e}")
+
+    @tracing.traced(root=True)
+    @profiling.profiled()
     async def load_teams(self):
         """Load/refresh the team list from HLTV and update database"""
         try:
-            logger.info("Loading team list from HLTV...")
-            teams = scraper.get_all_teams(use_cache=False)
-            
-            if teams:
-                logger.info(f"Loaded {len(teams)} teams from HLTV into database")
-            else:
-                logger.warning("HLTV scraping failed - no teams loaded. Team validation will not work until teams are loaded.")
+            await profiling.to_thread(self.worker.refresh_teams)
         except Exception as e:
             logger.error(f"Error loading team list: {e}")
 
-    def run(self):
-        """Start the bot"""
-        logger.info("Starting bot...")
+    async def post_init(self, application: Application):
+        """Serve the last persisted snapshots right away and warm up in the background
+        
+        Nothing here waits for HLTV or Telegram, so polling/the webhook starts
+        as soon as the database was read.
+        """
+        if METRICS_PORT:
+            metrics.register_coalescing_stats(self.scraper)
+            metrics.start_http_server(METRICS_PORT, METRICS_ADDR)
+        
+        if self.loop_monitor:
+            self.loop_monitor.start()
+        
+        restored = await profiling.to_thread(self.restore_snapshots)
+        
         self.scheduler.start()
+        if restored:
+            self.schedule_prematch_alerts()
         
-        # Load teams and cache immediately on startup (synchronously before starting polling)
-        import asyncio
-        loop = asyncio.get_event_loop()
+        # One background warmup instead of blocking startup
+        self.scheduler.add_job(
+            self.startup_warmup,
+            'date',
+            run_date=datetime.now(self.scheduler.timezone),
+            id='startup_warmup',
+            misfire_grace_time=None
+        )
         
-        # Set bot commands
-        loop.run_until_complete(self.setup_bot_commands())
+        self.startup_metrics['ready'] = time.monotonic() - PROCESS_START
+        metrics.STARTUP_SECONDS.set(self.startup_metrics['ready'], phase='ready')
+        logger.info(f"Bot ready after {self.startup_metrics['ready']:.2f}s "
+                    f"(restored snapshots: {', '.join(restored) or 'none'})")
+    
+    async def post_shutdown(self, application: Application):
+        """Stop scheduled jobs and the loop monitor together with the application"""
+        if self.loop_monitor:
+            self.loop_monitor.stop()
+        if self.scheduler.running:
+            self.scheduler.shutdown(wait=False)
+    
+    def restore_snapshots(self) -> List[str]:
+        """Load the persisted snapshots and team form into the scraper cache"""
+        try:
+            self.scraper.set_team_form(self.db.get_team_forms())
+            if self.worker:
+                return list(restore_snapshots(self.db, self.scraper))
+            return [kind for kind in (MATCHES, RESULTS, SCHEDULE) if self.scraper.sync(kind)]
+        except Exception as e:
+            logger.error(f"Error restoring snapshots: {e}")
+            return []
+    
+    @tracing.traced(root=True)
+    @profiling.profiled()
+    async def startup_warmup(self):
+        """Register bot commands and refresh matches and teams once after startup"""
+        try:
+            await self.setup_bot_commands()
+        except Exception as e:
+            logger.error(f"Error setting bot commands: {e}")
         
-        # Load teams immediately
-        loop.run_until_complete(self.load_teams())
+        # Matches first - the team refresh reuses the fresh match snapshot
+        await self.refresh_match_cache()
         
-        # Refresh match cache
-        loop.run_until_complete(self.refresh_match_cache())
+        # A separate scraper worker loads teams and the schedule itself
+        if self.worker:
+            await self.load_teams()
+            await self.refresh_schedule()
+        logger.info(f"Startup warmup completed after {time.monotonic() - PROCESS_START:.2f}s")
+    
+    async def record_first_response(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
+        """Record the time from process start until the first update was answered"""
+        if 'first_response' in self.startup_metrics:
+            return
+        self.startup_metrics['first_response'] = time.monotonic() - PROCESS_START
+        metrics.STARTUP_SECONDS.set(self.startup_metrics['first_response'], phase='first_response')
+        logger.info(f"Time to first response: {self.startup_metrics['first_response']:.2f}s")
+
+    def run(self):
+        """Start the bot"""
+        logger.info("Starting bot...")
         
-        self.application.run_polling(allowed_updates=Update.ALL_TYPES)
+        if BOT_MODE == 'webhook':
+            # Telegram pushes updates to our own HTTP listener - several replicas
+            # can run behind a load balancer
+            logger.info(f"Starting webhook listener on {WEBHOOK_LISTEN}:{WEBHOOK_PORT}/{WEBHOOK_PATH}")
+            self.application.run_webhook(
+                listen=WEBHOOK_LISTEN,
+                port=WEBHOOK_PORT,
+                url_path=WEBHOOK_PATH,
+                webhook_url=WEBHOOK_URL,
+                secret_token=WEBHOOK_SECRET,
+                allowed_updates=ALLOWED_UPDATES,
+                max_connections=WEBHOOK_MAX_CONNECTIONS
+            )
+        else:
+            self.application.run_polling(allowed_updates=ALLOWED_UPDATES)
 
 
 def main():
     """Main function"""
+    # Logging konfigurieren
+    logging.basicConfig(
+        format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
+        level=logging.INFO
+    )
+    # The outbox job runs every few seconds - don't log every run
+    logging.getLogger('apscheduler.executors.default').setLevel(logging.WARNING)
+    
     if not TELEGRAM_BOT_TOKEN:
         logger.error("TELEGRAM_BOT_TOKEN not set! Please create .env file.")
         return
     
+    if BOT_MODE not in ('polling', 'webhook'):
+        logger.error(f"Unknown BOT_MODE '{BOT_MODE}' (use 'polling' or 'webhook')")
+        return
+    
+    if SCRAPER_MODE not in ('embedded', 'external'):
+        logger.error(f"Unknown SCRAPER_MODE '{SCRAPER_MODE}' (use 'embedded' or 'external')")
+        return
+    
+    if BOT_MODE == 'webhook' and not WEBHOOK_URL:
+        logger.error("BOT_MODE=webhook requires WEBHOOK_URL")
+        return
+    
     bot = TelegramBot()
     bot.run()
 
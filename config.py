@@ -39,3 +39,101 @@ DATABASE_PATH = os.getenv('DATABASE_PATH', 'data/bot_data.db')
 
 # Match Wichtigkeit (Sterne auf HLTV)
 MIN_STARS_FOR_IMPORTANT = 1  # At least 1 star for "important" matches
+
+# Outbox (persistent queue for outgoing Telegram messages)
+OUTBOX_POLL_SECONDS = int(os.getenv('OUTBOX_POLL_SECONDS', '2'))  # How often the delivery worker drains the queue
+OUTBOX_BATCH_SIZE = 20  # Max messages per delivery run
+OUTBOX_MAX_ATTEMPTS = 8  # Give up after this many failed attempts
+OUTBOX_BASE_BACKOFF = 5  # Seconds, doubled after every failed attempt
+OUTBOX_MAX_BACKOFF = 3600  # Upper bound for the retry delay
+OUTBOX_LEASE_SECONDS = 60  # Claimed messages are retried after this if the process died while sending
+OUTBOX_RETENTION_DAYS = 7  # Delivered/failed messages are purged after this
+
+# Pre-match alerts
+MAX_ALERT_LEAD_MINUTES = 180  # Upper bound for /setalert
+
+# Adaptive result polling
+LIVE_POLL_MINUTES = max(1, int(os.getenv('LIVE_POLL_MINUTES', '3')))  # While a followed match is live (never below 1 min)
+IDLE_POLL_MINUTES = int(os.getenv('IDLE_POLL_MINUTES', '60'))  # While no followed match is live or imminent
+LIVE_IMMINENT_MINUTES = 15  # Matches starting within this window count as live
+LIVE_MAX_MATCH_HOURS = 4  # A started match is assumed to be over after this
+
+# Incremental results ingestion
+RESULTS_PAGE_SIZE = 100  # Results per /results?offset= page on HLTV
+RESULTS_MAX_PAGES = 10  # Safety limit for pages fetched per cycle
+RESULTS_NOTIFY_MAX_AGE_HOURS = 12  # Don't notify about results older than this (e.g. after long downtime)
+
+# Stale-while-revalidate snapshots (seconds)
+# Older than the fresh time: served immediately and refreshed in the background.
+# Older than the max staleness: never served, callers wait for a fresh fetch.
+MATCHES_MAX_STALENESS = 6 * 3600
+RESULTS_CACHE_SECONDS = 300
+RESULTS_MAX_STALENESS = 2 * 3600
+DATETIME_CACHE_HOURS = 24  # Kickoff times are forgotten this long after the match started
+
+# Update ingestion: 'polling' (default, single process) or 'webhook'
+BOT_MODE = os.getenv('BOT_MODE', 'polling').lower()
+WEBHOOK_URL = os.getenv('WEBHOOK_URL')  # Public URL Telegram posts updates to, e.g. https://bot.example.com/telegram
+WEBHOOK_LISTEN = os.getenv('WEBHOOK_LISTEN', '0.0.0.0')
+WEBHOOK_PORT = int(os.getenv('WEBHOOK_PORT', '8443'))
+WEBHOOK_PATH = os.getenv('WEBHOOK_PATH', 'telegram')
+WEBHOOK_SECRET = os.getenv('WEBHOOK_SECRET')  # Checked against the secret token header of every update
+WEBHOOK_MAX_CONNECTIONS = int(os.getenv('WEBHOOK_MAX_CONNECTIONS', '40'))  # Parallel connections Telegram may open
+MAX_CONCURRENT_UPDATES = int(os.getenv('MAX_CONCURRENT_UPDATES', '8'))  # Updates processed in parallel per process
+TELEGRAM_API_BASE_URL = os.getenv('TELEGRAM_API_BASE_URL', 'https://api.telegram.org/bot')  # Point to a local fake server for tests
+
+# Scraping: 'embedded' (the bot scrapes HLTV itself) or 'external' (a separate
+# scraper_worker.py process scrapes and the bot only reads its snapshots)
+SCRAPER_MODE = os.getenv('SCRAPER_MODE', 'embedded').lower()
+SNAPSHOT_POLL_SECONDS = int(os.getenv('SNAPSHOT_POLL_SECONDS', '60'))  # How often external-mode bots check for new snapshots
+RESULTS_SNAPSHOT_HOURS = 48  # Ingested results are kept in the results snapshot this long
+RESULTS_SNAPSHOT_MAX = 500  # Upper bound for results in the snapshot
+
+# Prometheus metrics endpoint (http://METRICS_ADDR:METRICS_PORT/metrics), 0 = disabled
+METRICS_PORT = int(os.getenv('METRICS_PORT', '0'))
+METRICS_ADDR = os.getenv('METRICS_ADDR', '127.0.0.1')  # Local only by default
+
+# Event loop watchdog: report the handler/job blocking the loop longer than this (0 = disabled)
+LOOP_LAG_THRESHOLD_MS = int(os.getenv('LOOP_LAG_THRESHOLD_MS', '250'))
+
+# Request tracing: fraction of handler/job runs recorded as traces (0 = off, 1 = all)
+TRACE_SAMPLE_RATE = float(os.getenv('TRACE_SAMPLE_RATE', '0'))
+TRACE_FILE = os.getenv('TRACE_FILE', os.path.join(os.path.dirname(DATABASE_PATH) or '.', 'traces.jsonl'))
+TRACE_FILE_MAX_BYTES = 50 * 1024 * 1024  # Rotated to TRACE_FILE.1 beyond this size
+
+# Opt-in cProfile profiling of handlers/jobs (comma-separated names or 'all', empty = off)
+PROFILE_TARGETS = os.getenv('PROFILE_TARGETS', '')
+PROFILE_SAMPLE_RATE = float(os.getenv('PROFILE_SAMPLE_RATE', '1'))  # Fraction of target runs profiled
+PROFILE_DIR = os.getenv('PROFILE_DIR', os.path.join(os.path.dirname(DATABASE_PATH) or '.', 'profiles'))
+PROFILE_KEEP = int(os.getenv('PROFILE_KEEP', '20'))  # Newest profiles kept on disk
+
+# Telegram user IDs allowed to use admin commands (/profile), comma-separated
+ADMIN_USER_IDS = {int(user_id) for user_id in os.getenv('ADMIN_USER_IDS', '').split(',') if user_id.strip()}
+
+# Progressive /today: edit the first answer in place as match times resolve
+TODAY_MAX_EDITS = 5  # Edits per /today, including the final one
+TODAY_EDIT_INTERVAL = 1.5  # Minimum seconds between edits of the same message
+TODAY_RESOLVE_BATCH = 3  # Match times looked up between two edits
+
+# Paged /today and /alltoday: result sets are cached per query so the inline buttons never scrape again
+PAGE_SIZE = 8  # Matches per page
+RESULT_PAGES_TTL_MINUTES = 30  # Buttons of older messages ask to run the command again
+RESULT_PAGES_MAX = 500  # Cached result sets, least recently used are dropped first
+
+# Week-ahead schedule index (/week, /favweek), kept by the scraper from HLTV's per-day match pages
+SCHEDULE_DAYS = 7  # Today and the following days
+SCHEDULE_CHECK_MINUTES = 15  # How often days that are due get refetched
+SCHEDULE_REFRESH_MINUTES = (30, 120, 360, 360, 720)  # Refresh interval by days ahead (the last one for all later days)
+
+# Results archive (/history)
+HISTORY_LIMIT = 10  # Results shown per /history
+
+# Team form (/form, shown with every match), updated incrementally as results are archived
+FORM_LENGTH = 5  # Recent results in the form string, e.g. WWLWL
+FORM_RANKED_TOP = 30  # Opponents ranked this high or better count as ranked
+
+# Raw HLTV page store: every fetched page, gzip-compressed and deduplicated by content hash,
+# so parsers can be fixed and re-run offline (python page_store.py reparse)
+PAGE_STORE_DIR = os.getenv('PAGE_STORE_DIR', os.path.join(os.path.dirname(DATABASE_PATH) or '.', 'pages'))
+PAGE_STORE_MAX_MB = int(os.getenv('PAGE_STORE_MAX_MB', '200'))  # Compressed size cap, 0 = don't store pages
+PAGE_STORE_RETENTION_DAYS = int(os.getenv('PAGE_STORE_RETENTION_DAYS', '14'))
@@ -1,18 +1,69 @@
 import sqlite3
-from typing import List, Set
+import time
+from typing import Callable, List, Set, Optional, Iterable, Tuple, Dict
 import logging
 
+from config import FORM_LENGTH, FORM_RANKED_TOP
+import metrics
+import tracing
+
 logger = logging.getLogger(__name__)
 
 
+def parse_score(score: Optional[str]) -> Optional[Tuple[int, int]]:
+    """Score like '2-1' or '16-14' as integers (None for e.g. forfeits)"""
+    try:
+        first, second = (int(part) for part in (score or '').split('-'))
+        return first, second
+    except ValueError:
+        return None
+
+
+def map_score(first: int, second: int) -> Tuple[int, int]:
+    """Maps won by each side - a best-of-one result is given in rounds (e.g. 16-14)"""
+    if max(first, second) > 3:
+        return int(first > second), int(second > first)
+    return first, second
+
+
+class MeteredCursor(sqlite3.Cursor):
+    """Cursor recording count and latency (and a trace span) of every statement"""
+
+    @staticmethod
+    def _statement(sql: str) -> str:
+        words = sql.split(None, 1)
+        return words[0].upper() if words else 'EMPTY'
+
+    def execute(self, sql, parameters=()):
+        statement = self._statement(sql)
+        with tracing.span(f'db.{statement}', sql=sql.strip()[:200]), metrics.DB_QUERY_SECONDS.time(statement=statement):
+            return super().execute(sql, parameters)
+
+    def executemany(self, sql, seq_of_parameters):
+        statement = self._statement(sql)
+        with tracing.span(f'db.{statement}', sql=sql.strip()[:200]), metrics.DB_QUERY_SECONDS.time(statement=statement):
+            return super().executemany(sql, seq_of_parameters)
+
+
+class MeteredConnection(sqlite3.Connection):
+    """Connection handing out MeteredCursors"""
+
+    def cursor(self, factory=MeteredCursor):
+        return super().cursor(factory)
+
+
 class Database:
     def __init__(self, db_path: str):
         self.db_path = db_path
         self.init_db()
 
+    def _connect(self) -> sqlite3.Connection:
+        """Open a connection whose statements show up in the DB metrics"""
+        return sqlite3.connect(self.db_path, factory=MeteredConnection)
+
     def init_db(self):
         """Initialisiere die Datenbank mit notwendigen Tabellen"""
-        with sqlite3.connect(self.db_path) as conn:
+        with self._connect() as conn:
             cursor = conn.cursor()
             
             # Table for user favorites
@@ -28,10 +79,17 @@ class Database:
             cursor.execute('''
                 CREATE TABLE IF NOT EXISTS user_settings (
                     user_id INTEGER PRIMARY KEY,
-                    min_stars INTEGER DEFAULT 1
+                    min_stars INTEGER DEFAULT 1,
+                    alert_lead_minutes INTEGER DEFAULT 15
                 )
             ''')
             
+            # Migrate databases created before pre-match alerts existed
+            cursor.execute('PRAGMA table_info(user_settings)')
+            columns = {row[1] for row in cursor.fetchall()}
+            if 'alert_lead_minutes' not in columns:
+                cursor.execute('ALTER TABLE user_settings ADD COLUMN alert_lead_minutes INTEGER DEFAULT 15')
+            
             # Table for already sent notifications
             cursor.execute('''
                 CREATE TABLE IF NOT EXISTS notifications_sent (
@@ -51,13 +109,136 @@ class Database:
                 )
             ''')
             
+            # Results already processed by the incremental results ingestion
+            cursor.execute('''
+                CREATE TABLE IF NOT EXISTS seen_results (
+                    match_id TEXT PRIMARY KEY,
+                    seen_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+                )
+            ''')
+            
+            # Versioned snapshots published by the scraper (matches, results, teams)
+            cursor.execute('''
+                CREATE TABLE IF NOT EXISTS snapshots (
+                    kind TEXT PRIMARY KEY,
+                    version INTEGER NOT NULL,
+                    created_at REAL NOT NULL,
+                    payload TEXT NOT NULL
+                )
+            ''')
+            
+            # Archive of all ingested results (/history), one row per match
+            cursor.execute('''
+                CREATE TABLE IF NOT EXISTS results_archive (
+                    match_id TEXT PRIMARY KEY,
+                    team1 TEXT NOT NULL,
+                    team2 TEXT NOT NULL,
+                    event TEXT,
+                    played_at REAL,
+                    score TEXT,
+                    stars INTEGER DEFAULT 0,
+                    match_url TEXT
+                )
+            ''')
+            cursor.execute(
+                'CREATE INDEX IF NOT EXISTS idx_results_team1 ON results_archive (team1 COLLATE NOCASE, played_at)'
+            )
+            cursor.execute(
+                'CREATE INDEX IF NOT EXISTS idx_results_team2 ON results_archive (team2 COLLATE NOCASE, played_at)'
+            )
+            cursor.execute(
+                'CREATE INDEX IF NOT EXISTS idx_results_event ON results_archive (event COLLATE NOCASE, played_at)'
+            )
+            cursor.execute(
+                'CREATE INDEX IF NOT EXISTS idx_results_played_at ON results_archive (played_at)'
+            )
+            
+            # Current HLTV ranking (for form against ranked opponents)
+            cursor.execute('''
+                CREATE TABLE IF NOT EXISTS team_rankings (
+                    team_name TEXT PRIMARY KEY,
+                    rank INTEGER NOT NULL
+                )
+            ''')
+            
+            # Form per team, updated incrementally by archive_results
+            # recent: last FORM_LENGTH outcomes (W/L/D), newest first
+            cursor.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'team_form'")
+            rebuild_form = cursor.fetchone() is None
+            cursor.execute('''
+                CREATE TABLE IF NOT EXISTS team_form (
+                    team TEXT PRIMARY KEY COLLATE NOCASE,
+                    wins INTEGER DEFAULT 0,
+                    losses INTEGER DEFAULT 0,
+                    draws INTEGER DEFAULT 0,
+                    maps_won INTEGER DEFAULT 0,
+                    maps_lost INTEGER DEFAULT 0,
+                    ranked_wins INTEGER DEFAULT 0,
+                    ranked_matches INTEGER DEFAULT 0,
+                    recent TEXT DEFAULT '',
+                    last_played_at REAL
+                )
+            ''')
+            if rebuild_form:
+                # Results archived before team form existed
+                cursor.execute(
+                    'SELECT match_id, team1, team2, event, played_at, score, stars, match_url FROM results_archive'
+                )
+                self._update_team_form(cursor, cursor.fetchall())
+            
+            # Raw page store (see page_store.py): one row per distinct page content,
+            # one row per fetch referring to it
+            cursor.execute('''
+                CREATE TABLE IF NOT EXISTS page_blobs (
+                    sha256 TEXT PRIMARY KEY,
+                    size INTEGER NOT NULL,
+                    stored_size INTEGER NOT NULL,
+                    created_at REAL NOT NULL
+                )
+            ''')
+            cursor.execute('''
+                CREATE TABLE IF NOT EXISTS page_fetches (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    endpoint TEXT NOT NULL,
+                    url TEXT NOT NULL,
+                    fetched_at REAL NOT NULL,
+                    sha256 TEXT NOT NULL
+                )
+            ''')
+            cursor.execute(
+                'CREATE INDEX IF NOT EXISTS idx_page_fetches_endpoint ON page_fetches (endpoint, fetched_at)'
+            )
+            cursor.execute('CREATE INDEX IF NOT EXISTS idx_page_fetches_sha256 ON page_fetches (sha256)')
+            
+            # Outbox for outgoing Telegram messages (delivered by a separate worker)
+            # status: pending -> sending -> sent | failed
+            cursor.execute('''
+                CREATE TABLE IF NOT EXISTS outbox (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    dedup_key TEXT UNIQUE,
+                    chat_id INTEGER NOT NULL,
+                    text TEXT NOT NULL,
+                    parse_mode TEXT,
+                    disable_web_page_preview INTEGER DEFAULT 1,
+                    status TEXT DEFAULT 'pending',
+                    attempts INTEGER DEFAULT 0,
+                    next_attempt_at REAL DEFAULT 0,
+                    last_error TEXT,
+                    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                    sent_at TIMESTAMP
+                )
+            ''')
+            cursor.execute(
+                'CREATE INDEX IF NOT EXISTS idx_outbox_due ON outbox (status, next_attempt_at)'
+            )
+            
             conn.commit()
             logger.info("Datenbank initialisiert")
 
     def add_favorite(self, user_id: int, team_name: str) -> bool:
         """Add a favorite team"""
         try:
-            with sqlite3.connect(self.db_path) as conn:
+            with self._connect() as conn:
                 cursor = conn.cursor()
                 cursor.execute(
                     'INSERT OR IGNORE INTO favorites (user_id, team_name) VALUES (?, ?)',
@@ -72,7 +253,7 @@ class Database:
     def remove_favorite(self, user_id: int, team_name: str) -> bool:
         """Remove a favorite team"""
         try:
-            with sqlite3.connect(self.db_path) as conn:
+            with self._connect() as conn:
                 cursor = conn.cursor()
                 cursor.execute(
                     'DELETE FROM favorites WHERE user_id = ? AND team_name = ?',
@@ -87,7 +268,7 @@ class Database:
     def get_favorites(self, user_id: int) -> List[str]:
         """Hole alle Favoriten eines Benutzers"""
         try:
-            with sqlite3.connect(self.db_path) as conn:
+            with self._connect() as conn:
                 cursor = conn.cursor()
                 cursor.execute(
                     'SELECT team_name FROM favorites WHERE user_id = ? ORDER BY team_name',
@@ -101,7 +282,7 @@ class Database:
     def get_all_users_with_favorites(self) -> Set[int]:
         """Hole alle User-IDs, die Favoriten haben"""
         try:
-            with sqlite3.connect(self.db_path) as conn:
+            with self._connect() as conn:
                 cursor = conn.cursor()
                 cursor.execute('SELECT DISTINCT user_id FROM favorites')
                 return {row[0] for row in cursor.fetchall()}
@@ -112,7 +293,7 @@ class Database:
     def mark_notification_sent(self, user_id: int, match_id: str, notification_type: str):
         """Mark a notification as sent"""
         try:
-            with sqlite3.connect(self.db_path) as conn:
+            with self._connect() as conn:
                 cursor = conn.cursor()
                 cursor.execute(
                     'INSERT OR IGNORE INTO notifications_sent (user_id, match_id, notification_type) VALUES (?, ?, ?)',
@@ -125,7 +306,7 @@ class Database:
     def was_notification_sent(self, user_id: int, match_id: str, notification_type: str) -> bool:
         """Check if a notification was already sent"""
         try:
-            with sqlite3.connect(self.db_path) as conn:
+            with self._connect() as conn:
                 cursor = conn.cursor()
                 cursor.execute(
                     'SELECT 1 FROM notifications_sent WHERE user_id = ? AND match_id = ? AND notification_type = ?',
@@ -136,13 +317,33 @@ class Database:
             logger.error(f"Error checking notification: {e}")
             return False
 
+    def get_sent_notifications(self, user_id: int, match_ids: Iterable[str], notification_type: str) -> Set[str]:
+        """Return the subset of match IDs a notification was already sent for"""
+        match_ids = list(match_ids)
+        if not match_ids:
+            return set()
+        try:
+            with self._connect() as conn:
+                cursor = conn.cursor()
+                placeholders = ','.join('?' * len(match_ids))
+                cursor.execute(
+                    f'SELECT match_id FROM notifications_sent WHERE user_id = ? AND notification_type = ? '
+                    f'AND match_id IN ({placeholders})',
+                    [user_id, notification_type, *match_ids]
+                )
+                return {row[0] for row in cursor.fetchall()}
+        except Exception as e:
+            logger.error(f"Error checking notifications: {e}")
+            return set()
+
     def set_min_stars(self, user_id: int, min_stars: int):
         """Set minimum stars for a user"""
         try:
-            with sqlite3.connect(self.db_path) as conn:
+            with self._connect() as conn:
                 cursor = conn.cursor()
                 cursor.execute(
-                    'INSERT OR REPLACE INTO user_settings (user_id, min_stars) VALUES (?, ?)',
+                    'INSERT INTO user_settings (user_id, min_stars) VALUES (?, ?) '
+                    'ON CONFLICT(user_id) DO UPDATE SET min_stars = excluded.min_stars',
                     (user_id, min_stars)
                 )
                 conn.commit()
@@ -152,7 +353,7 @@ class Database:
     def get_min_stars(self, user_id: int) -> int:
         """Get minimum stars for a user (default: 1)"""
         try:
-            with sqlite3.connect(self.db_path) as conn:
+            with self._connect() as conn:
                 cursor = conn.cursor()
                 cursor.execute(
                     'SELECT min_stars FROM user_settings WHERE user_id = ?',
@@ -164,10 +365,39 @@ class Database:
             logger.error(f"Error getting min_stars: {e}")
             return 1
 
+    def set_alert_lead(self, user_id: int, minutes: int):
+        """Set how many minutes before kickoff a user gets pre-match alerts (0 = off)"""
+        try:
+            with self._connect() as conn:
+                cursor = conn.cursor()
+                cursor.execute(
+                    'INSERT INTO user_settings (user_id, alert_lead_minutes) VALUES (?, ?) '
+                    'ON CONFLICT(user_id) DO UPDATE SET alert_lead_minutes = excluded.alert_lead_minutes',
+                    (user_id, minutes)
+                )
+                conn.commit()
+        except Exception as e:
+            logger.error(f"Error setting alert lead time: {e}")
+
+    def get_alert_lead(self, user_id: int) -> int:
+        """Get pre-match alert lead time in minutes for a user (default: 15)"""
+        try:
+            with self._connect() as conn:
+                cursor = conn.cursor()
+                cursor.execute(
+                    'SELECT alert_lead_minutes FROM user_settings WHERE user_id = ?',
+                    (user_id,)
+                )
+                result = cursor.fetchone()
+                return result[0] if result and result[0] is not None else 15
+        except Exception as e:
+            logger.error(f"Error getting alert lead time: {e}")
+            return 15
+
     def update_valid_teams(self, teams: Set[str]):
         """Update the list of valid teams in database"""
         try:
-            with sqlite3.connect(self.db_path) as conn:
+            with self._connect() as conn:
                 cursor = conn.cursor()
                 # Clear old teams
                 cursor.execute('DELETE FROM valid_teams')
@@ -184,7 +414,7 @@ class Database:
     def get_valid_teams(self) -> Set[str]:
         """Get all valid teams from database"""
         try:
-            with sqlite3.connect(self.db_path) as conn:
+            with self._connect() as conn:
                 cursor = conn.cursor()
                 cursor.execute('SELECT team_name FROM valid_teams')
                 return {row[0] for row in cursor.fetchall()}
@@ -195,7 +425,7 @@ class Database:
     def is_valid_team(self, team_name: str) -> bool:
         """Check if a team is in the valid teams list"""
         try:
-            with sqlite3.connect(self.db_path) as conn:
+            with self._connect() as conn:
                 cursor = conn.cursor()
                 cursor.execute(
                     'SELECT 1 FROM valid_teams WHERE team_name = ? COLLATE NOCASE',
@@ -205,3 +435,521 @@ class Database:
         except Exception as e:
             logger.error(f"Error checking valid team: {e}")
             return False
+
+
+    def has_seen_results(self) -> bool:
+        """Check if any results were ingested before"""
+        try:
+            with self._connect() as conn:
+                cursor = conn.cursor()
+                cursor.execute('SELECT 1 FROM seen_results LIMIT 1')
+                return cursor.fetchone() is not None
+        except Exception as e:
+            logger.error(f"Error checking seen results: {e}")
+            return False
+
+    def get_seen_result_ids(self, match_ids: Iterable[str]) -> Set[str]:
+        """Return the subset of match IDs that were already ingested"""
+        match_ids = list(match_ids)
+        if not match_ids:
+            return set()
+        try:
+            with self._connect() as conn:
+                cursor = conn.cursor()
+                placeholders = ','.join('?' * len(match_ids))
+                cursor.execute(
+                    f'SELECT match_id FROM seen_results WHERE match_id IN ({placeholders})',
+                    match_ids
+                )
+                return {row[0] for row in cursor.fetchall()}
+        except Exception as e:
+            logger.error(f"Error retrieving seen results: {e}")
+            return set()
+
+    def mark_results_seen(self, match_ids: Iterable[str]):
+        """Advance the results high-water mark"""
+        try:
+            with self._connect() as conn:
+                cursor = conn.cursor()
+                cursor.executemany(
+                    'INSERT OR IGNORE INTO seen_results (match_id) VALUES (?)',
+                    [(match_id,) for match_id in match_ids]
+                )
+                conn.commit()
+        except Exception as e:
+            logger.error(f"Error marking results as seen: {e}")
+
+    def archive_results(self, results: Iterable[Dict]) -> bool:
+        """Insert or update results in the archive (dicts as from Match.to_dict)
+        
+        Idempotent: a result ingested twice stays one row, with the latest data,
+        and only counts once towards team form (updated in the same transaction).
+        
+        Returns:
+            True if all results were written
+        """
+        # One row per match, even if it came twice (e.g. on two overlapping pages)
+        rows = list({
+            r['match_id']: (r['match_id'], r['team1'], r['team2'], r['event'], r['time'], r['score'],
+                            r['stars'], r['match_url'])
+            for r in results
+        }.values())
+        try:
+            with self._connect() as conn:
+                cursor = conn.cursor()
+                # Only results that are new to the archive count towards team form
+                known = set()
+                for i in range(0, len(rows), 500):
+                    chunk = [row[0] for row in rows[i:i + 500]]
+                    cursor.execute(
+                        f'SELECT match_id FROM results_archive WHERE match_id IN ({",".join("?" * len(chunk))})',
+                        chunk
+                    )
+                    known.update(row[0] for row in cursor.fetchall())
+                
+                cursor.executemany(
+                    'INSERT INTO results_archive '
+                    '(match_id, team1, team2, event, played_at, score, stars, match_url) '
+                    'VALUES (?, ?, ?, ?, ?, ?, ?, ?) '
+                    'ON CONFLICT(match_id) DO UPDATE SET team1 = excluded.team1, team2 = excluded.team2, '
+                    'event = excluded.event, played_at = COALESCE(excluded.played_at, played_at), '
+                    'score = excluded.score, stars = excluded.stars, '
+                    'match_url = COALESCE(excluded.match_url, match_url)',
+                    rows
+                )
+                self._update_team_form(cursor, [row for row in rows if row[0] not in known])
+                conn.commit()
+                return True
+        except Exception as e:
+            logger.error(f"Error archiving results: {e}")
+            return False
+
+    @staticmethod
+    def _update_team_form(cursor, rows: List[tuple]):
+        """Add newly archived results (rows as in archive_results) to the team_form aggregates
+        
+        Each result updates two rows in place, nothing is recomputed. The recent
+        form string follows results in order of play; results older than a
+        team's latest one (backfills) only fill up a form string that is still short.
+        """
+        cursor.execute('SELECT team_name FROM team_rankings WHERE rank <= ?', (FORM_RANKED_TOP,))
+        ranked = {row[0] for row in cursor.fetchall()}
+        
+        by_team = {}  # team (lower case) -> updates
+        for _, team1, team2, _, played_at, score, _, _ in rows:
+            parsed = parse_score(score)
+            if parsed is None:
+                continue
+            maps = map_score(*parsed)
+            for team, opponent, (own, other), (maps_won, maps_lost) in (
+                    (team1, team2, parsed, maps), (team2, team1, parsed[::-1], maps[::-1])):
+                outcome = 'W' if own > other else 'L' if own < other else 'D'
+                vs_ranked = opponent.lower() in ranked
+                by_team.setdefault(team.lower(), []).append((
+                    team, int(outcome == 'W'), int(outcome == 'L'), int(outcome == 'D'), maps_won, maps_lost,
+                    int(vs_ranked and outcome == 'W'), int(vs_ranked), outcome, played_at
+                ))
+        
+        latest = {}
+        teams = list(by_team)
+        for i in range(0, len(teams), 500):
+            chunk = teams[i:i + 500]
+            cursor.execute(
+                f'SELECT team, last_played_at FROM team_form WHERE team IN ({",".join("?" * len(chunk))})', chunk
+            )
+            latest.update((row[0].lower(), row[1] or 0) for row in cursor.fetchall())
+        
+        # Newer results are prepended oldest first, older ones (backfills) appended newest first
+        updates = []
+        for team, team_updates in by_team.items():
+            since = latest.get(team, 0)
+            newer = [u for u in team_updates if (u[9] or 0) >= since]
+            older = [u for u in team_updates if (u[9] or 0) < since]
+            updates += sorted(newer, key=lambda u: u[9] or 0)
+            updates += sorted(older, key=lambda u: u[9] or 0, reverse=True)
+        
+        cursor.executemany(
+            'INSERT INTO team_form (team, wins, losses, draws, maps_won, maps_lost, ranked_wins, '
+            'ranked_matches, recent, last_played_at) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?) '
+            'ON CONFLICT(team) DO UPDATE SET wins = wins + excluded.wins, losses = losses + excluded.losses, '
+            'draws = draws + excluded.draws, maps_won = maps_won + excluded.maps_won, '
+            'maps_lost = maps_lost + excluded.maps_lost, ranked_wins = ranked_wins + excluded.ranked_wins, '
+            'ranked_matches = ranked_matches + excluded.ranked_matches, '
+            'recent = CASE '
+            '  WHEN COALESCE(excluded.last_played_at, 0) >= COALESCE(last_played_at, 0) '
+            f'   THEN substr(excluded.recent || recent, 1, {FORM_LENGTH}) '
+            f'  WHEN length(recent) < {FORM_LENGTH} THEN recent || excluded.recent '
+            '  ELSE recent END, '
+            'last_played_at = MAX(COALESCE(last_played_at, 0), COALESCE(excluded.last_played_at, 0))',
+            updates
+        )
+
+    def get_team_forms(self) -> Dict[str, str]:
+        """Recent form of all teams as {team (lower case): 'WWLWL'}, for display with every match"""
+        try:
+            with self._connect() as conn:
+                cursor = conn.cursor()
+                cursor.execute("SELECT team, recent FROM team_form WHERE recent != ''")
+                return {row[0].lower(): row[1] for row in cursor.fetchall()}
+        except Exception as e:
+            logger.error(f"Error getting team forms: {e}")
+            return {}
+
+    def get_team_form(self, team_name: str) -> Optional[Dict]:
+        """Form aggregates of one team (exact name, else the first substring match)"""
+        columns = ('team', 'wins', 'losses', 'draws', 'maps_won', 'maps_lost',
+                   'ranked_wins', 'ranked_matches', 'recent', 'last_played_at')
+        try:
+            with self._connect() as conn:
+                cursor = conn.cursor()
+                cursor.execute(f'SELECT {", ".join(columns)} FROM team_form WHERE team = ?', (team_name,))
+                row = cursor.fetchone()
+                if row is None:
+                    cursor.execute(
+                        f'SELECT {", ".join(columns)} FROM team_form WHERE team LIKE ? '
+                        f'ORDER BY wins + losses + draws DESC LIMIT 1',
+                        (f"%{team_name}%",)
+                    )
+                    row = cursor.fetchone()
+                return dict(zip(columns, row)) if row else None
+        except Exception as e:
+            logger.error(f"Error getting form of {team_name}: {e}")
+            return None
+
+    def update_team_rankings(self, ranking: List[str]):
+        """Replace the stored HLTV ranking (team names, best first)"""
+        try:
+            with self._connect() as conn:
+                cursor = conn.cursor()
+                cursor.execute('DELETE FROM team_rankings')
+                cursor.executemany(
+                    'INSERT OR IGNORE INTO team_rankings (team_name, rank) VALUES (?, ?)',
+                    [(team.lower(), rank) for rank, team in enumerate(ranking, 1)]
+                )
+                conn.commit()
+        except Exception as e:
+            logger.error(f"Error updating team rankings: {e}")
+
+    def record_page_fetch(self, endpoint: str, url: str, sha256: str, size: int, stored_size: int,
+                          place: Callable[[bool], None]) -> Optional[bool]:
+        """Record a fetched page of the page store
+        
+        `place(new)` puts the page file at its content address once the rows
+        are inserted (new: the content was not stored before). It runs inside
+        the write transaction, so a concurrent prune_page_store can't delete
+        the file between placing and recording.
+        
+        Returns:
+            True if the page content was not stored before, None on errors
+            (the transaction was rolled back)
+        """
+        now = time.time()
+        try:
+            with self._connect() as conn:
+                cursor = conn.cursor()
+                cursor.execute('BEGIN IMMEDIATE')
+                cursor.execute(
+                    'INSERT OR IGNORE INTO page_blobs (sha256, size, stored_size, created_at) VALUES (?, ?, ?, ?)',
+                    (sha256, size, stored_size, now)
+                )
+                new = cursor.rowcount > 0
+                cursor.execute(
+                    'INSERT INTO page_fetches (endpoint, url, fetched_at, sha256) VALUES (?, ?, ?, ?)',
+                    (endpoint, url, now, sha256)
+                )
+                place(new)
+                conn.commit()
+                return new
+        except Exception as e:
+            logger.error(f"Error recording page fetch of {url}: {e}")
+            return None
+
+    def get_page_fetches(self, endpoint: Optional[str] = None, since: float = 0,
+                         limit: Optional[int] = None) -> List[Dict]:
+        """Stored page fetches, newest first"""
+        sql = 'SELECT endpoint, url, fetched_at, sha256 FROM page_fetches WHERE fetched_at >= ?'
+        params = [since]
+        if endpoint:
+            sql += ' AND endpoint = ?'
+            params.append(endpoint)
+        sql += ' ORDER BY fetched_at DESC'
+        if limit:
+            sql += ' LIMIT ?'
+            params.append(limit)
+        try:
+            with self._connect() as conn:
+                cursor = conn.cursor()
+                cursor.execute(sql, params)
+                return [{'endpoint': row[0], 'url': row[1], 'fetched_at': row[2], 'sha256': row[3]}
+                        for row in cursor.fetchall()]
+        except Exception as e:
+            logger.error(f"Error getting page fetches: {e}")
+            return []
+
+    def get_page_store_size(self) -> Tuple[int, int, int]:
+        """(distinct pages, original bytes, stored bytes) of the page store"""
+        try:
+            with self._connect() as conn:
+                cursor = conn.cursor()
+                cursor.execute('SELECT COUNT(*), COALESCE(SUM(size), 0), COALESCE(SUM(stored_size), 0) FROM page_blobs')
+                return cursor.fetchone()
+        except Exception as e:
+            logger.error(f"Error getting page store size: {e}")
+            return 0, 0, 0
+
+    def prune_page_store(self, older_than: float, max_stored_bytes: int,
+                         remove: Callable[[List[str]], None]) -> List[str]:
+        """Drop page fetches before `older_than`, then the least recently fetched pages
+        until the stored size fits `max_stored_bytes`
+        
+        `remove` deletes the files of the dropped pages inside the write
+        transaction (see record_page_fetch).
+        
+        Returns:
+            Content hashes no fetch refers to anymore (their files were deleted)
+        """
+        try:
+            with self._connect() as conn:
+                cursor = conn.cursor()
+                cursor.execute('BEGIN IMMEDIATE')
+                cursor.execute('DELETE FROM page_fetches WHERE fetched_at < ?', (older_than,))
+                
+                cursor.execute(
+                    'SELECT b.sha256, b.stored_size, MAX(f.fetched_at) AS last_fetched FROM page_blobs b '
+                    'LEFT JOIN page_fetches f ON f.sha256 = b.sha256 '
+                    'GROUP BY b.sha256 ORDER BY last_fetched IS NOT NULL, last_fetched'
+                )
+                blobs = cursor.fetchall()
+                total = sum(stored_size for _, stored_size, _ in blobs)
+                removed = []
+                for sha256, stored_size, last_fetched in blobs:
+                    if last_fetched is not None and total <= max_stored_bytes:
+                        break
+                    removed.append(sha256)
+                    total -= stored_size
+                
+                for i in range(0, len(removed), 500):
+                    chunk = removed[i:i + 500]
+                    placeholders = ','.join('?' * len(chunk))
+                    cursor.execute(f'DELETE FROM page_fetches WHERE sha256 IN ({placeholders})', chunk)
+                    cursor.execute(f'DELETE FROM page_blobs WHERE sha256 IN ({placeholders})', chunk)
+                if removed:
+                    remove(removed)
+                conn.commit()
+                return removed
+        except Exception as e:
+            logger.error(f"Error pruning page store: {e}")
+            return []
+
+    def get_team_results(self, team_name: str, limit: int = 10) -> List[Dict]:
+        """Latest archived results of a team, newest first (dicts as for Match.from_dict)
+        
+        Matches the exact team name (case-insensitive) through the team indexes
+        and falls back to a substring search if that finds nothing.
+        """
+        columns = 'match_id, team1, team2, event, played_at, score, stars, match_url'
+        try:
+            with self._connect() as conn:
+                cursor = conn.cursor()
+                cursor.execute(
+                    f'SELECT {columns} FROM ('
+                    f'SELECT {columns} FROM results_archive WHERE team1 = ? COLLATE NOCASE '
+                    f'UNION ALL '
+                    f'SELECT {columns} FROM results_archive WHERE team2 = ? COLLATE NOCASE'
+                    f') ORDER BY played_at DESC LIMIT ?',
+                    (team_name, team_name, limit)
+                )
+                rows = cursor.fetchall()
+                if not rows:
+                    pattern = f"%{team_name}%"
+                    cursor.execute(
+                        f'SELECT {columns} FROM results_archive WHERE team1 LIKE ? OR team2 LIKE ? '
+                        f'ORDER BY played_at DESC LIMIT ?',
+                        (pattern, pattern, limit)
+                    )
+                    rows = cursor.fetchall()
+                return [
+                    {'match_id': row[0], 'team1': row[1], 'team2': row[2], 'event': row[3], 'time': row[4],
+                     'score': row[5], 'stars': row[6], 'match_url': row[7], 'status': 'finished'}
+                    for row in rows
+                ]
+        except Exception as e:
+            logger.error(f"Error getting results of {team_name}: {e}")
+            return []
+
+    def enqueue_message(self, chat_id: int, text: str, dedup_key: Optional[str] = None,
+                        parse_mode: Optional[str] = 'HTML', disable_web_page_preview: bool = True,
+                        notifications: Iterable[Tuple[int, str, str]] = ()) -> bool:
+        """Queue a message for delivery
+        
+        The message and the matching notifications_sent rows are written in one
+        transaction, so a crash can never leave a notification marked as sent
+        without a queued message (or vice versa).
+        
+        Args:
+            chat_id: Telegram chat to send to
+            text: Message text
+            dedup_key: Unique key; a message with an already known key is ignored
+            parse_mode: Telegram parse mode
+            disable_web_page_preview: Disable link previews
+            notifications: (user_id, match_id, notification_type) tuples to mark as sent
+            
+        Returns:
+            True if the message was queued, False if it was a duplicate or failed
+        """
+        try:
+            with self._connect() as conn:
+                cursor = conn.cursor()
+                cursor.execute(
+                    'INSERT OR IGNORE INTO outbox (dedup_key, chat_id, text, parse_mode, disable_web_page_preview) '
+                    'VALUES (?, ?, ?, ?, ?)',
+                    (dedup_key, chat_id, text, parse_mode, int(disable_web_page_preview))
+                )
+                queued = cursor.rowcount > 0
+                if queued:
+                    cursor.executemany(
+                        'INSERT OR IGNORE INTO notifications_sent (user_id, match_id, notification_type) VALUES (?, ?, ?)',
+                        list(notifications)
+                    )
+                conn.commit()
+                return queued
+        except Exception as e:
+            logger.error(f"Error queueing message for {chat_id}: {e}")
+            return False
+
+    def claim_outbox_messages(self, limit: int, lease_seconds: int) -> List[Dict]:
+        """Claim due messages for delivery
+        
+        Claimed messages are leased for lease_seconds. If the process dies while
+        sending, the lease expires and the message is picked up again after restart.
+        """
+        now = time.time()
+        try:
+            with self._connect() as conn:
+                conn.row_factory = sqlite3.Row
+                cursor = conn.cursor()
+                cursor.execute('BEGIN IMMEDIATE')
+                cursor.execute(
+                    "SELECT * FROM outbox WHERE status IN ('pending', 'sending') AND next_attempt_at <= ? "
+                    "ORDER BY id LIMIT ?",
+                    (now, limit)
+                )
+                rows = [dict(row) for row in cursor.fetchall()]
+                cursor.executemany(
+                    "UPDATE outbox SET status = 'sending', attempts = attempts + 1, next_attempt_at = ? WHERE id = ?",
+                    [(now + lease_seconds, row['id']) for row in rows]
+                )
+                conn.commit()
+                for row in rows:
+                    row['attempts'] += 1
+                return rows
+        except Exception as e:
+            logger.error(f"Error claiming outbox messages: {e}")
+            return []
+
+    def mark_outbox_sent(self, message_id: int):
+        """Mark a queued message as delivered"""
+        try:
+            with self._connect() as conn:
+                cursor = conn.cursor()
+                cursor.execute(
+                    "UPDATE outbox SET status = 'sent', sent_at = CURRENT_TIMESTAMP, last_error = NULL WHERE id = ?",
+                    (message_id,)
+                )
+                conn.commit()
+        except Exception as e:
+            logger.error(f"Error marking outbox message {message_id} as sent: {e}")
+
+    def reschedule_outbox_message(self, message_id: int, delay: float, error: str):
+        """Put a message back into the queue after a failed delivery attempt"""
+        try:
+            with self._connect() as conn:
+                cursor = conn.cursor()
+                cursor.execute(
+                    "UPDATE outbox SET status = 'pending', next_attempt_at = ?, last_error = ? WHERE id = ?",
+                    (time.time() + delay, error, message_id)
+                )
+                conn.commit()
+        except Exception as e:
+            logger.error(f"Error rescheduling outbox message {message_id}: {e}")
+
+    def mark_outbox_failed(self, message_id: int, error: str):
+        """Give up on a queued message"""
+        try:
+            with self._connect() as conn:
+                cursor = conn.cursor()
+                cursor.execute(
+                    "UPDATE outbox SET status = 'failed', last_error = ? WHERE id = ?",
+                    (error, message_id)
+                )
+                conn.commit()
+        except Exception as e:
+            logger.error(f"Error marking outbox message {message_id} as failed: {e}")
+
+    def purge_outbox(self, older_than_days: int) -> int:
+        """Delete delivered and failed messages older than the given number of days"""
+        try:
+            with self._connect() as conn:
+                cursor = conn.cursor()
+                cursor.execute(
+                    "DELETE FROM outbox WHERE status IN ('sent', 'failed') "
+                    "AND created_at < datetime('now', ?)",
+                    (f'-{older_than_days} days',)
+                )
+                conn.commit()
+                return cursor.rowcount
+        except Exception as e:
+            logger.error(f"Error purging outbox: {e}")
+            return 0
+
+    def publish_snapshot(self, kind: str, payload: str, created_at: Optional[float] = None) -> int:
+        """Store a new version of a snapshot
+        
+        Args:
+            created_at: When the data was fetched from HLTV (defaults to now)
+        
+        Returns:
+            The new version number (0 on errors)
+        """
+        try:
+            with self._connect() as conn:
+                cursor = conn.cursor()
+                cursor.execute(
+                    'INSERT INTO snapshots (kind, version, created_at, payload) VALUES (?, 1, ?, ?) '
+                    'ON CONFLICT(kind) DO UPDATE SET version = version + 1, '
+                    'created_at = excluded.created_at, payload = excluded.payload',
+                    (kind, created_at if created_at is not None else time.time(), payload)
+                )
+                cursor.execute('SELECT version FROM snapshots WHERE kind = ?', (kind,))
+                version = cursor.fetchone()[0]
+                conn.commit()
+                return version
+        except Exception as e:
+            logger.error(f"Error publishing {kind} snapshot: {e}")
+            return 0
+
+    def get_snapshot_version(self, kind: str) -> int:
+        """Get the current version of a snapshot (0 if none was published yet)"""
+        try:
+            with self._connect() as conn:
+                cursor = conn.cursor()
+                cursor.execute('SELECT version FROM snapshots WHERE kind = ?', (kind,))
+                result = cursor.fetchone()
+                return result[0] if result else 0
+        except Exception as e:
+            logger.error(f"Error getting {kind} snapshot version: {e}")
+            return 0
+
+    def get_snapshot(self, kind: str) -> Optional[Tuple[int, float, str]]:
+        """Get the latest snapshot as (version, created_at, payload)"""
+        try:
+            with self._connect() as conn:
+                cursor = conn.cursor()
+                cursor.execute(
+                    'SELECT version, created_at, payload FROM snapshots WHERE kind = ?',
+                    (kind,)
+                )
+                return cursor.fetchone()
+        except Exception as e:
+            logger.error(f"Error getting {kind} snapshot: {e}")
+            return None
@@ -1,15 +1,108 @@
-import requests
-import cloudscraper
-from bs4 import BeautifulSoup
 from datetime import datetime, timedelta
-from typing import List, Dict, Optional
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, Set, Tuple, Union
 import logging
 import re
+import threading
 import time
-from config import HLTV_BASE_URL, HLTV_MATCHES_URL, HLTV_RESULTS_URL, HEADERS
+from collections import Counter
+import metrics
+import tracing
+from config import (
+    HLTV_BASE_URL, HLTV_MATCHES_URL, HLTV_RESULTS_URL, HEADERS,
+    RESULTS_PAGE_SIZE, RESULTS_MAX_PAGES,
+    MATCHES_MAX_STALENESS, RESULTS_CACHE_SECONDS, RESULTS_MAX_STALENESS, SCHEDULE_DAYS,
+    DATETIME_CACHE_HOURS
+)
 
 logger = logging.getLogger(__name__)
 
+# Bytes read from a streamed response (and fed to the parser) at a time
+STREAM_CHUNK_SIZE = 64 * 1024
+
+
+def parse_html(html: str, page: str = 'other'):
+    """Parse a page with BeautifulSoup/lxml
+
+    The parser stack is imported on first use, so importing this module
+    (e.g. by a bot frontend that only reads snapshots) stays cheap.
+    """
+    from bs4 import BeautifulSoup
+    with tracing.span('hltv.parse', page=page), metrics.HLTV_PARSE_SECONDS.time(page=page):
+        return BeautifulSoup(html, 'lxml')
+
+
+def iter_containers(source: Union[str, Iterable[bytes]], select: Callable[[str, List[str]], bool],
+                    page: str = 'other', encoding: str = 'utf-8') -> Iterator[Tuple[object, Set[str]]]:
+    """Parse a page incrementally, yielding every selected container as soon as it is closed
+
+    The page is fed chunk by chunk into lxml's pull parser. Every finished
+    element is removed from the tree right away, so only the currently open
+    elements and one container are ever held - instead of a full soup tree of
+    the whole page. Containers nested in a selected one are not yielded separately.
+
+    Args:
+        source: The page, or its bytes in chunks (e.g. from a streamed response)
+        select: Whether an element is a container, called with (tag, classes)
+
+    Yields:
+        (container as a small BeautifulSoup tag, classes of all elements around it)
+    """
+    from bs4 import BeautifulSoup
+    from lxml import etree
+
+    chunks = [source.encode(encoding)] if isinstance(source, str) else source
+    parser = etree.HTMLPullParser(events=('start', 'end'), encoding=encoding)
+    stack = []  # Open elements
+    container = None
+    outer_classes = set()
+    parse_seconds = 0.0
+
+    def events(chunk):
+        nonlocal container, outer_classes
+        if chunk is None:
+            parser.close()
+        else:
+            parser.feed(chunk)
+        for event, elem in parser.read_events():
+            if event == 'start':
+                stack.append(elem)
+                if container is None and isinstance(elem.tag, str) and select(elem.tag, elem.get('class', '').split()):
+                    container = elem
+                    outer_classes = {c for e in stack[:-1] for c in e.get('class', '').split()}
+                continue
+
+            while stack and stack.pop() is not elem:
+                pass
+            if container is not None and elem is not container:
+                continue  # Still needed for the container
+            if elem is container:
+                html = etree.tostring(elem, encoding='unicode', method='html', with_tail=False)
+                container = None
+                yield BeautifulSoup(html, 'lxml').find(elem.tag), outer_classes
+            # Done with it: free the element and everything before it
+            elem.clear()
+            while elem.getprevious() is not None:
+                del elem.getparent()[0]
+
+    def timed(chunk):
+        # Parse time only - not the download, nor what the caller does per container
+        nonlocal parse_seconds
+        start = time.perf_counter()
+        for item in events(chunk):
+            parse_seconds += time.perf_counter() - start
+            yield item
+            start = time.perf_counter()
+        parse_seconds += time.perf_counter() - start
+
+    try:
+        for chunk in chunks:
+            if chunk:
+                yield from timed(chunk)
+        yield from timed(None)
+    finally:
+        metrics.HLTV_PARSE_SECONDS.observe(parse_seconds, page=page)
+
+
 class Match:
     """Represents an HLTV Match"""
     def __init__(self, match_id: str, team1: str, team2: str, 
@@ -50,13 +143,14 @@ class Match:
         
         # Star rating using white star (☆)
         stars_display = "☆" * self.stars if self.stars > 0 else "No rating"
+        form = self._format_form()
         
         if self.score:
             # Finished match
             return (
                 f'<a href="{url}">{self.team1} vs {self.team2}</a>\n'
                 f'Result: {self.score}\n'
-                f'Rating: {stars_display}\n'
+                f'Rating: {stars_display}\n{form}'
                 f'@ {self.event}'
             )
         elif self.time:
@@ -65,17 +159,25 @@ class Match:
             time_str = self.time.strftime("%H:%M UTC")
             return (
                 f'<a href="{url}">{self.team1} vs {self.team2}</a>\n'
-                f'Rating: {stars_display}\n'
+                f'Rating: {stars_display}\n{form}'
                 f'{date_str} {time_str} @ {self.event}'
             )
         else:
             # No time available
             return (
                 f'<a href="{url}">{self.team1} vs {self.team2}</a>\n'
-                f'Rating: {stars_display}\n'
+                f'Rating: {stars_display}\n{form}'
                 f'@ {self.event}'
             )
 
+    def _format_form(self) -> str:
+        """'Form: A WWLWL · B LWWLW' line (with newline) from the scraper's form cache, or ''"""
+        if not self._scraper:
+            return ''
+        forms = [f"{team} {form}" for team in (self.team1, self.team2)
+                 if (form := self._scraper.get_team_form(team))]
+        return f"Form: {' · '.join(forms)}\n" if forms else ''
+    
     def __str__(self):
         if self.score:
             return f"{self.team1} vs {self.team2} - {self.score}\n📍 {self.event}"
@@ -92,45 +194,284 @@ class Match:
         return (team_name_lower in self.team1.lower() or 
                 team_name_lower in self.team2.lower())
 
+    def to_dict(self) -> dict:
+        """Serialize the match for snapshots (never triggers lazy loading)"""
+        match_time = self._time
+        if match_time is None and self._scraper:
+            match_time = self._scraper.get_cached_match_time(self)
+        return {
+            'match_id': self.match_id,
+            'team1': self.team1,
+            'team2': self.team2,
+            'event': self.event,
+            'time': match_time.timestamp() if match_time else None,
+            'stars': self.stars,
+            'score': self.score,
+            'status': self.status,
+            'match_url': self._match_url,
+        }
+
+    @classmethod
+    def from_dict(cls, data: dict, scraper=None) -> 'Match':
+        """Restore a match serialized with to_dict"""
+        match = cls(
+            match_id=data['match_id'],
+            team1=data['team1'],
+            team2=data['team2'],
+            event=data['event'],
+            time=datetime.fromtimestamp(data['time']) if data.get('time') else None,
+            stars=data['stars'],
+            score=data.get('score'),
+            status=data.get('status', 'upcoming')
+        )
+        match._match_url = data.get('match_url')
+        match._scraper = scraper
+        return match
+
+
+class _Call:
+    """An in-flight call shared by all callers of the same key"""
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+
+class SingleFlight:
+    """Coalesce concurrent calls for the same key into one execution
+    
+    The first caller for a key runs the function, everyone arriving while it
+    is in flight waits and gets the same result (or exception).
+    """
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._calls: Dict[str, _Call] = {}
+        self.executed = Counter()  # Executions per resource
+        self.coalesced = Counter()  # Calls served by another caller's execution, per resource
+    
+    @staticmethod
+    def _resource(key: str) -> str:
+        return key.split(':', 1)[0]
+    
+    def in_flight(self, key: str) -> bool:
+        """Check if a call for key is currently running"""
+        with self._lock:
+            return key in self._calls
+    
+    def do(self, key: str, fn):
+        """Run fn() once for all concurrent callers of key"""
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = _Call()
+                self.executed[self._resource(key)] += 1
+            else:
+                self.coalesced[self._resource(key)] += 1
+        
+        if not leader:
+            logger.debug(f"Joining in-flight request for {key}")
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result
+        
+        try:
+            call.result = fn()
+            return call.result
+        except BaseException as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call.done.set()
+
 
 class HLTVScraper:
     """Scraper for HLTV.org"""
     
     def __init__(self):
-        # Create scraper with enhanced browser properties
-        self.session = cloudscraper.create_scraper(
-            browser={
-                'browser': 'chrome',
-                'platform': 'windows',
-                'desktop': True
-            },
-            delay=10  # Initial delay for Cloudflare challenge
-        )
-        self.session.headers.update(HEADERS)
+        self._session = None  # Created on the first request, see session
+        self._session_lock = threading.Lock()
         self._team_cache = set()  # Cache for found teams
         self._last_request_time = 0
         self._request_delay = 3  # Increase delay to 3 seconds
+        self._rate_limit_lock = threading.Lock()  # Requests may come from several threads
+        self._single_flight = SingleFlight()  # Coalesces concurrent fetches of the same resource
         self._datetime_cache = {}  # Cache for match datetimes to avoid duplicate requests
         self._matches_cache = None  # Cache for all matches
+        self._matches_generation = 0  # Incremented whenever the matches cache is replaced
         self._matches_cache_time = None  # Timestamp of last cache update
         self._cache_duration = 1800  # Cache duration in seconds (30 minutes)
+        self._matches_max_staleness = MATCHES_MAX_STALENESS  # Stale matches are never served beyond this
+        self._results_cache = None  # Snapshot of the first results page
+        self._results_cache_time = None  # Timestamp of last results snapshot update
+        self._results_cache_duration = RESULTS_CACHE_SECONDS
+        self._results_max_staleness = RESULTS_MAX_STALENESS
+        self._team_form = {}  # Team (lower case) -> recent results like 'WWLWL', see set_team_form
+        self._schedule = {}  # Week-ahead index: date -> (fetched_at, matches), see ScraperWorker.refresh_schedule
         self._all_teams = None  # Cache for all teams from HLTV rankings
         self._teams_cache_time = None  # Timestamp of last team list update
         self._teams_cache_duration = 86400  # Teams cache duration: 24 hours
         self.db = None  # Database instance for team validation
+        self.page_store = None  # Keeps every fetched page for offline re-parsing, see set_page_store
 
+    @property
+    def session(self):
+        """HTTP session - cloudscraper is only imported and set up on the first request"""
+        if self._session is None:
+            with self._session_lock:
+                if self._session is None:
+                    import cloudscraper
+                    # Create scraper with enhanced browser properties
+                    session = cloudscraper.create_scraper(
+                        browser={
+                            'browser': 'chrome',
+                            'platform': 'windows',
+                            'desktop': True
+                        },
+                        delay=10  # Initial delay for Cloudflare challenge
+                    )
+                    session.headers.update(HEADERS)
+                    self._session = session
+        return self._session
+    
     def set_database(self, db):
         """Set database instance for team validation"""
         self.db = db
 
+    def set_page_store(self, page_store):
+        """Store every fetched page (page_store.PageStore), None to stop"""
+        self.page_store = page_store
+    
     def _rate_limit(self):
         """Rate limiting to avoid overloading HLTV"""
-        current_time = time.time()
-        time_since_last = current_time - self._last_request_time
-        if time_since_last < self._request_delay:
-            time.sleep(self._request_delay - time_since_last)
-        self._last_request_time = time.time()
+        start = time.perf_counter()
+        with tracing.span('hltv.rate_limit'), self._rate_limit_lock:
+            current_time = time.time()
+            time_since_last = current_time - self._last_request_time
+            if time_since_last < self._request_delay:
+                time.sleep(self._request_delay - time_since_last)
+            self._last_request_time = time.time()
+        # Includes waiting for other threads holding the lock
+        metrics.HLTV_RATE_LIMIT_WAIT_SECONDS.observe(time.perf_counter() - start)
+    
+    def _get(self, endpoint: str, url: str, timeout: int, stream: bool = False):
+        """GET an HLTV page, recording latency and status per endpoint
+        
+        With stream=True the body is not downloaded yet (see _get_chunks), so
+        the latency only covers the response headers.
+        
+        Raises:
+            requests.HTTPError for error status codes, like raise_for_status
+        """
+        start = time.perf_counter()
+        status = 'error'
+        with tracing.span('hltv.get', endpoint=endpoint, url=url) as span:
+            try:
+                response = self.session.get(url, timeout=timeout, stream=stream)
+                status = str(response.status_code)
+            finally:
+                span.set('status', status)
+                metrics.HLTV_REQUEST_SECONDS.observe(time.perf_counter() - start, endpoint=endpoint, status=status)
+        if stream:
+            if not response.ok:
+                response.close()
+            response.raise_for_status()
+            return response
+        response.raise_for_status()
+        if self.page_store:
+            try:
+                self.page_store.put(endpoint, url, response.text)
+            except Exception as e:
+                logger.error(f"Error storing page {url}: {e}")
+        return response
+    
+    def _get_chunks(self, endpoint: str, url: str, timeout: int) -> Iterator[bytes]:
+        """GET an HLTV page as a stream of byte chunks (for iter_containers)
+        
+        The request is made right away, so HTTP errors raise here; the body
+        is downloaded while the chunks are consumed and stored in the page
+        store on the way, if the download completes.
+        """
+        response = self._get(endpoint, url, timeout, stream=True)
+        return self._iter_chunks(response, endpoint, url)
+    
+    def _iter_chunks(self, response, endpoint: str, url: str) -> Iterator[bytes]:
+        writer = None
+        if self.page_store:
+            try:
+                writer = self.page_store.open(endpoint, url)
+            except Exception as e:
+                logger.error(f"Error storing page {url}: {e}")
+        try:
+            for chunk in response.iter_content(STREAM_CHUNK_SIZE):
+                if writer:
+                    try:
+                        writer.write(chunk)
+                    except Exception as e:
+                        logger.error(f"Error storing page {url}: {e}")
+                        writer.abort()
+                        writer = None
+                yield chunk
+            if writer:
+                try:
+                    writer.close()
+                except Exception as e:
+                    logger.error(f"Error storing page {url}: {e}")
+                writer = None
+        finally:
+            # Incomplete download (or the parser stopped early): nothing is stored
+            if writer:
+                writer.abort()
+            response.close()
+    
+    @staticmethod
+    def _snapshot_state(snapshot, snapshot_time: Optional[float], fresh_for: float, max_staleness: float) -> str:
+        """Classify a cached snapshot
+        
+        Returns:
+            'fresh' (serve), 'stale' (serve and refresh in background)
+            or 'expired' (missing or too old to serve)
+        """
+        if snapshot is None or snapshot_time is None:
+            return 'expired'
+        age = time.time() - snapshot_time
+        if age < fresh_for:
+            return 'fresh'
+        if age < max_staleness:
+            return 'stale'
+        return 'expired'
+    
+    @staticmethod
+    def _lookup_result(use_cache: bool, state: str) -> str:
+        """Cache lookup result for metrics: hit, stale or miss"""
+        if not use_cache or state == 'expired':
+            return 'miss'
+        return 'hit' if state == 'fresh' else 'stale'
+    
+    def _refresh_in_background(self, key: str, fn):
+        """Run a single-flight refresh in a daemon thread unless one is already running"""
+        if self._single_flight.in_flight(key):
+            return
+        
+        def refresh():
+            try:
+                self._single_flight.do(key, fn)
+            except Exception as e:
+                logger.warning(f"Background refresh of {key} failed, keeping last good snapshot: {e}")
+        
+        threading.Thread(target=refresh, name=f"refresh-{key}", daemon=True).start()
+    
+    def get_coalescing_stats(self) -> Dict[str, Dict[str, int]]:
+        """Executed and coalesced fetches per resource (matches, results, rankings, match_page)"""
+        return {
+            'executed': dict(self._single_flight.executed),
+            'coalesced': dict(self._single_flight.coalesced),
+        }
     
+    @tracing.traced()
     def preload_match_datetimes(self, matches: List[Match], max_matches: int = 20):
         """Eagerly load datetimes for a list of matches to populate cache
         
@@ -147,6 +488,7 @@ class HLTVScraper:
                 loaded += 1
         logger.info(f"Preloaded {loaded} match datetimes")
     
+    @tracing.traced()
     def get_all_teams(self, use_cache: bool = True) -> set:
         """Scrape all teams from HLTV rankings page
         
@@ -160,10 +502,16 @@ class HLTVScraper:
         if use_cache and self._all_teams is not None and self._teams_cache_time is not None:
             cache_age = time.time() - self._teams_cache_time
             if cache_age < self._teams_cache_duration:
+                metrics.CACHE_LOOKUPS.inc(cache='teams', result='hit')
                 logger.info(f"Using cached team list ({len(self._all_teams)} teams, age: {int(cache_age/3600)}h)")
                 return self._all_teams
         
-        # Fetch fresh team list from rankings
+        metrics.CACHE_LOOKUPS.inc(cache='teams', result='miss')
+        # Concurrent callers share one rankings fetch
+        return self._single_flight.do('rankings', self._fetch_all_teams)
+    
+    def _fetch_all_teams(self) -> set:
+        """Fetch the team list from HLTV rankings and current matches (see get_all_teams)"""
         teams = set()
         try:
             self._rate_limit()
@@ -191,35 +539,15 @@ class HLTVScraper:
             rankings_url = f"{HLTV_BASE_URL}/ranking/teams/{year}/{month}/{day}"
             logger.info(f"Scraping all teams from {rankings_url}")
             
-            response = self.session.get(rankings_url, timeout=15)
-            response.raise_for_status()
+            chunks = self._get_chunks('rankings', rankings_url, timeout=15)
             
-            soup = BeautifulSoup(response.text, 'lxml')
-            
-            # Find all team containers in the ranking
-            # Each team has a div with class containing 'ranked-team'
-            team_containers = soup.find_all('div', class_='ranked-team')
-            
-            for container in team_containers:
-                # Find team name span
-                name_elem = container.find('span', class_='name')
-                if name_elem:
-                    team_name = name_elem.get_text(strip=True)
-                    if team_name:
-                        teams.add(team_name.lower())
-            
-            # Fallback: also try finding all <span class="name"> elements
-            if not teams:
-                logger.info("No teams found with ranked-team class, trying all name spans")
-                team_elements = soup.find_all('span', class_='name')
-                for elem in team_elements:
-                    team_name = elem.get_text(strip=True)
-                    if team_name:
-                        teams.add(team_name.lower())
+            ranking = self._parse_rankings_page(chunks)  # Best first (for form vs ranked opponents)
+            teams.update(ranking)
             
             # Also add teams from current matches to catch new/unranked teams
+            # (the cached snapshot is enough - refresh_matches keeps it fresh)
             try:
-                matches = self.get_todays_matches(min_stars=0, use_cache=False)
+                matches = self.get_todays_matches(min_stars=0)
                 for match in matches:
                     teams.add(match.team1.lower())
                     teams.add(match.team2.lower())
@@ -236,6 +564,8 @@ class HLTVScraper:
                 if self.db:
                     self.db.update_valid_teams(teams)
                     logger.info(f"Updated database with {len(teams)} valid teams")
+                    if ranking:
+                        self.db.update_team_rankings(ranking)
             else:
                 logger.warning("No teams found, using old cache if available")
                 if self._all_teams:
@@ -250,6 +580,38 @@ class HLTVScraper:
         
         return teams if teams else set()
 
+    def _parse_rankings_page(self, html: Union[str, Iterable[bytes]]) -> List[str]:
+        """Team names (lower case) of a rankings page, best first
+        
+        Args:
+            html: The page, or its chunks as they are downloaded (see iter_containers)
+        """
+        # Each team has a div with class containing 'ranked-team' with a name span;
+        # name spans outside of them are the fallback
+        def select(tag, classes):
+            return (tag == 'div' and 'ranked-team' in classes) or (tag == 'span' and 'name' in classes)
+        
+        ranking = []
+        names = []
+        for container, _ in iter_containers(html, select, 'rankings'):
+            if container.name == 'span':
+                team_name = container.get_text(strip=True)
+                if team_name:
+                    names.append(team_name.lower())
+                continue
+            # Find team name span
+            name_elem = container.find('span', class_='name')
+            if name_elem:
+                team_name = name_elem.get_text(strip=True)
+                if team_name:
+                    ranking.append(team_name.lower())
+        
+        if not ranking:
+            logger.info("No teams found with ranked-team class, trying all name spans")
+            return names
+        return ranking
+
+    @tracing.traced()
     def search_team(self, team_name: str) -> tuple[bool, str]:
         """Check if a team exists by validating against database
         
@@ -315,6 +677,7 @@ class HLTVScraper:
         logger.error(f"No valid teams in database, cannot validate '{team_name}'")
         return (False, team_name_input)
 
+    @tracing.traced()
     def get_todays_matches(self, min_stars: int = 0, use_cache: bool = True) -> List[Match]:
         """Get today's matches from HLTV - only returns truly upcoming matches
         
@@ -322,157 +685,227 @@ class HLTVScraper:
             min_stars: Minimum star rating for matches
             use_cache: If True, use cached matches if available and not expired
         """
-        # Check if we can use cache
-        if use_cache and self._matches_cache is not None and self._matches_cache_time is not None:
-            cache_age = time.time() - self._matches_cache_time
-            if cache_age < self._cache_duration:
-                logger.info(f"Using cached matches (age: {int(cache_age)}s / {self._cache_duration}s)")
-                # Filter by min_stars from cache
-                return [m for m in self._matches_cache if m.stars >= min_stars]
+        # Serve the last good snapshot immediately (stale-while-revalidate)
+        state = self._snapshot_state(self._matches_cache, self._matches_cache_time,
+                                     self._cache_duration, self._matches_max_staleness)
+        metrics.CACHE_LOOKUPS.inc(cache='matches', result=self._lookup_result(use_cache, state))
+        if use_cache and state != 'expired':
+            cache_age = int(time.time() - self._matches_cache_time)
+            if state == 'stale':
+                logger.info(f"Serving stale matches (age: {cache_age}s), refreshing in background")
+                self._refresh_in_background('matches', self._fetch_matches)
+            else:
+                logger.info(f"Using cached matches (age: {cache_age}s / {self._cache_duration}s)")
+            # Filter by min_stars from cache
+            return [m for m in self._matches_cache if m.stars >= min_stars]
         
-        # Fetch fresh matches
+        # Fetch fresh matches - concurrent callers share one request
         try:
-            self._rate_limit()
-            # Don't use date parameter as HLTV shows same matches on multiple days
-            # Just get the main matches page
-            response = self.session.get(HLTV_MATCHES_URL, timeout=15)
-            response.raise_for_status()
-            
-            soup = BeautifulSoup(response.text, 'lxml')
-            matches = []
-            current_date = datetime.now().date()
-            
-            # Find all match containers
-            all_divs = soup.find_all('div', class_=True)
-            
-            for div in all_divs:
-                classes = div.get('class', [])
-                
-                # Check for match container
-                if 'match' in classes and len(classes) <= 3:
-                    try:
-                        match = self._parse_match_container(div, current_date)
-                        if match:
-                            matches.append(match)
-                    except Exception as e:
-                        logger.error(f"Error parsing a match: {e}")
-                        continue
-            
-            # Remove duplicates based on match_id
-            seen_ids = set()
-            unique_matches = []
-            for match in matches:
-                if match.match_id not in seen_ids:
-                    seen_ids.add(match.match_id)
-                    unique_matches.append(match)
-            
-            logger.info(f"Found {len(unique_matches)} unique matches (filtered {len(matches) - len(unique_matches)} duplicates)")
-            
-            # Update cache
-            self._matches_cache = unique_matches
-            self._matches_cache_time = time.time()
-            logger.info(f"Updated matches cache with {len(unique_matches)} matches")
-            
+            unique_matches = self._single_flight.do('matches', self._fetch_matches)
             # Filter by min_stars
             return [m for m in unique_matches if m.stars >= min_stars]
             
         except Exception as e:
+            if state != 'expired':
+                logger.error(f"Error fetching matches, serving last good snapshot: {e}")
+                return [m for m in self._matches_cache if m.stars >= min_stars]
             logger.error(f"Error fetching matches: {e}")
             return []
     
+    def _fetch_matches(self) -> List[Match]:
+        """Fetch and parse the matches page and update the matches cache"""
+        self._rate_limit()
+        # Don't use date parameter as HLTV shows same matches on multiple days
+        # Just get the main matches page
+        chunks = self._get_chunks('matches', HLTV_MATCHES_URL, timeout=15)
+        matches = self._parse_matches_page(chunks, 'matches', datetime.now().date())
+        
+        # Remove duplicates based on match_id
+        seen_ids = set()
+        unique_matches = []
+        for match in matches:
+            if match.match_id not in seen_ids:
+                seen_ids.add(match.match_id)
+                unique_matches.append(match)
+        
+        logger.info(f"Found {len(unique_matches)} unique matches (filtered {len(matches) - len(unique_matches)} duplicates)")
+        
+        # An empty page (e.g. a Cloudflare challenge) must not replace good data
+        if not unique_matches and self._matches_cache:
+            raise ValueError("No matches found on matches page")
+        
+        # Update cache
+        self._matches_cache = unique_matches
+        self._matches_cache_time = time.time()
+        self._matches_generation += 1
+        logger.info(f"Updated matches cache with {len(unique_matches)} matches")
+        self._prune_datetime_cache()
+        return unique_matches
+    
+    def _prune_datetime_cache(self):
+        """Forget kickoff times of matches that started more than DATETIME_CACHE_HOURS ago
+        
+        Every match ever looked up would stay in the cache otherwise.
+        """
+        cutoff = datetime.now() - timedelta(hours=DATETIME_CACHE_HOURS)
+        # Copy first - match page fetches may add entries from other threads
+        expired = [url for url, kickoff in list(self._datetime_cache.items()) if kickoff < cutoff]
+        for url in expired:
+            self._datetime_cache.pop(url, None)
+        if expired:
+            logger.debug(f"Pruned {len(expired)} old match datetimes")
+
+    def get_matches_generation(self) -> int:
+        """Generation of the matches snapshot - changes whenever it is replaced, for derived caches"""
+        return self._matches_generation
+    
+    def get_cached_matches(self) -> List[Match]:
+        """Return the current matches snapshot without ever hitting HLTV"""
+        return list(self._matches_cache) if self._matches_cache else []
+    
+    def get_cached_results(self, hours: int = 24) -> List[Match]:
+        """Return results of the last `hours` hours from the results snapshot without hitting HLTV"""
+        since = datetime.now() - timedelta(hours=hours)
+        return [r for r in (self._results_cache or []) if r._time is None or r._time >= since]
+    
+    def get_cached_match_time(self, match: Match) -> Optional[datetime]:
+        """Return a match's kickoff time only if it is already known (no match page fetch)"""
+        if match._time is not None:
+            return match._time
+        return self._datetime_cache.get(match._match_url)
+    
+    @tracing.traced()
+    def set_team_form(self, forms: Dict[str, str]):
+        """Install the recent form of all teams (Database.get_team_forms)"""
+        self._team_form = forms
+    
+    def get_team_form(self, team: str) -> Optional[str]:
+        """Recent form of a team from memory, e.g. 'WWLWL' (newest first)"""
+        return self._team_form.get(team.lower())
+    
+    def get_schedule(self, days: int = SCHEDULE_DAYS, min_stars: int = 0) -> Dict[datetime.date, List[Match]]:
+        """Matches of today and the following days from the week-ahead schedule index
+        
+        Never fetches: the index is kept by ScraperWorker.refresh_schedule and its
+        matches are detached from the scraper, so they carry a time only if known.
+        """
+        today = datetime.now().date()
+        schedule = {}
+        for offset in range(days):
+            day = today + timedelta(days=offset)
+            entry = self._schedule.get(day)
+            if entry is None:
+                continue
+            matches = [m for m in entry[1] if m.stars >= min_stars]
+            for match in matches:
+                if match._time is None and match._match_url:
+                    match._time = self._datetime_cache.get(match._match_url)
+            schedule[day] = matches
+        return schedule
+    
     def get_matches_for_date(self, date: datetime.date, min_stars: int = 0) -> List[Match]:
         """Get matches for a specific date from HLTV"""
         try:
-            self._rate_limit()
-            # Use HLTV's date parameter to get matches for specific date
-            url = f"{HLTV_MATCHES_URL}?selectedDate={date}"
-            response = self.session.get(url, timeout=15)
-            response.raise_for_status()
-            
-            soup = BeautifulSoup(response.text, 'lxml')
-            matches = []
-            
-            # Find all match containers
-            # Since we're using the date parameter, all matches on this page are for this date
-            all_divs = soup.find_all('div', class_=True)
-            
-            for div in all_divs:
-                classes = div.get('class', [])
-                
-                # Check for match container (simple match div with few classes)
-                if 'match' in classes and len(classes) <= 3:
-                    try:
-                        # Pass the date we know this match is for
-                        match = self._parse_match_container(div, date)
-                        if match and match.stars >= min_stars:
-                            matches.append(match)
-                    except Exception as e:
-                        logger.error(f"Error parsing a match: {e}")
-                        continue
-            
-            # Remove duplicates based on match_id, team1, team2, and time
-            seen = {}
-            unique_matches = []
-            for match in matches:
-                # Use match_id as primary key, with teams and time as fallback
-                key = (match.match_id, match.team1, match.team2, match.time)
-                if key not in seen:
-                    seen[key] = True
-                    unique_matches.append(match)
-            
-            logger.info(f"Found {len(unique_matches)} unique matches for {date} (filtered {len(matches) - len(unique_matches)} duplicates)")
-            return unique_matches
-            
+            matches = self._single_flight.do(f'matches:{date}', lambda: self._fetch_matches_for_date(date))
+            return [m for m in matches if m.stars >= min_stars]
         except Exception as e:
             logger.error(f"Error fetching matches for {date}: {e}")
             return []
+    
+    def _fetch_matches_for_date(self, date: datetime.date) -> List[Match]:
+        """Fetch and parse the matches page of a specific date"""
+        self._rate_limit()
+        # Use HLTV's date parameter to get matches for specific date
+        url = f"{HLTV_MATCHES_URL}?selectedDate={date}"
+        chunks = self._get_chunks('matches_date', url, timeout=15)
+        # Since we're using the date parameter, all matches on this page are for this date
+        matches = self._parse_matches_page(chunks, 'matches_date', date)
+        
+        # Remove duplicates based on match_id, team1, team2, and time
+        seen = {}
+        unique_matches = []
+        for match in matches:
+            # Use match_id as primary key, with teams and time as fallback
+            # (_time - don't trigger a lazy match page fetch just for deduplication)
+            key = (match.match_id, match.team1, match.team2, match._time)
+            if key not in seen:
+                seen[key] = True
+                unique_matches.append(match)
+        
+        logger.info(f"Found {len(unique_matches)} unique matches for {date} (filtered {len(matches) - len(unique_matches)} duplicates)")
+        return unique_matches
 
+    def _parse_matches_page(self, html: Union[str, Iterable[bytes]], page: str,
+                            match_date: datetime.date = None) -> List[Match]:
+        """All match containers of a matches page (may contain duplicates)
+        
+        Args:
+            html: The page, or its chunks as they are downloaded (see iter_containers)
+        """
+        # Match container: simple match div with few classes
+        def select(tag, classes):
+            return tag == 'div' and 'match' in classes and len(classes) <= 3
+        
+        matches = []
+        for container, _ in iter_containers(html, select, page):
+            try:
+                match = self._parse_match_container(container, match_date)
+                if match:
+                    matches.append(match)
+            except Exception as e:
+                logger.error(f"Error parsing a match: {e}")
+                continue
+        return matches
+
+    @tracing.traced()
     def _get_match_datetime_from_page(self, match_url: str) -> Optional[datetime]:
         """Fetch the match page and extract the actual datetime from countdown or data attributes"""
         # Check cache first
         if match_url in self._datetime_cache:
+            metrics.CACHE_LOOKUPS.inc(cache='datetime', result='hit')
             logger.debug(f"Using cached datetime for {match_url}")
             return self._datetime_cache[match_url]
         
+        metrics.CACHE_LOOKUPS.inc(cache='datetime', result='miss')
+        # Concurrent lookups of the same match page share one request
+        return self._single_flight.do(f'match_page:{match_url}', lambda: self._fetch_match_datetime(match_url))
+    
+    def _fetch_match_datetime(self, match_url: str) -> Optional[datetime]:
+        """Fetch a match page and parse its datetime (see _get_match_datetime_from_page)"""
         try:
             self._rate_limit()
             # match_url is the full path like /matches/2388091/mouz-vs-parivision-starladder-budapest-major-2025
             full_url = f"https://www.hltv.org{match_url}"
-            response = self.session.get(full_url, timeout=10)
-            response.raise_for_status()
+            response = self._get('match_page', full_url, timeout=10)
             
-            soup = BeautifulSoup(response.text, 'lxml')
-            
-            # Look for Unix timestamp in data-unix attribute
-            unix_elements = soup.find_all(attrs={'data-unix': True})
-            if unix_elements:
-                unix_timestamp = int(unix_elements[0]['data-unix'])
-                # Unix timestamp is in milliseconds
-                match_datetime = datetime.fromtimestamp(unix_timestamp / 1000)
-                logger.debug(f"Match {match_url}: Found datetime from Unix timestamp: {match_datetime}")
-                # Cache the result
-                self._datetime_cache[match_url] = match_datetime
-                return match_datetime
-            
-            # Fallback: Look for time element with datetime attribute
-            time_elem = soup.find('div', class_='time')
-            if time_elem:
-                unix_attr = time_elem.get('data-unix')
-                if unix_attr:
-                    unix_timestamp = int(unix_attr)
-                    match_datetime = datetime.fromtimestamp(unix_timestamp / 1000)
-                    logger.debug(f"Match {match_url}: Found datetime from time element: {match_datetime}")
-                    # Cache the result
-                    self._datetime_cache[match_url] = match_datetime
-                    return match_datetime
-            
-            logger.warning(f"Match {match_url}: Could not find datetime on match page")
-            return None
+            match_datetime = self._parse_match_page(response.text)
+            if match_datetime is None:
+                logger.warning(f"Match {match_url}: Could not find datetime on match page")
+                return None
+            logger.debug(f"Match {match_url}: Found datetime {match_datetime}")
+            # Cache the result
+            self._datetime_cache[match_url] = match_datetime
+            return match_datetime
             
         except Exception as e:
             logger.error(f"Error fetching match page {match_url}: {e}")
             return None
 
+    def _parse_match_page(self, html: str) -> Optional[datetime]:
+        """Kickoff time of a match page"""
+        soup = parse_html(html, 'match_page')
+        
+        # Look for Unix timestamp in data-unix attribute (milliseconds)
+        unix_elements = soup.find_all(attrs={'data-unix': True})
+        if unix_elements:
+            return datetime.fromtimestamp(int(unix_elements[0]['data-unix']) / 1000)
+        
+        # Fallback: Look for time element with datetime attribute
+        time_elem = soup.find('div', class_='time')
+        if time_elem and time_elem.get('data-unix'):
+            return datetime.fromtimestamp(int(time_elem.get('data-unix')) / 1000)
+        return None
+
     def _parse_match_container(self, container, match_date: datetime.date = None) -> Optional[Match]:
         """Parse a match container (new HLTV structure)"""
         try:
@@ -631,34 +1064,139 @@ class HLTVScraper:
             logger.error(f"Error parsing time '{time_str}': {e}")
         return None
 
-    def get_recent_results(self, hours: int = 24) -> List[Match]:
-        """Get recent results (approximately last 24 hours, no exact date filtering available)"""
+    @tracing.traced()
+    def get_recent_results(self, hours: int = 24, use_cache: bool = True) -> List[Match]:
+        """Get results of the last `hours` hours from the first results page
+        
+        Args:
+            hours: Only return results from the last hours
+            use_cache: If True, serve the results snapshot (stale-while-revalidate)
+        """
+        state = self._snapshot_state(self._results_cache, self._results_cache_time,
+                                     self._results_cache_duration, self._results_max_staleness)
+        metrics.CACHE_LOOKUPS.inc(cache='results', result=self._lookup_result(use_cache, state))
+        if use_cache and state != 'expired':
+            if state == 'stale':
+                logger.info("Serving stale results, refreshing in background")
+                self._refresh_in_background('results:0', lambda: self._fetch_results_page_uncoalesced(0))
+            results = self._results_cache
+        else:
+            results = self._fetch_results_page(0)
+            if results is None:
+                if state == 'expired':
+                    return []
+                logger.warning("Error fetching results, serving last good snapshot")
+                results = self._results_cache
+        
+        since = datetime.now() - timedelta(hours=hours)
+        # Results without timestamp can't be filtered - keep them
+        recent = [r for r in results if r._time is None or r._time >= since]
+        logger.info(f"Found {len(recent)} results in the last {hours}h")
+        return recent
+
+    @tracing.traced()
+    def get_new_results(self, max_pages: int = RESULTS_MAX_PAGES) -> Optional[List[Match]]:
+        """Incrementally fetch results that were not ingested yet
+        
+        Pages through /results?offset= (newest first) until the first already
+        known match ID, so each cycle fetches exactly as many pages as needed.
+        The caller has to mark the returned results as seen (db.mark_results_seen)
+        once it has processed them - that advances the high-water mark.
+        
+        On the very first run only the first page is fetched.
+        
+        Returns:
+            New results (newest first), or None if a page could not be fetched.
+            Partial results are never returned, so nothing gets lost on errors.
+        """
+        if not self.db:
+            logger.error("No database set, cannot ingest results incrementally")
+            return None
+        
+        bootstrap = not self.db.has_seen_results()
+        new_results = []
+        seen_ids = set()
+        
+        for page in range(max_pages):
+            results = self._fetch_results_page(page * RESULTS_PAGE_SIZE)
+            if results is None:
+                logger.warning(f"Results ingestion aborted at page {page + 1}, retrying next cycle")
+                return None
+            
+            known_ids = self.db.get_seen_result_ids(r.match_id for r in results)
+            reached_known = False
+            for result in results:
+                if result.match_id in known_ids:
+                    reached_known = True
+                    break
+                if result.match_id not in seen_ids:
+                    seen_ids.add(result.match_id)
+                    new_results.append(result)
+            
+            if reached_known or bootstrap or len(results) < RESULTS_PAGE_SIZE:
+                logger.info(f"Found {len(new_results)} new results ({page + 1} page(s) fetched)")
+                return new_results
+        
+        logger.warning(f"Reached page limit ({max_pages}) before any known result - older results may be missing")
+        return new_results
+
+    def _fetch_results_page(self, offset: int = 0) -> Optional[List[Match]]:
+        """Fetch and parse one /results page (concurrent callers share one request)
+        
+        Returns:
+            Parsed results in page order (newest first), or None on errors
+        """
+        return self._single_flight.do(f'results:{offset}', lambda: self._fetch_results_page_uncoalesced(offset))
+    
+    def _fetch_results_page_uncoalesced(self, offset: int) -> Optional[List[Match]]:
+        """Fetch and parse one /results page"""
         try:
             self._rate_limit()
-            response = self.session.get(HLTV_RESULTS_URL, timeout=10)
-            response.raise_for_status()
-            
-            soup = BeautifulSoup(response.text, 'lxml')
-            results = []
-            
-            # Find all result containers
-            result_containers = soup.find_all('div', class_='result-con')
+            url = f"{HLTV_RESULTS_URL}?offset={offset}" if offset else HLTV_RESULTS_URL
+            chunks = self._get_chunks('results', url, timeout=10)
+            results = self._parse_results_page(chunks)
             
-            for container in result_containers[:20]:  # Limit to newest 20
-                try:
-                    result = self._parse_result_container(container)
-                    if result:
-                        results.append(result)
-                except Exception as e:
-                    logger.error(f"Error parsing a result: {e}")
-                    continue
+            logger.info(f"Found {len(results)} results at offset {offset}")
             
-            logger.info(f"Found {len(results)} results")
+            # Every successful fetch of the first page refreshes the results snapshot
+            if offset == 0 and (results or not self._results_cache):
+                self._results_cache = results
+                self._results_cache_time = time.time()
             return results
             
         except Exception as e:
-            logger.error(f"Error fetching results: {e}")
-            return []
+            logger.error(f"Error fetching results (offset {offset}): {e}")
+            return None
+
+    def _parse_results_page(self, html: Union[str, Iterable[bytes]]) -> List[Match]:
+        """Results of a /results page in page order (newest first), without duplicates
+        
+        Args:
+            html: The page, or its chunks as they are downloaded (see iter_containers)
+        """
+        def select(tag, classes):
+            return tag == 'div' and 'result-con' in classes
+        
+        # The first page starts with featured results that repeat further down -
+        # only use the chronological list if it exists
+        listed = []
+        others = []
+        for container, outer_classes in iter_containers(html, select, 'results'):
+            try:
+                result = self._parse_result_container(container)
+                if result:
+                    (listed if 'results-all' in outer_classes else others).append(result)
+            except Exception as e:
+                logger.error(f"Error parsing a result: {e}")
+                continue
+        
+        results = []
+        seen_ids = set()
+        for result in listed or others:
+            if result.match_id not in seen_ids:
+                seen_ids.add(result.match_id)
+                results.append(result)
+        return results
 
     def _parse_result_container(self, container) -> Optional[Match]:
         """Parse a result container"""
@@ -705,12 +1243,18 @@ class HLTVScraper:
             star_divs = container.find_all('i', class_='fa-star')
             stars = len(star_divs)
             
+            # Match time - Unix timestamp in milliseconds
+            match_time = None
+            unix_attr = container.get('data-zonedgrouping-entry-unix')
+            if unix_attr:
+                match_time = datetime.fromtimestamp(int(unix_attr) / 1000)
+            
             match = Match(
                 match_id=match_id,
                 team1=team1_name,
                 team2=team2_name,
                 event=event,
-                time=None,
+                time=match_time,
                 stars=stars,
                 score=score,
                 status="finished"
@@ -0,0 +1,113 @@
+import asyncio
+import logging
+import os
+import sys
+import threading
+import time
+import traceback
+from collections import deque
+from typing import List, Optional
+
+import metrics
+
+logger = logging.getLogger(__name__)
+
+PROJECT_DIR = os.path.dirname(os.path.abspath(__file__))
+# Decorators wrapping handlers and jobs - their wrapper frames never own a stall
+WRAPPER_FILES = {os.path.abspath(__file__)} | {os.path.join(PROJECT_DIR, name) for name in ('tracing.py', 'profiling.py')}
+
+
+def task_frames(stack: List[traceback.FrameSummary]) -> List[traceback.FrameSummary]:
+    """Drop the event loop/asyncio frames above the running task step
+
+    Every callback or task step starts in asyncio's Handle._run.
+    """
+    entry = os.path.join('asyncio', 'events.py')
+    start = max((i for i, frame in enumerate(stack)
+                 if frame.name == '_run' and frame.filename.endswith(entry)), default=-1)
+    return stack[start + 1:]
+
+
+def blocking_owner(frames: List[traceback.FrameSummary]) -> str:
+    """Name the handler or job owning a task step, e.g. today_command or check_match_results
+
+    That is the outermost frame from our own modules, skipping the wrappers
+    of tracing.traced and profiling.profiled.
+    """
+    for frame in frames:
+        filename = os.path.abspath(frame.filename)
+        if filename.startswith(PROJECT_DIR) and filename not in WRAPPER_FILES:
+            return frame.name
+    return frames[-1].name if frames else 'unknown'
+
+
+class LoopMonitor:
+    """Measures event loop lag and reports what blocks the loop
+
+    A heartbeat coroutine wakes up every `interval` seconds. A watcher thread
+    notices when the heartbeat is overdue by more than `threshold` seconds,
+    captures the stack of the event loop thread while it is still blocked and
+    logs it, tagged with the handler or job that holds the loop.
+    """
+
+    def __init__(self, threshold: float, interval: float = 0.1, keep_reports: int = 20):
+        self.threshold = threshold
+        self.interval = interval
+        self.reports = deque(maxlen=keep_reports)  # Latest stalls: {'owner', 'lag', 'stack', 'at'}
+        self._last_beat = time.monotonic()
+        self._current = None  # Report of the stall in progress
+        self._loop_thread_id = None
+        self._task: Optional[asyncio.Task] = None
+        self._stopped = threading.Event()
+
+    def start(self):
+        """Start monitoring the running event loop (call from within the loop)"""
+        self._loop_thread_id = threading.get_ident()
+        self._last_beat = time.monotonic()
+        self._task = asyncio.get_running_loop().create_task(self._heartbeat())
+        threading.Thread(target=self._watch, name='loop-monitor', daemon=True).start()
+        logger.info(f"Event loop monitor started (threshold: {self.threshold * 1000:.0f}ms)")
+
+    def stop(self):
+        self._stopped.set()
+        if self._task:
+            self._task.cancel()
+
+    async def _heartbeat(self):
+        while True:
+            start = time.monotonic()
+            await asyncio.sleep(self.interval)
+            now = time.monotonic()
+            lag = max(0.0, now - start - self.interval)
+            self._last_beat = now
+            metrics.EVENT_LOOP_LAG_SECONDS.observe(lag)
+
+            report = self._current
+            if report is not None:
+                self._current = None
+                report['lag'] = lag
+                if lag >= self.threshold:
+                    logger.warning(f"Event loop was blocked for {lag * 1000:.0f}ms by {report['owner']}")
+
+    def _watch(self):
+        while not self._stopped.wait(self.interval):
+            beat = self._last_beat
+            blocked = time.monotonic() - beat - self.interval
+            if blocked < self.threshold or self._current is not None:
+                continue
+
+            frame = sys._current_frames().get(self._loop_thread_id)
+            if frame is None:
+                continue
+            frames = task_frames(traceback.extract_stack(frame))
+            del frame
+            if self._last_beat != beat:
+                continue  # The loop recovered while we looked
+
+            owner = blocking_owner(frames)
+            report = {'owner': owner, 'lag': blocked, 'stack': ''.join(traceback.format_list(frames)),
+                      'at': time.time()}
+            self._current = report
+            self.reports.append(report)
+            metrics.EVENT_LOOP_STALLS.inc(owner=owner)
+            logger.warning(f"Event loop blocked for {blocked * 1000:.0f}ms+ by {owner}:\n{report['stack']}")
@@ -0,0 +1,285 @@
+import logging
+import threading
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+from typing import Callable, Dict, Iterable, List, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Default histogram buckets in seconds (HTTP requests, DB queries, jobs)
+DEFAULT_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+
+Sample = Tuple[str, Dict[str, str], float]  # (name, labels, value)
+
+
+def _escape(value) -> str:
+    return str(value).replace('\\', '\\\\').replace('\n', '\\n').replace('"', '\\"')
+
+
+def _format_labels(labels: Dict[str, str]) -> str:
+    if not labels:
+        return ''
+    return '{' + ','.join(f'{key}="{_escape(value)}"' for key, value in sorted(labels.items())) + '}'
+
+
+def _format_value(value: float) -> str:
+    if value == float('inf'):
+        return '+Inf'
+    if float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+
+class _Metric:
+    """Base class for metrics with a fixed set of label names"""
+    type_name = 'untyped'
+
+    def __init__(self, name: str, documentation: str, labelnames: Iterable[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+
+    def _key(self, labels: Dict[str, str]) -> Tuple[str, ...]:
+        if set(labels) != set(self.labelnames):
+            raise ValueError(f"{self.name} expects labels {self.labelnames}, got {tuple(labels)}")
+        return tuple(str(labels[name]) for name in self.labelnames)
+
+    def samples(self) -> List[Sample]:
+        raise NotImplementedError
+
+
+class Counter(_Metric):
+    """Monotonically increasing value per label set"""
+    type_name = 'counter'
+
+    def __init__(self, name: str, documentation: str, labelnames: Iterable[str] = ()):
+        super().__init__(name, documentation, labelnames)
+        self._values: Dict[Tuple[str, ...], float] = {}
+
+    def inc(self, amount: float = 1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def samples(self) -> List[Sample]:
+        with self._lock:
+            return [(self.name, dict(zip(self.labelnames, key)), value)
+                    for key, value in self._values.items()]
+
+
+class Gauge(_Metric):
+    """Value per label set that can go up and down"""
+    type_name = 'gauge'
+
+    def __init__(self, name: str, documentation: str, labelnames: Iterable[str] = ()):
+        super().__init__(name, documentation, labelnames)
+        self._values: Dict[Tuple[str, ...], float] = {}
+
+    def set(self, value: float, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = value
+
+    def samples(self) -> List[Sample]:
+        with self._lock:
+            return [(self.name, dict(zip(self.labelnames, key)), value)
+                    for key, value in self._values.items()]
+
+
+class Histogram(_Metric):
+    """Observations bucketed per label set, with sum and count"""
+    type_name = 'histogram'
+
+    def __init__(self, name: str, documentation: str, labelnames: Iterable[str] = (),
+                 buckets: Iterable[float] = DEFAULT_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+        self._values: Dict[Tuple[str, ...], list] = {}  # key -> [bucket counts..., sum, count]
+
+    def observe(self, value: float, **labels):
+        key = self._key(labels)
+        index = bisect_left(self.buckets, value)
+        with self._lock:
+            data = self._values.get(key)
+            if data is None:
+                data = self._values[key] = [0] * len(self.buckets) + [0.0, 0]
+            if index < len(self.buckets):
+                data[index] += 1
+            data[-2] += value
+            data[-1] += 1
+
+    @contextmanager
+    def time(self, **labels):
+        """Observe the duration of the with-block"""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start, **labels)
+
+    def samples(self) -> List[Sample]:
+        samples = []
+        with self._lock:
+            for key, data in self._values.items():
+                labels = dict(zip(self.labelnames, key))
+                cumulative = 0
+                for bound, count in zip(self.buckets, data):
+                    cumulative += count
+                    samples.append((f"{self.name}_bucket", {**labels, 'le': _format_value(bound)}, cumulative))
+                samples.append((f"{self.name}_bucket", {**labels, 'le': '+Inf'}, data[-1]))
+                samples.append((f"{self.name}_sum", labels, data[-2]))
+                samples.append((f"{self.name}_count", labels, data[-1]))
+        return samples
+
+
+class Registry:
+    """Holds all metrics of the process and renders them in Prometheus text format"""
+
+    def __init__(self):
+        self._metrics: Dict[str, _Metric] = {}
+        self._collectors: List[Tuple[str, str, str, Callable[[], List[Sample]]]] = []
+        self._lock = threading.Lock()
+
+    def register(self, metric: _Metric) -> _Metric:
+        with self._lock:
+            if metric.name in self._metrics:
+                raise ValueError(f"Metric {metric.name} already registered")
+            self._metrics[metric.name] = metric
+        return metric
+
+    def register_collector(self, name: str, type_name: str, documentation: str,
+                           collect: Callable[[], List[Sample]]):
+        """Add samples computed at scrape time (e.g. from existing stats)"""
+        with self._lock:
+            self._collectors.append((name, type_name, documentation, collect))
+
+    def render(self) -> str:
+        lines = []
+        with self._lock:
+            metrics = list(self._metrics.values())
+            collectors = list(self._collectors)
+
+        families = [(m.name, m.type_name, m.documentation, m.samples) for m in metrics] + collectors
+        for name, type_name, documentation, collect in families:
+            try:
+                samples = collect()
+            except Exception as e:
+                logger.error(f"Error collecting metric {name}: {e}")
+                continue
+            lines.append(f"# HELP {name} {documentation}")
+            lines.append(f"# TYPE {name} {type_name}")
+            for sample_name, labels, value in samples:
+                lines.append(f"{sample_name}{_format_labels(labels)} {_format_value(value)}")
+        return '\n'.join(lines) + '\n'
+
+
+REGISTRY = Registry()
+
+# HLTV scraping
+HLTV_REQUEST_SECONDS = REGISTRY.register(Histogram(
+    'hltv_request_seconds', 'HLTV request latency by endpoint and HTTP status', ('endpoint', 'status')))
+HLTV_RATE_LIMIT_WAIT_SECONDS = REGISTRY.register(Histogram(
+    'hltv_rate_limit_wait_seconds', 'Time spent waiting for the HLTV rate limit',
+    buckets=(0, 0.1, 0.5, 1, 2, 3, 5, 10, 30)))
+HLTV_PARSE_SECONDS = REGISTRY.register(Histogram(
+    'hltv_parse_seconds', 'HTML parse duration by page', ('page',)))
+CACHE_LOOKUPS = REGISTRY.register(Counter(
+    'cache_lookups_total', 'Cache lookups by cache and result (hit, stale, miss)', ('cache', 'result')))
+
+# Database
+DB_QUERY_SECONDS = REGISTRY.register(Histogram(
+    'db_query_seconds', 'SQLite statement latency by statement type', ('statement',)))
+
+# Telegram
+TELEGRAM_MESSAGES = REGISTRY.register(Counter(
+    'telegram_messages_total', 'Outbox deliveries by result (sent, retry, flood_control, failed)', ('result',)))
+TELEGRAM_SEND_SECONDS = REGISTRY.register(Histogram(
+    'telegram_send_seconds', 'Telegram sendMessage latency'))
+
+# Event loop
+EVENT_LOOP_LAG_SECONDS = REGISTRY.register(Histogram(
+    'event_loop_lag_seconds', 'Delay of the event loop heartbeat',
+    buckets=(0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)))
+EVENT_LOOP_STALLS = REGISTRY.register(Counter(
+    'event_loop_stalls_total', 'Event loop blocked longer than the threshold, by handler/job', ('owner',)))
+
+# Startup
+STARTUP_SECONDS = REGISTRY.register(Gauge(
+    'startup_seconds', 'Seconds from process start until the bot was ready / answered its first update', ('phase',)))
+
+# Scheduler
+JOB_SECONDS = REGISTRY.register(Histogram(
+    'job_seconds', 'Scheduled job duration by job and outcome', ('job', 'outcome')))
+
+
+def register_coalescing_stats(scraper):
+    """Expose the scraper's single-flight counters (see HLTVScraper.get_coalescing_stats)"""
+    def collect() -> List[Sample]:
+        stats = scraper.get_coalescing_stats()
+        return [('hltv_fetches_total', {'resource': resource, 'mode': mode}, count)
+                for mode, counts in stats.items() for resource, count in counts.items()]
+
+    REGISTRY.register_collector(
+        'hltv_fetches_total', 'counter',
+        'HLTV fetches by resource, executed or coalesced into an in-flight fetch', collect)
+
+
+def instrument_scheduler(scheduler):
+    """Record the duration of every APScheduler job run in JOB_SECONDS"""
+    from apscheduler.events import EVENT_JOB_SUBMITTED, EVENT_JOB_EXECUTED, EVENT_JOB_ERROR
+
+    started = {}
+    lock = threading.Lock()
+
+    def listener(event):
+        key = (event.job_id, event.scheduled_run_times[0] if event.code == EVENT_JOB_SUBMITTED
+               else event.scheduled_run_time)
+        with lock:
+            if event.code == EVENT_JOB_SUBMITTED:
+                started[key] = time.perf_counter()
+                return
+            start = started.pop(key, None)
+        if start is None:
+            return
+        # One-shot jobs carry per-instance IDs (e.g. prematch:<user>:<match>)
+        job = event.job_id.split(':', 1)[0]
+        outcome = 'error' if event.code == EVENT_JOB_ERROR else 'success'
+        JOB_SECONDS.observe(time.perf_counter() - start, job=job, outcome=outcome)
+
+    scheduler.add_listener(listener, EVENT_JOB_SUBMITTED | EVENT_JOB_EXECUTED | EVENT_JOB_ERROR)
+
+
+def start_http_server(port: int, addr: str = '127.0.0.1'):
+    """Serve /metrics in a daemon thread
+
+    Returns:
+        The server, or None if it could not be started
+    """
+    from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+    class MetricsHandler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            if self.path.split('?', 1)[0] != '/metrics':
+                self.send_error(404)
+                return
+            body = REGISTRY.render().encode('utf-8')
+            self.send_response(200)
+            self.send_header('Content-Type', 'text/plain; version=0.0.4; charset=utf-8')
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format, *args):
+            pass  # Scraped every few seconds - don't log every request
+
+    try:
+        server = ThreadingHTTPServer((addr, port), MetricsHandler)
+    except OSError as e:
+        logger.error(f"Could not start metrics endpoint on {addr}:{port}: {e}")
+        return None
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, name='metrics-http', daemon=True).start()
+    logger.info(f"Metrics endpoint listening on http://{addr}:{port}/metrics")
+    return server
@@ -0,0 +1,257 @@
+import gzip
+import hashlib
+import logging
+import os
+import threading
+import time
+from datetime import datetime
+from typing import Dict, List, Optional
+from urllib.parse import parse_qs, urlparse
+
+from config import DATABASE_PATH, PAGE_STORE_DIR, PAGE_STORE_MAX_MB, PAGE_STORE_RETENTION_DAYS
+
+logger = logging.getLogger(__name__)
+
+# Age/size limits are enforced at most this often (and whenever the size cap is exceeded)
+PRUNE_INTERVAL = 3600
+
+
+class PageStore:
+    """Compressed, content-addressed store of fetched HLTV pages
+
+    Every page is gzip-compressed and written once per distinct content, as
+    objects/<2 hex>/<sha256>.html.gz; the database records every fetch
+    (endpoint, URL, time, hash). Fetches older than `retention_days` are
+    dropped, then the least recently fetched pages beyond `max_bytes`.
+    """
+
+    def __init__(self, db, directory: str, max_bytes: int, retention_days: int):
+        self.db = db
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.retention_days = retention_days
+        self._stored_bytes = None  # Estimate, corrected by every prune
+        self._last_prune = 0.0
+        self._lock = threading.Lock()
+
+    def path(self, sha256: str) -> str:
+        """File of a stored page (gzip-compressed)"""
+        return os.path.join(self.directory, 'objects', sha256[:2], f"{sha256}.html.gz")
+
+    def put(self, endpoint: str, url: str, html: str) -> str:
+        """Store a fetched page
+
+        Returns:
+            Its content hash
+        """
+        writer = self.open(endpoint, url)
+        writer.write(html.encode('utf-8'))
+        return writer.close()
+
+    def open(self, endpoint: str, url: str) -> 'PageWriter':
+        """Store a page while it is streamed in (see PageWriter)"""
+        return PageWriter(self, endpoint, url)
+
+    def _commit(self, endpoint: str, url: str, sha256: str, size: int, tmp_path: str) -> str:
+        """Record the fetch of a written page and move it to its content address
+
+        Both happen in one database transaction with prune, which could
+        otherwise delete the file of a fetch being recorded. The file is
+        placed after the rows were inserted and removed again if the
+        transaction fails, so no file is left without a record.
+        """
+        path = self.path(sha256)
+        stored_size = os.path.getsize(tmp_path)
+        placed = []
+
+        def place(new: bool):
+            # A new blob replaces any file left behind without a record
+            if new or not (os.path.exists(path) and os.path.getsize(path)):
+                os.makedirs(os.path.dirname(path), exist_ok=True)
+                os.replace(tmp_path, path)
+                placed.append(path)
+            else:
+                os.remove(tmp_path)
+
+        new = self.db.record_page_fetch(endpoint, url, sha256, size, stored_size, place)
+        if new is None:
+            # Rolled back (database error) - leave neither the temporary nor a placed file behind
+            for leftover in [tmp_path] + placed:
+                try:
+                    os.remove(leftover)
+                except FileNotFoundError:
+                    pass
+            return sha256
+
+        with self._lock:
+            if self._stored_bytes is None:
+                self._stored_bytes = self.db.get_page_store_size()[2]
+            elif new:
+                self._stored_bytes += stored_size
+            due = (self._stored_bytes > self.max_bytes
+                   or time.monotonic() - self._last_prune > PRUNE_INTERVAL)
+        if due:
+            self.prune()
+        return sha256
+
+    def _remove_files(self, hashes: List[str]):
+        for sha256 in hashes:
+            try:
+                os.remove(self.path(sha256))
+            except FileNotFoundError:
+                pass
+
+    def get(self, sha256: str) -> Optional[str]:
+        """Content of a stored page (None if it was pruned)"""
+        try:
+            with gzip.open(self.path(sha256), 'rb') as f:
+                return f.read().decode('utf-8')
+        except FileNotFoundError:
+            return None
+
+    def fetches(self, endpoint: Optional[str] = None, since: float = 0, limit: Optional[int] = None) -> List[Dict]:
+        """Recorded fetches, newest first (see Database.get_page_fetches)"""
+        return self.db.get_page_fetches(endpoint, since, limit)
+
+    def prune(self):
+        """Apply retention and the size cap, deleting pages no fetch refers to anymore"""
+        with self._lock:
+            self._last_prune = time.monotonic()
+        older_than = time.time() - self.retention_days * 86400
+        removed = self.db.prune_page_store(older_than, self.max_bytes, self._remove_files)
+        pages, _, stored_bytes = self.db.get_page_store_size()
+        with self._lock:
+            self._stored_bytes = stored_bytes
+        if removed:
+            logger.info(f"Pruned {len(removed)} stored pages ({pages} left, {stored_bytes / 1e6:.1f} MB)")
+
+
+class PageWriter:
+    """A page being stored chunk by chunk
+
+    Hashes and compresses the chunks into a temporary file as they come, so a
+    streamed page is never held in memory as a whole. Only complete pages
+    are stored: close() commits it, abort() (e.g. after a failed download)
+    discards it.
+    """
+
+    def __init__(self, store: PageStore, endpoint: str, url: str):
+        self.store = store
+        self.endpoint = endpoint
+        self.url = url
+        self._sha256 = hashlib.sha256()
+        self._size = 0
+        tmp_dir = os.path.join(store.directory, 'tmp')
+        os.makedirs(tmp_dir, exist_ok=True)
+        self._tmp_path = os.path.join(tmp_dir, f"{threading.get_ident()}-{id(self)}.html.gz.tmp")
+        self._file = gzip.open(self._tmp_path, 'wb', compresslevel=6)
+
+    def write(self, chunk: bytes):
+        self._sha256.update(chunk)
+        self._size += len(chunk)
+        self._file.write(chunk)
+
+    def close(self) -> str:
+        """Commit the page
+
+        Returns:
+            Its content hash
+        """
+        self._file.close()
+        return self.store._commit(self.endpoint, self.url, self._sha256.hexdigest(), self._size, self._tmp_path)
+
+    def abort(self):
+        self._file.close()
+        try:
+            os.remove(self._tmp_path)
+        except FileNotFoundError:
+            pass
+
+
+def from_config(db) -> Optional[PageStore]:
+    """The page store as configured (None if PAGE_STORE_MAX_MB is 0)"""
+    if PAGE_STORE_MAX_MB <= 0:
+        return None
+    return PageStore(db, PAGE_STORE_DIR, PAGE_STORE_MAX_MB * 1024 * 1024, PAGE_STORE_RETENTION_DAYS)
+
+
+def reparse(scraper, store: PageStore, fetch: Dict):
+    """Run the current parser of a stored page's endpoint on it
+
+    Returns:
+        The parsed result (list of matches/teams, or a datetime), or None if
+        the page is gone or its endpoint has no parser
+    """
+    html = store.get(fetch['sha256'])
+    if html is None:
+        return None
+
+    endpoint = fetch['endpoint']
+    if endpoint == 'matches':
+        return scraper._parse_matches_page(html, 'matches', datetime.fromtimestamp(fetch['fetched_at']).date())
+    if endpoint == 'matches_date':
+        day = parse_qs(urlparse(fetch['url']).query).get('selectedDate', [None])[0]
+        return scraper._parse_matches_page(html, 'matches_date', datetime.strptime(day, '%Y-%m-%d').date() if day else None)
+    if endpoint == 'results':
+        return scraper._parse_results_page(html)
+    if endpoint == 'match_page':
+        return scraper._parse_match_page(html)
+    if endpoint == 'rankings':
+        return scraper._parse_rankings_page(html)
+    return None
+
+
+def main():
+    """Inspect the page store and re-parse stored pages offline (no HLTV requests)
+
+    python page_store.py stats
+    python page_store.py reparse [--endpoint results] [--hours 24] [--limit 50]
+    """
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Stored HLTV pages")
+    parser.add_argument('command', choices=('stats', 'reparse'))
+    parser.add_argument('--endpoint', help='only pages of this endpoint (matches, matches_date, results, match_page, rankings)')
+    parser.add_argument('--hours', type=float, default=0, help='only pages fetched in the last N hours')
+    parser.add_argument('--limit', type=int, help='at most N pages, newest first')
+    args = parser.parse_args()
+
+    logging.basicConfig(format='%(asctime)s - %(name)s - %(levelname)s - %(message)s', level=logging.WARNING)
+
+    from database import Database
+    from hltv_scraper import HLTVScraper
+
+    db = Database(DATABASE_PATH)
+    store = PageStore(db, PAGE_STORE_DIR, PAGE_STORE_MAX_MB * 1024 * 1024, PAGE_STORE_RETENTION_DAYS)
+    since = time.time() - args.hours * 3600 if args.hours else 0
+    fetches = store.fetches(args.endpoint, since, args.limit)
+
+    if args.command == 'stats':
+        pages, size, stored_size = db.get_page_store_size()
+        by_endpoint = {}
+        for fetch in fetches:
+            by_endpoint[fetch['endpoint']] = by_endpoint.get(fetch['endpoint'], 0) + 1
+        print(f"{len(fetches)} fetches of {pages} distinct pages, "
+              f"{size / 1e6:.1f} MB stored as {stored_size / 1e6:.1f} MB")
+        for endpoint, count in sorted(by_endpoint.items()):
+            print(f"  {endpoint:<14} {count:6d} fetches")
+        return
+
+    # Distinct contents only: a page fetched unchanged many times is parsed once
+    scraper = HLTVScraper()
+    seen = set()
+    empty = 0
+    for fetch in fetches:
+        if fetch['sha256'] in seen:
+            continue
+        seen.add(fetch['sha256'])
+        parsed = reparse(scraper, store, fetch)
+        count = len(parsed) if isinstance(parsed, list) else int(parsed is not None)
+        empty += not count
+        fetched_at = time.strftime('%Y-%m-%d %H:%M', time.localtime(fetch['fetched_at']))
+        print(f"{fetched_at}  {fetch['endpoint']:<14} {count:5d} parsed  {fetch['url']}")
+    print(f"\n{len(seen)} pages re-parsed, {empty} without any result")
+
+
+if __name__ == '__main__':
+    main()
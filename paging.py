@@ -0,0 +1,134 @@
+import secrets
+import threading
+import time
+from collections import OrderedDict, deque
+from typing import Dict, List, Optional, Tuple
+
+from telegram import InlineKeyboardButton, InlineKeyboardMarkup
+
+# Callback data of paging buttons: page:<token>:<page>:<min stars>
+CALLBACK_PREFIX = 'page'
+
+Entry = Tuple[int, str, str]  # (stars, section header, pre-rendered match text)
+
+
+class ResultSet:
+    """Sorted and pre-rendered matches of one query
+
+    Built once per /today or /alltoday; paging and star filters only slice
+    these entries and never touch the scraper, filter or sort again.
+    """
+
+    def __init__(self, title: str, entries: List[Entry], empty_text: str):
+        self.title = title
+        self.entries = entries
+        self.empty_text = empty_text
+        # Filters worth offering: every rating present except the lowest (that is 'All')
+        self.star_levels = sorted({stars for stars, _, _ in entries})[1:]
+        self._filtered: Dict[int, List[Entry]] = {0: entries}
+
+    def filtered(self, min_stars: int) -> List[Entry]:
+        """Entries with at least min_stars (0 = all), computed once per level"""
+        if min_stars not in self._filtered:
+            self._filtered[min_stars] = [e for e in self.entries if e[0] >= min_stars]
+        return self._filtered[min_stars]
+
+
+class ResultSetCache:
+    """Result sets by short token, dropped after `ttl` seconds or when more than `max_size` are kept"""
+
+    def __init__(self, ttl: float, max_size: int):
+        self.ttl = ttl
+        self.max_size = max_size
+        self._sets: OrderedDict = OrderedDict()  # token -> (created, ResultSet), least recently used first
+        self._expiry: deque = deque()  # (created, token) in creation order - get() reorders _sets
+        self._lock = threading.Lock()
+
+    def put(self, result_set: ResultSet) -> str:
+        token = secrets.token_urlsafe(6)
+        now = time.monotonic()
+        with self._lock:
+            # Expired sets go right away, not only once max_size is reached
+            while self._expiry and now - self._expiry[0][0] > self.ttl:
+                self._sets.pop(self._expiry.popleft()[1], None)
+            self._sets[token] = (now, result_set)
+            self._expiry.append((now, token))
+            while len(self._sets) > self.max_size:
+                self._sets.popitem(last=False)
+        return token
+
+    def get(self, token: str) -> Optional[ResultSet]:
+        with self._lock:
+            item = self._sets.get(token)
+            if item is None:
+                return None
+            if time.monotonic() - item[0] > self.ttl:
+                del self._sets[token]
+                return None
+            self._sets.move_to_end(token)
+            return item[1]
+
+
+def parse_callback(data: str) -> Optional[Tuple[str, int, int]]:
+    """(token, page, min stars) of a paging button, or None for other callbacks"""
+    parts = data.split(':')
+    if len(parts) != 4 or parts[0] != CALLBACK_PREFIX:
+        return None
+    try:
+        return parts[1], int(parts[2]), int(parts[3])
+    except ValueError:
+        return None
+
+
+def _keyboard(result_set: ResultSet, token: str, page: int, pages: int, min_stars: int) -> Optional[InlineKeyboardMarkup]:
+    rows = []
+
+    nav = []
+    if page > 0:
+        nav.append(InlineKeyboardButton("◀ Prev", callback_data=f"{CALLBACK_PREFIX}:{token}:{page - 1}:{min_stars}"))
+    if page < pages - 1:
+        nav.append(InlineKeyboardButton("Next ▶", callback_data=f"{CALLBACK_PREFIX}:{token}:{page + 1}:{min_stars}"))
+    if nav:
+        rows.append(nav)
+
+    # Star filters start again at the first page
+    if result_set.star_levels:
+        filters = []
+        for stars in [0] + result_set.star_levels:
+            label = "All" if stars == 0 else f"{stars}☆+"
+            if stars == min_stars:
+                label = f"· {label} ·"
+            filters.append(InlineKeyboardButton(label, callback_data=f"{CALLBACK_PREFIX}:{token}:0:{stars}"))
+        rows.append(filters)
+
+    return InlineKeyboardMarkup(rows) if rows else None
+
+
+def render_page(result_set: ResultSet, page: int = 0, min_stars: int = 0, page_size: int = 8,
+                token: Optional[str] = None, footer: str = "") -> Tuple[str, Optional[InlineKeyboardMarkup]]:
+    """Text and inline keyboard of one page
+
+    Without a token (result set not cached yet) no buttons are added.
+    """
+    entries = result_set.filtered(min_stars)
+    if not entries:
+        text = result_set.empty_text if min_stars == 0 else f"No matches with {min_stars}+ stars."
+        markup = _keyboard(result_set, token, 0, 1, min_stars) if token else None
+        return f"{text}{footer}", markup
+
+    pages = (len(entries) + page_size - 1) // page_size
+    page = max(0, min(page, pages - 1))
+
+    rated = f", {min_stars}+ stars" if min_stars else ""
+    page_info = f" · page {page + 1}/{pages}" if pages > 1 else ""
+    text = f"{result_set.title}\n<i>Total: {len(entries)} matches{rated}{page_info}</i>\n"
+
+    section = None
+    for _, entry_section, entry_text in entries[page * page_size:(page + 1) * page_size]:
+        if entry_section != section:
+            section = entry_section
+            text += f"\n<b>{section}</b>\n"
+        text += f"\n{entry_text}\n"
+
+    markup = _keyboard(result_set, token, page, pages, min_stars) if token else None
+    return f"{text.rstrip()}\n{footer}", markup
@@ -0,0 +1,222 @@
+import asyncio
+import contextvars
+import functools
+import glob
+import logging
+import os
+import random
+import threading
+import time
+from datetime import datetime
+from typing import List, Optional, Set
+
+from config import PROFILE_TARGETS, PROFILE_SAMPLE_RATE, PROFILE_DIR, PROFILE_KEEP
+
+logger = logging.getLogger(__name__)
+
+# Profiling session of the current handler/job (asyncio.to_thread copies it along)
+_session: contextvars.ContextVar[Optional['ProfileSession']] = contextvars.ContextVar('profile_session', default=None)
+
+
+class ProfileSession:
+    """cProfile data of one handler/job run, collected from every thread it used"""
+
+    def __init__(self, target: str):
+        self.target = target
+        self.started = time.time()
+        self._profiles = []
+        self._lock = threading.Lock()
+
+    def _enable(self, profile):
+        """Enable a profiler, or return None if another one is already active
+
+        Since Python 3.12 a profiler sees all threads and only one may be
+        active, so the session's first profiler already covers thread work.
+        """
+        try:
+            profile.enable()
+            return profile
+        except ValueError as e:
+            logger.debug(f"Not profiling {self.target} in {threading.current_thread().name} separately: {e}")
+            return None
+
+    def run(self, fn, *args, **kwargs):
+        """Run fn under a profiler of the current thread"""
+        import cProfile
+
+        profile = self._enable(cProfile.Profile())
+        if profile is None:
+            return fn(*args, **kwargs)
+        try:
+            return fn(*args, **kwargs)
+        finally:
+            profile.disable()
+            with self._lock:
+                self._profiles.append(profile)
+
+    async def run_async(self, coro_fn, *args, **kwargs):
+        """Profile the event loop thread while awaiting coro_fn
+
+        This also records other tasks running on the loop meanwhile;
+        work handed to threads is profiled separately (see to_thread).
+        """
+        import cProfile
+
+        profile = self._enable(cProfile.Profile())
+        if profile is None:
+            return await coro_fn(*args, **kwargs)
+        try:
+            return await coro_fn(*args, **kwargs)
+        finally:
+            profile.disable()
+            with self._lock:
+                self._profiles.append(profile)
+
+    def stats(self):
+        import pstats
+
+        with self._lock:
+            profiles = list(self._profiles)
+        if not profiles:
+            return None
+        stats = pstats.Stats(profiles[0])
+        if len(profiles) > 1:
+            stats.add(*profiles[1:])
+        return stats
+
+
+def hot_spots(stats, limit: int = 15) -> str:
+    """Top functions by own time as a small text table"""
+    rows = sorted(stats.stats.items(), key=lambda item: item[1][2], reverse=True)[:limit]
+    lines = [f"{'own s':>8} {'cum s':>8} {'calls':>8}  function"]
+    for (filename, line, function), (_, calls, tottime, cumtime, _) in rows:
+        location = f"{os.path.basename(filename)}:{line}" if line else filename
+        lines.append(f"{tottime:8.3f} {cumtime:8.3f} {calls:8d}  {function} ({location})")
+    return '\n'.join(lines)
+
+
+class Profiler:
+    """Opt-in cProfile profiling of selected handlers and jobs
+
+    Targets are handler/job names (e.g. refresh_match_cache) or 'all'. A
+    sample of their runs is profiled; one run at a time, because only one
+    profiler can be active per thread. Profiles are written to the data
+    directory as <target>-<timestamp>.prof (for snakeviz/pstats) with a
+    .txt hot-spot summary next to it, keeping the newest `keep` of them.
+    """
+
+    def __init__(self, directory: str, keep: int, targets: Set[str], sample_rate: float):
+        self.directory = directory
+        self.keep = keep
+        self.targets = set(targets)
+        self.sample_rate = sample_rate
+        self._active = False
+        self._lock = threading.Lock()
+
+    def configure(self, targets: Set[str], sample_rate: float):
+        """Change what is profiled at runtime (/profile admin command)"""
+        self.targets = set(targets)
+        self.sample_rate = sample_rate
+        logger.info(f"Profiling {', '.join(sorted(self.targets)) or 'nothing'} (sample rate {sample_rate})")
+
+    def enabled(self, target: str) -> bool:
+        return bool(self.targets) and ('all' in self.targets or target in self.targets)
+
+    def start(self, target: str) -> Optional[ProfileSession]:
+        """Begin a session for this run if it is selected and no other run is profiled"""
+        if not self.enabled(target) or _session.get() is not None:
+            return None
+        if random.random() >= self.sample_rate:
+            return None
+        with self._lock:
+            if self._active:
+                return None
+            self._active = True
+        return ProfileSession(target)
+
+    def finish(self, session: ProfileSession):
+        """Write the profile and its summary, then apply retention"""
+        try:
+            stats = session.stats()
+            if stats is None:
+                return
+            os.makedirs(self.directory, exist_ok=True)
+            stamp = datetime.fromtimestamp(session.started).strftime('%Y%m%d-%H%M%S-%f')[:-3]
+            base = os.path.join(self.directory, f"{session.target}-{stamp}")
+
+            stats.dump_stats(f"{base}.prof")
+            summary = hot_spots(stats)
+            with open(f"{base}.txt", 'w', encoding='utf-8') as f:
+                f.write(f"{session.target} ({time.time() - session.started:.2f}s)\n\n{summary}\n")
+            logger.info(f"Profiled {session.target}, written to {base}.prof\n{summary}")
+
+            self._apply_retention()
+        except Exception as e:
+            logger.error(f"Error writing profile of {session.target}: {e}")
+        finally:
+            with self._lock:
+                self._active = False
+
+    def _apply_retention(self):
+        profiles = sorted(glob.glob(os.path.join(self.directory, '*.prof')), key=os.path.getmtime, reverse=True)
+        for path in profiles[self.keep:]:
+            for old in (path, path[:-len('.prof')] + '.txt'):
+                try:
+                    os.remove(old)
+                except FileNotFoundError:
+                    pass
+
+    def recent(self, limit: int = 5) -> List[str]:
+        """Newest profile summaries (.txt paths)"""
+        return sorted(glob.glob(os.path.join(self.directory, '*.txt')), key=os.path.getmtime, reverse=True)[:limit]
+
+
+PROFILER = Profiler(
+    PROFILE_DIR, PROFILE_KEEP,
+    {t.strip() for t in PROFILE_TARGETS.split(',') if t.strip()}, PROFILE_SAMPLE_RATE
+)
+
+
+def profiled(name: Optional[str] = None):
+    """Decorator profiling selected runs of a handler/job (sync or async)"""
+    import inspect
+
+    def decorator(fn):
+        target = name or fn.__name__
+
+        if inspect.iscoroutinefunction(fn):
+            @functools.wraps(fn)
+            async def async_wrapper(*args, **kwargs):
+                session = PROFILER.start(target)
+                if session is None:
+                    return await fn(*args, **kwargs)
+                token = _session.set(session)
+                try:
+                    return await session.run_async(fn, *args, **kwargs)
+                finally:
+                    _session.reset(token)
+                    await asyncio.to_thread(PROFILER.finish, session)
+            return async_wrapper
+
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            session = PROFILER.start(target)
+            if session is None:
+                return fn(*args, **kwargs)
+            token = _session.set(session)
+            try:
+                return session.run(fn, *args, **kwargs)
+            finally:
+                _session.reset(token)
+                PROFILER.finish(session)
+        return wrapper
+
+    return decorator
+
+
+async def to_thread(fn, *args, **kwargs):
+    """asyncio.to_thread that profiles the thread too while a session is active"""
+    session = _session.get()
+    if session is None:
+        return await asyncio.to_thread(fn, *args, **kwargs)
+    return await asyncio.to_thread(session.run, fn, *args, **kwargs)
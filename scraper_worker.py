@@ -0,0 +1,264 @@
+import json
+import logging
+import time
+from datetime import datetime, timedelta
+from typing import List, Optional, Set
+
+from apscheduler.schedulers.blocking import BlockingScheduler
+import pytz
+
+from config import (
+    TIMEZONE, DATABASE_PATH,
+    LIVE_POLL_MINUTES, IDLE_POLL_MINUTES, LIVE_IMMINENT_MINUTES, LIVE_MAX_MATCH_HOURS,
+    RESULTS_SNAPSHOT_HOURS, RESULTS_SNAPSHOT_MAX, METRICS_PORT, METRICS_ADDR,
+    SCHEDULE_DAYS, SCHEDULE_CHECK_MINUTES, SCHEDULE_REFRESH_MINUTES
+)
+import metrics
+import page_store
+import profiling
+from database import Database
+from hltv_scraper import HLTVScraper, Match
+from snapshots import MATCHES, RESULTS, SCHEDULE, TEAMS, load_matches, schedule_payload
+
+logger = logging.getLogger(__name__)
+
+
+class ScraperWorker:
+    """Scrapes HLTV and publishes versioned snapshots into the shared database
+
+    Runs inside the bot (SCRAPER_MODE=embedded) or as its own process via
+    `python scraper_worker.py`, so that any number of bot frontends
+    (SCRAPER_MODE=external) share a single scraping budget.
+    """
+
+    def __init__(self, db: Database, scraper: HLTVScraper):
+        self.db = db
+        self.scraper = scraper
+        self.poll_minutes = IDLE_POLL_MINUTES  # Current results ingestion interval
+        self._finished_match_ids = set()  # Match IDs seen on the results page
+
+    def favorite_teams(self) -> Set[str]:
+        """All teams followed by any user"""
+        return {team for user_id in self.db.get_all_users_with_favorites()
+                for team in self.db.get_favorites(user_id)}
+
+    @profiling.profiled()
+    def refresh_matches(self) -> List[Match]:
+        """Fetch fresh matches, preload kickoff times and publish the matches snapshot
+        
+        Only a successful fetch is published, stamped with its fetch time. When
+        HLTV fails, get_todays_matches falls back to the last good snapshot,
+        which must not be republished as fresh.
+        """
+        logger.info("Refreshing match cache...")
+        generation = self.scraper.get_matches_generation()
+        # Force refresh by using use_cache=False
+        matches = self.scraper.get_todays_matches(min_stars=0, use_cache=False)
+        fetched = self.scraper.get_matches_generation() != generation
+        if fetched:
+            logger.info(f"Cache refreshed with {len(matches)} matches")
+        else:
+            logger.warning(f"Fetching matches failed, not publishing ({len(matches)} matches from the last snapshot)")
+
+        # Preload datetimes for favorite teams' matches (needed for pre-match alerts)
+        # and important matches (1+ stars) to ensure they're cached
+        favorite_teams = self.favorite_teams()
+        favorite_matches = [m for m in matches if any(m.has_team(team) for team in favorite_teams)]
+        important_matches = [m for m in matches if m.stars >= 1 and m not in favorite_matches]
+        preload = favorite_matches + important_matches
+        if preload:
+            logger.info(f"Preloading datetimes for {len(preload)} favorite/important matches...")
+            self.scraper.preload_match_datetimes(preload, max_matches=20)
+            logger.info("Datetime preloading completed")
+
+        if fetched and matches:
+            version = self.db.publish_snapshot(MATCHES, json.dumps([m.to_dict() for m in matches]),
+                                               created_at=self.scraper._matches_cache_time)
+            logger.info(f"Published matches snapshot v{version}")
+        return matches
+
+    @profiling.profiled()
+    def ingest_results(self) -> Optional[List[Match]]:
+        """Ingest new results into the results archive and the results snapshot
+
+        The results snapshot is the durable record of ingested results: the
+        high-water mark only advances after it was published, and frontends
+        derive notifications from it idempotently.
+
+        Returns:
+            New results, or None if HLTV could not be scraped or the results
+            snapshot could not be published
+        """
+        results = self.scraper.get_new_results()
+        if results is None:
+            return None
+
+        self._finished_match_ids.update(r.match_id for r in results)
+        if results:
+            if not self._publish_results(results):
+                # Not delivered to any frontend - the same results come again next cycle
+                return None
+            # Archived before the high-water mark advances, so nothing is lost;
+            # if the archive write fails, the same results come again next cycle
+            if self.db.archive_results(r.to_dict() for r in results):
+                self.db.mark_results_seen(r.match_id for r in results)
+        return results
+
+    def _publish_results(self, new_results: List[Match]) -> int:
+        """Merge new results into the results snapshot
+        
+        Returns:
+            The published version (0 on errors)
+        """
+        previous = load_matches(self.db, RESULTS)
+        old_results = previous[2] if previous else []
+
+        new_ids = {r.match_id for r in new_results}
+        keep_since = datetime.now() - timedelta(hours=RESULTS_SNAPSHOT_HOURS)
+        merged = new_results + [
+            r for r in old_results
+            if r.match_id not in new_ids and (r._time is None or r._time >= keep_since)
+        ]
+
+        payload = json.dumps([r.to_dict() for r in merged[:RESULTS_SNAPSHOT_MAX]])
+        version = self.db.publish_snapshot(RESULTS, payload)
+        if version:
+            logger.info(f"Published results snapshot v{version} ({len(new_results)} new)")
+        return version
+
+    @profiling.profiled()
+    def refresh_teams(self) -> set:
+        """Load/refresh the team list from HLTV and publish the teams snapshot"""
+        logger.info("Loading team list from HLTV...")
+        teams = self.scraper.get_all_teams(use_cache=False)
+
+        if teams:
+            version = self.db.publish_snapshot(TEAMS, json.dumps(sorted(teams)))
+            logger.info(f"Loaded {len(teams)} teams from HLTV into database (snapshot v{version})")
+        else:
+            logger.warning("HLTV scraping failed - no teams loaded. Team validation will not work until teams are loaded.")
+        return teams
+
+    @profiling.profiled()
+    def refresh_schedule(self) -> int:
+        """Refetch the days of the week-ahead schedule index that are due and publish it
+        
+        Every day page is fetched once per refresh interval, which shortens as
+        the day approaches (SCHEDULE_REFRESH_MINUTES). /week and /favweek only
+        read this index, so they never cause HLTV requests.
+        
+        Returns:
+            Number of day pages fetched
+        """
+        today = datetime.now().date()
+        now = time.time()
+        # Days that have passed drop out of the index
+        schedule = {day: entry for day, entry in self.scraper._schedule.items() if day >= today}
+        
+        fetched = 0
+        for offset in range(SCHEDULE_DAYS):
+            day = today + timedelta(days=offset)
+            interval = SCHEDULE_REFRESH_MINUTES[min(offset, len(SCHEDULE_REFRESH_MINUTES) - 1)] * 60
+            entry = schedule.get(day)
+            if entry and now - entry[0] < interval:
+                continue
+            
+            matches = self.scraper.get_matches_for_date(day)
+            fetched += 1
+            if not matches and entry and entry[1]:
+                # Probably a failed fetch - keep the last good day, retry next time
+                logger.warning(f"No matches found for {day}, keeping the previous schedule")
+                continue
+            # Detached copies: the index must never trigger match page fetches
+            schedule[day] = (now, [Match.from_dict(m.to_dict()) for m in matches])
+        
+        if fetched or len(schedule) != len(self.scraper._schedule):
+            self.scraper._schedule = schedule
+            version = self.db.publish_snapshot(SCHEDULE, schedule_payload(schedule))
+            logger.info(f"Published schedule snapshot v{version} ({fetched} day(s) fetched, "
+                        f"{sum(len(matches) for _, matches in schedule.values())} matches)")
+        return fetched
+
+    def followed_match_active(self) -> bool:
+        """Check the cached snapshot for a followed match that is live or about to start"""
+        favorite_teams = self.favorite_teams()
+        if not favorite_teams:
+            return False
+
+        matches = self.scraper.get_cached_matches()
+        # Only finished matches still in the snapshot matter
+        self._finished_match_ids &= {m.match_id for m in matches}
+
+        now = datetime.now()
+        for match in matches:
+            if match.match_id in self._finished_match_ids:
+                continue
+            if not any(match.has_team(team) for team in favorite_teams):
+                continue
+            if match.status == 'live':
+                return True
+            kickoff = self.scraper.get_cached_match_time(match)
+            if kickoff and now - timedelta(hours=LIVE_MAX_MATCH_HOURS) <= kickoff <= now + timedelta(minutes=LIVE_IMMINENT_MINUTES):
+                return True
+        return False
+
+    def adjust_poll_interval(self, scheduler, job_id: str):
+        """Ingest results fast while a followed match is live, back off otherwise"""
+        minutes = LIVE_POLL_MINUTES if self.followed_match_active() else IDLE_POLL_MINUTES
+        if minutes == self.poll_minutes:
+            return
+
+        mode = "live" if minutes == LIVE_POLL_MINUTES else "idle"
+        logger.info(f"Switching result polling to {mode} mode (every {minutes} minutes)")
+        self.poll_minutes = minutes
+        scheduler.reschedule_job(job_id, trigger='interval', minutes=minutes)
+
+
+def main():
+    """Run the scraper worker as a standalone process"""
+    logging.basicConfig(
+        format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
+        level=logging.INFO
+    )
+
+    db = Database(DATABASE_PATH)
+    scraper = HLTVScraper()
+    scraper.set_database(db)
+    scraper.set_page_store(page_store.from_config(db))
+    worker = ScraperWorker(db, scraper)
+
+    scheduler = BlockingScheduler(timezone=pytz.timezone(TIMEZONE))
+    metrics.instrument_scheduler(scheduler)
+    if METRICS_PORT:
+        metrics.register_coalescing_stats(scraper)
+        metrics.start_http_server(METRICS_PORT, METRICS_ADDR)
+    now = datetime.now(pytz.timezone(TIMEZONE))
+
+    def ingest_results():
+        worker.ingest_results()
+        worker.adjust_poll_interval(scheduler, 'ingest_results')
+
+    def refresh_matches():
+        worker.refresh_matches()
+        worker.adjust_poll_interval(scheduler, 'ingest_results')
+
+    scheduler.add_job(worker.refresh_teams, 'cron', hour=3, minute=0, id='daily_team_refresh')
+    scheduler.add_job(worker.refresh_teams, 'date', run_date=now, id='initial_team_load')
+    scheduler.add_job(refresh_matches, 'interval', minutes=30, next_run_time=now,
+                      id='refresh_cache', max_instances=1, coalesce=True)
+    scheduler.add_job(worker.refresh_schedule, 'interval', minutes=SCHEDULE_CHECK_MINUTES,
+                      next_run_time=now + timedelta(minutes=2), id='refresh_schedule',
+                      max_instances=1, coalesce=True)
+    scheduler.add_job(ingest_results, 'interval', minutes=worker.poll_minutes,
+                      next_run_time=now + timedelta(seconds=30),
+                      id='ingest_results', max_instances=1, coalesce=True)
+
+    logger.info("Starting scraper worker...")
+    try:
+        scheduler.start()
+    except (KeyboardInterrupt, SystemExit):
+        logger.info("Scraper worker stopped")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,186 @@
+import json
+import logging
+import time
+from datetime import datetime, timedelta
+from typing import List, Optional, Tuple
+
+from config import SCHEDULE_DAYS
+from hltv_scraper import HLTVScraper, Match
+
+logger = logging.getLogger(__name__)
+
+# Snapshot kinds in the snapshots table
+MATCHES = 'matches'
+RESULTS = 'results'
+TEAMS = 'teams'
+SCHEDULE = 'schedule'
+
+
+def load_matches(db, kind: str, scraper=None) -> Optional[Tuple[int, float, List[Match]]]:
+    """Load a match or result snapshot as (version, created_at, matches)"""
+    snapshot = db.get_snapshot(kind)
+    if snapshot is None:
+        return None
+    version, created_at, payload = snapshot
+    try:
+        matches = [Match.from_dict(data, scraper) for data in json.loads(payload)]
+    except Exception as e:
+        logger.error(f"Error loading {kind} snapshot v{version}: {e}")
+        return None
+    return version, created_at, matches
+
+
+def schedule_payload(schedule: dict) -> str:
+    """Serialize a schedule index {date: (fetched_at, matches)}"""
+    return json.dumps({
+        day.isoformat(): {'fetched_at': fetched_at, 'matches': [m.to_dict() for m in matches]}
+        for day, (fetched_at, matches) in schedule.items()
+    })
+
+
+def load_schedule(db) -> Optional[Tuple[int, float, dict]]:
+    """Load the schedule snapshot as (version, created_at, {date: (fetched_at, matches)})
+
+    Its matches are detached from any scraper and never fetch their time lazily.
+    """
+    snapshot = db.get_snapshot(SCHEDULE)
+    if snapshot is None:
+        return None
+    version, created_at, payload = snapshot
+    try:
+        schedule = {
+            datetime.strptime(day, '%Y-%m-%d').date(): (entry['fetched_at'],
+                                                       [Match.from_dict(data) for data in entry['matches']])
+            for day, entry in json.loads(payload).items()
+        }
+    except Exception as e:
+        logger.error(f"Error loading {SCHEDULE} snapshot v{version}: {e}")
+        return None
+    return version, created_at, schedule
+
+
+def load_snapshot(db, kind: str, scraper=None) -> Optional[Tuple[int, float, object]]:
+    """Load a match, result (list of matches) or schedule snapshot"""
+    if kind == SCHEDULE:
+        return load_schedule(db)
+    return load_matches(db, kind, scraper)
+
+
+def apply_snapshot(scraper: HLTVScraper, kind: str, created_at: float, matches):
+    """Install a match, result or schedule snapshot as the scraper's cache
+
+    The cache keeps the snapshot's publish time, so staleness is judged
+    honestly and an old snapshot is revalidated on first use.
+    """
+    if kind == MATCHES:
+        for match in matches:
+            if match._time is not None and match._match_url:
+                scraper._datetime_cache[match._match_url] = match._time
+        scraper._matches_cache = matches
+        scraper._matches_cache_time = created_at
+        scraper._matches_generation += 1
+    elif kind == RESULTS:
+        scraper._results_cache = matches
+        scraper._results_cache_time = created_at
+    elif kind == SCHEDULE:
+        scraper._schedule = matches
+
+
+def restore_snapshots(db, scraper: HLTVScraper) -> dict:
+    """Warm an empty scraper from the last persisted match, result and schedule snapshots
+
+    Returns:
+        Restored snapshot version per kind
+    """
+    restored = {}
+    for kind in (MATCHES, RESULTS, SCHEDULE):
+        snapshot = load_snapshot(db, kind, scraper)
+        if snapshot is None:
+            continue
+        version, created_at, matches = snapshot
+        apply_snapshot(scraper, kind, created_at, matches)
+        restored[kind] = version
+        age = int(time.time() - created_at)
+        logger.info(f"Restored {kind} snapshot v{version} ({len(matches)} entries, age: {age}s)")
+    return restored
+
+
+class SnapshotScraper(HLTVScraper):
+    """Read-only scraper serving the snapshots published by the scraper worker
+
+    Used by bot frontends in SCRAPER_MODE=external. It never talks to HLTV;
+    every method answers from the latest snapshot in the shared database.
+    """
+
+    def __init__(self, db):
+        super().__init__()
+        self.set_database(db)
+        self._versions = {}  # Loaded snapshot version per kind
+
+    def sync(self, kind: str) -> bool:
+        """Load the latest snapshot of a kind if it changed
+
+        Returns:
+            True if a new version was loaded
+        """
+        version = self.db.get_snapshot_version(kind)
+        if not version or version == self._versions.get(kind):
+            return False
+
+        snapshot = load_snapshot(self.db, kind, self)
+        if snapshot is None:
+            return False
+        version, created_at, matches = snapshot
+
+        apply_snapshot(self, kind, created_at, matches)
+        self._versions[kind] = version
+        logger.info(f"Loaded {kind} snapshot v{version} ({len(matches)} entries)")
+        return True
+
+    def get_todays_matches(self, min_stars: int = 0, use_cache: bool = True) -> List[Match]:
+        """Upcoming matches from the latest matches snapshot
+
+        Like HLTVScraper, a snapshot older than the staleness ceiling is never
+        served (e.g. when the scraper worker died).
+        """
+        self.sync(MATCHES)
+        state = self._snapshot_state(self._matches_cache, self._matches_cache_time,
+                                     self._cache_duration, self._matches_max_staleness)
+        if state == 'expired':
+            if self._matches_cache_time is not None:
+                age = int(time.time() - self._matches_cache_time)
+                logger.warning(f"Matches snapshot is too old to serve (age: {age}s), is the scraper worker running?")
+            return []
+        return [m for m in self._matches_cache if m.stars >= min_stars]
+
+    def get_recent_results(self, hours: int = 24, use_cache: bool = True) -> List[Match]:
+        """Results of the last `hours` hours from the latest results snapshot"""
+        self.sync(RESULTS)
+        since = datetime.now() - timedelta(hours=hours)
+        return [r for r in (self._results_cache or []) if r._time is None or r._time >= since]
+
+    def get_all_teams(self, use_cache: bool = True) -> set:
+        """Team list as published by the scraper worker"""
+        return {team.lower() for team in self.db.get_valid_teams()}
+
+    def get_schedule(self, days: int = SCHEDULE_DAYS, min_stars: int = 0) -> dict:
+        """Week-ahead schedule from the latest schedule snapshot"""
+        self.sync(SCHEDULE)
+        return super().get_schedule(days, min_stars)
+
+    def get_matches_for_date(self, date, min_stars: int = 0) -> List[Match]:
+        """Matches of a day from the schedule snapshot (empty beyond it)"""
+        self.sync(SCHEDULE)
+        entry = self._schedule.get(date)
+        return [m for m in entry[1] if m.stars >= min_stars] if entry else []
+
+    def preload_match_datetimes(self, matches: List[Match], max_matches: int = 20):
+        """Match times come with the snapshot - nothing to preload"""
+
+    def _get_match_datetime_from_page(self, match_url: str) -> Optional[datetime]:
+        """Only serve match times known from the snapshot, never fetch"""
+        return self._datetime_cache.get(match_url)
+
+    def _get(self, endpoint: str, url: str, timeout: int, stream: bool = False):
+        """Every HLTV request goes through here - a frontend making one is a bug"""
+        raise RuntimeError(f"Snapshot frontends never request HLTV ({url}), the scraper worker does")
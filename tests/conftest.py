@@ -0,0 +1,34 @@
+import os
+import sys
+import tempfile
+
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+# The bot's modules read their configuration on import - never touch data/
+_tmp = tempfile.mkdtemp(prefix='hltv-bot-tests-')
+os.environ['DATABASE_PATH'] = os.path.join(_tmp, 'bot.db')
+os.environ.setdefault('TELEGRAM_BOT_TOKEN', '123456:test')
+os.environ['SCRAPER_MODE'] = 'embedded'
+os.environ['PAGE_STORE_MAX_MB'] = '0'
+os.environ['LOOP_LAG_THRESHOLD_MS'] = '0'
+os.environ['METRICS_PORT'] = '0'
+
+
+@pytest.fixture
+def db(tmp_path):
+    """An empty database"""
+    from database import Database
+
+    return Database(str(tmp_path / 'test.db'))
+
+
+@pytest.fixture
+def telegram_bot(tmp_path, monkeypatch):
+    """A TelegramBot on an empty database; nothing is started and nothing talks to Telegram"""
+    import bot
+
+    monkeypatch.setattr(bot, 'DATABASE_PATH', str(tmp_path / 'bot.db'))
+    return bot.TelegramBot()
@@ -0,0 +1,45 @@
+import backfill
+from database import Database
+
+
+def result_html(match_id: int, team1: str, team2: str, score: tuple, played_at: int) -> str:
+    return (
+        f'<div class="result-con" data-zonedgrouping-entry-unix="{played_at * 1000}">'
+        f'<a href="/matches/{match_id}/x" class="a-reset"><div class="result"><table><tr>'
+        f'<td class="team-cell"><div class="line-align team1"><div class="team">{team1}</div></div></td>'
+        f'<td class="result-score"><span>{score[0]}</span> - <span>{score[1]}</span></td>'
+        f'<td class="team-cell"><div class="line-align team2"><div class="team">{team2}</div></div></td>'
+        f'<td class="event"><span class="event-name">Event</span></td>'
+        f'</tr></table></div></a></div>'
+    )
+
+
+def write_page(path, results) -> str:
+    """A /results page listing the results newest first, like HLTV"""
+    body = ''.join(result_html(*r) for r in results)
+    path.write_text(f'<html><body><div class="results-all"><div class="results-sublist">{body}</div></div></body></html>')
+    return str(path)
+
+
+def test_backfilled_pages_extend_the_form_newest_first(db: Database, tmp_path):
+    base = 1700000000
+    # Already ingested live: the newest result
+    db.archive_results([{'match_id': '100', 'team1': 'Vitality', 'team2': 'FaZe', 'event': "Event",
+                         'time': base + 100 * 3600, 'score': '2-0', 'stars': 1, 'match_url': '/matches/100/x'}])
+
+    # Two older /results pages (offset 0 before offset 100), newest first on each
+    pages = [
+        write_page(tmp_path / 'results-0.html', [(99, 'Vitality', 'G2', (0, 2), base + 99 * 3600),
+                                                 (98, 'Vitality', 'MOUZ', (1, 1), base + 98 * 3600)]),
+        write_page(tmp_path / 'results-100.html', [(97, 'Spirit', 'Vitality', (0, 2), base + 97 * 3600),
+                                                   (96, 'Vitality', 'FaZe', (0, 2), base + 96 * 3600)]),
+    ]
+
+    for batch_size in (1, 100):  # A transaction per page, then everything at once (a re-run)
+        stats = backfill.backfill(db, pages, workers=2, batch_size=batch_size)
+        assert stats['results'] == 4 and stats['failed'] == stats['empty'] == 0
+
+    vitality = db.get_team_form('Vitality')
+    # 100 W, 99 L, 98 D, 97 W, 96 L
+    assert vitality['recent'] == 'WLDWL'
+    assert (vitality['wins'], vitality['losses'], vitality['draws']) == (2, 2, 1)
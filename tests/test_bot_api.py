@@ -0,0 +1,162 @@
+import asyncio
+import json
+import os
+import signal
+import socket
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qsl
+
+import pytest
+from telegram import Update
+
+import bot
+
+BOT_USER = {'id': 123456, 'is_bot': True, 'first_name': 'HLTV Test', 'username': 'hltv_test_bot'}
+
+
+class FakeBotAPI(ThreadingHTTPServer):
+    """Local stand-in for api.telegram.org that records every call"""
+
+    def __init__(self):
+        super().__init__(('127.0.0.1', 0), FakeBotAPIHandler)
+        self.calls = []  # (method, parameters)
+        self.on_call = lambda method: None
+
+    @property
+    def base_url(self) -> str:
+        return f"http://127.0.0.1:{self.server_address[1]}/bot"
+
+    def params(self, method: str) -> dict:
+        return next(params for name, params in self.calls if name == method)
+
+
+class FakeBotAPIHandler(BaseHTTPRequestHandler):
+    RESULTS = {'getMe': BOT_USER, 'getUpdates': []}
+
+    def do_POST(self):
+        method = self.path.rsplit('/', 1)[-1]
+        body = self.rfile.read(int(self.headers.get('Content-Length') or 0)).decode()
+        if 'json' in (self.headers.get('Content-Type') or ''):
+            params = json.loads(body or '{}')
+        else:
+            params = dict(parse_qsl(body))
+        self.server.calls.append((method, params))
+
+        response = json.dumps({'ok': True, 'result': self.RESULTS.get(method, True)}).encode()
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(response)))
+        self.end_headers()
+        self.wfile.write(response)
+        self.server.on_call(method)
+
+    def log_message(self, format, *args):
+        pass
+
+
+@pytest.fixture
+def fake_api():
+    server = FakeBotAPI()
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+def free_port() -> int:
+    with socket.socket() as s:
+        s.bind(('127.0.0.1', 0))
+        return s.getsockname()[1]
+
+
+def run_until(telegram_bot, fake_api, method: str):
+    """Run the bot against the fake API until it called the given method"""
+    # The warmup would scrape HLTV - only the transport is tested here
+    telegram_bot.application.post_init = None
+    asyncio.set_event_loop(asyncio.new_event_loop())
+
+    def stop(called):
+        # Stops the application like Ctrl+C, wherever it is in its startup - once,
+        # polling may call again while shutting down
+        if called == method:
+            fake_api.on_call = lambda method: None
+            os.kill(os.getpid(), signal.SIGTERM)
+
+    fake_api.on_call = stop
+    try:
+        telegram_bot.run()
+    finally:
+        asyncio.set_event_loop(None)
+
+
+def make_bot(tmp_path, monkeypatch, fake_api):
+    monkeypatch.setattr(bot, 'DATABASE_PATH', str(tmp_path / 'bot.db'))
+    monkeypatch.setattr(bot, 'TELEGRAM_API_BASE_URL', fake_api.base_url)
+    return bot.TelegramBot()
+
+
+def test_polling_subscribes_to_handled_updates_only(tmp_path, monkeypatch, fake_api):
+    monkeypatch.setattr(bot, 'BOT_MODE', 'polling')
+    telegram_bot = make_bot(tmp_path, monkeypatch, fake_api)
+
+    run_until(telegram_bot, fake_api, 'getUpdates')
+
+    assert json.loads(fake_api.params('getUpdates')['allowed_updates']) == ['message', 'callback_query']
+    processor = telegram_bot.application.update_processor
+    assert isinstance(processor, bot.ChatOrderedUpdateProcessor)
+    assert processor.max_concurrent_updates == bot.MAX_CONCURRENT_UPDATES
+
+
+def test_webhook_registration(tmp_path, monkeypatch, fake_api):
+    monkeypatch.setattr(bot, 'BOT_MODE', 'webhook')
+    monkeypatch.setattr(bot, 'WEBHOOK_URL', 'https://bot.example.com/telegram')
+    monkeypatch.setattr(bot, 'WEBHOOK_LISTEN', '127.0.0.1')
+    monkeypatch.setattr(bot, 'WEBHOOK_PORT', free_port())
+    monkeypatch.setattr(bot, 'WEBHOOK_SECRET', 'change_me')
+    monkeypatch.setattr(bot, 'WEBHOOK_MAX_CONNECTIONS', 12)
+    telegram_bot = make_bot(tmp_path, monkeypatch, fake_api)
+
+    run_until(telegram_bot, fake_api, 'setWebhook')
+
+    params = fake_api.params('setWebhook')
+    assert params['url'] == 'https://bot.example.com/telegram'
+    assert params['secret_token'] == 'change_me'
+    assert int(params['max_connections']) == 12
+    assert json.loads(params['allowed_updates']) == ['message', 'callback_query']
+    assert 'getUpdates' not in [method for method, _ in fake_api.calls]
+
+
+def chat_update(update_id: int, chat_id: int) -> Update:
+    return Update.de_json({
+        'update_id': update_id,
+        'message': {
+            'message_id': update_id, 'date': 0, 'text': 'x',
+            'chat': {'id': chat_id, 'type': 'private'},
+            'from': {'id': chat_id, 'is_bot': False, 'first_name': 'User'},
+        },
+    }, None)
+
+
+def test_updates_of_one_chat_run_in_order_other_chats_in_parallel():
+    processor = bot.ChatOrderedUpdateProcessor(4)
+    events = []
+
+    async def handle(name: str, delay: float):
+        events.append(f"{name} start")
+        await asyncio.sleep(delay)
+        events.append(f"{name} end")
+
+    async def main():
+        await asyncio.gather(
+            processor.process_update(chat_update(1, 1), handle('a1', 0.05)),
+            processor.process_update(chat_update(2, 1), handle('a2', 0)),
+            processor.process_update(chat_update(3, 2), handle('b1', 0)),
+        )
+
+    asyncio.run(main())
+    # a2 waits for a1 of the same chat, b1 does not
+    assert events.index('a1 end') < events.index('a2 start')
+    assert events.index('b1 end') < events.index('a1 end')
+    assert not processor._chats
@@ -0,0 +1,167 @@
+import asyncio
+import sqlite3
+import time
+from types import SimpleNamespace
+
+import pytest
+from telegram.error import Forbidden, NetworkError, RetryAfter
+
+from config import OUTBOX_BASE_BACKOFF, OUTBOX_MAX_ATTEMPTS
+
+
+def outbox_row(db, message_id: int) -> dict:
+    with sqlite3.connect(db.db_path) as conn:
+        conn.row_factory = sqlite3.Row
+        return dict(conn.execute('SELECT * FROM outbox WHERE id = ?', (message_id,)).fetchone())
+
+
+def test_duplicate_dedup_key_is_queued_once(db):
+    assert db.enqueue_message(1, "first", dedup_key="result:1:42")
+    assert not db.enqueue_message(1, "second", dedup_key="result:1:42")
+
+    messages = db.claim_outbox_messages(10, 60)
+    assert [m['text'] for m in messages] == ["first"]
+
+
+def test_messages_without_dedup_key_are_all_queued(db):
+    assert db.enqueue_message(1, "a")
+    assert db.enqueue_message(1, "b")
+    assert len(db.claim_outbox_messages(10, 60)) == 2
+
+
+def test_notifications_are_marked_with_the_message(db):
+    db.enqueue_message(1, "result", dedup_key="result:1:42", notifications=[(1, '42', 'result')])
+    assert db.was_notification_sent(1, '42', 'result')
+
+    # A duplicate doesn't mark anything new
+    db.enqueue_message(1, "again", dedup_key="result:1:42", notifications=[(1, '43', 'result')])
+    assert not db.was_notification_sent(1, '43', 'result')
+
+
+def test_claimed_messages_are_leased(db):
+    db.enqueue_message(1, "hello")
+    first = db.claim_outbox_messages(10, 60)
+    assert len(first) == 1 and first[0]['attempts'] == 1
+
+    # Leased: another delivery run doesn't send it twice
+    assert db.claim_outbox_messages(10, 60) == []
+
+
+def test_expired_lease_is_claimed_again(db):
+    db.enqueue_message(1, "hello")
+    db.claim_outbox_messages(10, 0)  # Process "died" while sending
+
+    again = db.claim_outbox_messages(10, 60)
+    assert len(again) == 1 and again[0]['attempts'] == 2
+
+
+def test_claim_respects_batch_size_and_order(db):
+    for i in range(5):
+        db.enqueue_message(1, f"m{i}")
+    assert [m['text'] for m in db.claim_outbox_messages(3, 60)] == ["m0", "m1", "m2"]
+    assert [m['text'] for m in db.claim_outbox_messages(3, 60)] == ["m3", "m4"]
+
+
+def test_sent_and_failed_messages_are_not_claimed(db):
+    db.enqueue_message(1, "sent")
+    db.enqueue_message(1, "failed")
+    sent, failed = db.claim_outbox_messages(10, 0)
+    db.mark_outbox_sent(sent['id'])
+    db.mark_outbox_failed(failed['id'], "blocked")
+
+    assert db.claim_outbox_messages(10, 60) == []
+
+
+def test_rescheduled_message_waits_for_its_delay(db):
+    db.enqueue_message(1, "hello")
+    message, = db.claim_outbox_messages(10, 60)
+
+    db.reschedule_outbox_message(message['id'], 60, "timeout")
+    assert db.claim_outbox_messages(10, 60) == []
+
+    db.reschedule_outbox_message(message['id'], 0, "timeout")
+    assert len(db.claim_outbox_messages(10, 60)) == 1
+
+
+class FakeTelegram:
+    """Bot API stand-in raising the queued errors in turn, then sending"""
+
+    def __init__(self, *errors):
+        self.errors = list(errors)
+        self.sent = []
+
+    async def send_message(self, chat_id, text, **kwargs):
+        if self.errors:
+            raise self.errors.pop(0)
+        self.sent.append((chat_id, text))
+
+
+def deliver(telegram_bot, telegram: FakeTelegram):
+    telegram_bot.application = SimpleNamespace(bot=telegram)
+    asyncio.run(telegram_bot.deliver_outbox())
+
+
+def make_due(db, message_id: int):
+    with sqlite3.connect(db.db_path) as conn:
+        conn.execute('UPDATE outbox SET next_attempt_at = 0 WHERE id = ?', (message_id,))
+
+
+def test_delivery_marks_message_sent(telegram_bot):
+    db = telegram_bot.db
+    db.enqueue_message(7, "hello")
+    telegram = FakeTelegram()
+    deliver(telegram_bot, telegram)
+
+    assert telegram.sent == [(7, "hello")]
+    assert outbox_row(db, 1)['status'] == 'sent'
+
+
+def test_failed_delivery_backs_off_exponentially(telegram_bot):
+    db = telegram_bot.db
+    db.enqueue_message(7, "hello")
+    telegram = FakeTelegram(NetworkError("down"), NetworkError("down"))
+
+    for attempt in (1, 2):
+        before = time.time()
+        deliver(telegram_bot, telegram)
+        row = outbox_row(db, 1)
+        assert row['status'] == 'pending' and row['attempts'] == attempt
+        expected = OUTBOX_BASE_BACKOFF * 2 ** (attempt - 1)
+        assert row['next_attempt_at'] - before == pytest.approx(expected, abs=1)
+        make_due(db, 1)
+
+    deliver(telegram_bot, telegram)
+    assert outbox_row(db, 1)['status'] == 'sent'
+    assert telegram.sent == [(7, "hello")]
+
+
+def test_delivery_gives_up_after_max_attempts(telegram_bot):
+    db = telegram_bot.db
+    db.enqueue_message(7, "hello")
+    telegram = FakeTelegram(*[NetworkError("down")] * OUTBOX_MAX_ATTEMPTS)
+
+    for _ in range(OUTBOX_MAX_ATTEMPTS):
+        deliver(telegram_bot, telegram)
+        make_due(db, 1)
+
+    row = outbox_row(db, 1)
+    assert row['status'] == 'failed' and row['attempts'] == OUTBOX_MAX_ATTEMPTS
+
+
+def test_flood_control_waits_as_told(telegram_bot):
+    db = telegram_bot.db
+    db.enqueue_message(7, "hello")
+    before = time.time()
+    deliver(telegram_bot, FakeTelegram(RetryAfter(42)))
+
+    row = outbox_row(db, 1)
+    assert row['status'] == 'pending'
+    assert row['next_attempt_at'] - before == pytest.approx(42, abs=1)
+
+
+def test_blocked_user_is_not_retried(telegram_bot):
+    db = telegram_bot.db
+    db.enqueue_message(7, "hello")
+    deliver(telegram_bot, FakeTelegram(Forbidden("bot was blocked by the user")))
+
+    assert outbox_row(db, 1)['status'] == 'failed'
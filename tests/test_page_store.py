@@ -0,0 +1,37 @@
+import os
+import sqlite3
+
+from page_store import PageStore
+
+HTML = "<html>results</html>"
+
+
+def stored_files(store) -> list:
+    return [name for _, _, files in os.walk(store.directory) for name in files]
+
+
+def test_page_is_stored_once_and_recorded_per_fetch(db, tmp_path):
+    store = PageStore(db, str(tmp_path / 'pages'), max_bytes=10 ** 6, retention_days=7)
+
+    sha256 = store.put('results', 'https://www.hltv.org/results', HTML)
+    assert store.put('results', 'https://www.hltv.org/results', HTML) == sha256
+
+    assert stored_files(store) == [f"{sha256}.html.gz"]
+    assert len(store.fetches('results')) == 2
+
+
+def test_failed_transaction_leaves_no_file_behind(db, tmp_path, monkeypatch):
+    store = PageStore(db, str(tmp_path / 'pages'), max_bytes=10 ** 6, retention_days=7)
+    record_page_fetch = db.record_page_fetch
+
+    def fail_after_placing(*args):
+        def place(new):
+            args[-1](new)
+            raise sqlite3.OperationalError("disk I/O error")
+        return record_page_fetch(*args[:-1], place)
+
+    monkeypatch.setattr(db, 'record_page_fetch', fail_after_placing)
+    store.put('results', 'https://www.hltv.org/results', HTML)
+
+    assert stored_files(store) == []
+    assert store.fetches('results') == []
@@ -0,0 +1,133 @@
+from types import SimpleNamespace
+
+import pytest
+
+import paging
+from paging import ResultSet, ResultSetCache, parse_callback, render_page
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    """Monotonic clock of the paging module, advanced by the test"""
+    clock = SimpleNamespace(now=1000.0)
+    monkeypatch.setattr(paging, 'time', SimpleNamespace(monotonic=lambda: clock.now))
+    return clock
+
+
+def result_set(n: int = 20) -> ResultSet:
+    entries = [(i % 3, "Upcoming" if i >= 5 else "Results", f"match {i}") for i in range(n)]
+    return ResultSet("<b>Today</b>", entries, "No matches today.")
+
+
+def buttons(markup) -> list:
+    return [button.callback_data for row in markup.inline_keyboard for button in row] if markup else []
+
+
+def test_cache_returns_stored_set(clock):
+    cache = ResultSetCache(ttl=60, max_size=10)
+    rs = result_set()
+    token = cache.put(rs)
+    assert cache.get(token) is rs
+    assert cache.get('unknown') is None
+
+
+def test_cache_expires_sets_after_ttl(clock):
+    cache = ResultSetCache(ttl=60, max_size=10)
+    token = cache.put(result_set())
+    clock.now += 61
+    assert cache.get(token) is None
+
+
+def test_put_drops_expired_sets(clock):
+    cache = ResultSetCache(ttl=60, max_size=100)
+    for _ in range(5):
+        cache.put(result_set())
+    clock.now += 61
+    fresh = cache.put(result_set())
+    assert list(cache._sets) == [fresh]
+
+
+def test_put_drops_expired_sets_behind_a_recently_used_one(clock):
+    cache = ResultSetCache(ttl=60, max_size=100)
+    first = cache.put(result_set())
+    clock.now += 30
+    second = cache.put(result_set())
+    clock.now += 20
+    cache.get(first)  # Moves first behind second in LRU order
+    clock.now += 20
+    fresh = cache.put(result_set())
+
+    assert list(cache._sets) == [second, fresh]
+
+
+def test_cache_evicts_least_recently_used(clock):
+    cache = ResultSetCache(ttl=60, max_size=2)
+    first = cache.put(result_set())
+    second = cache.put(result_set())
+    cache.get(first)  # Paging keeps a set alive
+    third = cache.put(result_set())
+
+    assert cache.get(second) is None
+    assert cache.get(first) is not None and cache.get(third) is not None
+
+
+def test_render_first_page():
+    text, markup = render_page(result_set(20), page=0, page_size=8, token='tok')
+
+    assert "Total: 20 matches · page 1/3" in text
+    assert "match 0" in text and "match 7" in text and "match 8" not in text
+    # Section headers where the section changes
+    assert text.index("<b>Results</b>") < text.index("match 0") < text.index("<b>Upcoming</b>") < text.index("match 5")
+    assert buttons(markup) == ['page:tok:1:0', 'page:tok:0:0', 'page:tok:0:1', 'page:tok:0:2']
+
+
+def test_render_middle_and_last_page():
+    _, markup = render_page(result_set(20), page=1, page_size=8, token='tok')
+    assert buttons(markup)[:2] == ['page:tok:0:0', 'page:tok:2:0']
+
+    text, markup = render_page(result_set(20), page=2, page_size=8, token='tok')
+    assert "page 3/3" in text and "match 19" in text
+    assert buttons(markup)[0] == 'page:tok:1:0'
+
+
+def test_page_out_of_range_is_clamped():
+    text, _ = render_page(result_set(20), page=99, page_size=8)
+    assert "page 3/3" in text
+
+
+def test_star_filter():
+    text, markup = render_page(result_set(20), min_stars=2, page_size=8, token='tok')
+
+    assert "Total: 6 matches, 2+ stars" in text
+    assert "match 2" in text and "match 3" not in text
+    assert 'page:tok:0:0' in buttons(markup)
+
+
+def test_empty_filter_keeps_filter_buttons():
+    rs = ResultSet("<b>Today</b>", [(0, "Upcoming", "a"), (1, "Upcoming", "b")], "No matches today.")
+    text, markup = render_page(rs, min_stars=2, token='tok')
+
+    assert text == "No matches with 2+ stars."
+    assert buttons(markup) == ['page:tok:0:0', 'page:tok:0:1']
+
+
+def test_empty_set_and_no_buttons_without_token():
+    rs = ResultSet("<b>Today</b>", [], "No matches today.")
+    assert render_page(rs, token='tok', footer="\nfooter") == ("No matches today.\nfooter", None)
+
+    _, markup = render_page(result_set(20))
+    assert markup is None
+
+
+def test_single_page_has_no_navigation():
+    rs = ResultSet("<b>Today</b>", [(1, "Upcoming", "a")], "No matches today.")
+    text, markup = render_page(rs, token='tok')
+
+    assert "page" not in text
+    assert markup is None  # One rating only: no filters either
+
+
+def test_parse_callback():
+    assert parse_callback('page:tok:2:1') == ('tok', 2, 1)
+    assert parse_callback('page:tok:x:1') is None
+    assert parse_callback('other:data') is None
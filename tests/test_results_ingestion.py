@@ -0,0 +1,118 @@
+import pytest
+
+import hltv_scraper
+from hltv_scraper import HLTVScraper, Match
+
+PAGE_SIZE = 3
+
+
+def result(match_id: int) -> Match:
+    return Match(str(match_id), "Team A", "Team B", "Event", None, 1, "2 - 1", 'finished')
+
+
+class FakeResults:
+    """/results?offset= pages over a newest-first list of match IDs"""
+
+    def __init__(self, ids, fail_at=None):
+        self.ids = list(ids)
+        self.fail_at = fail_at  # Offset whose fetch fails
+        self.offsets = []
+
+    def fetch(self, offset):
+        self.offsets.append(offset)
+        if offset == self.fail_at:
+            return None
+        return [result(i) for i in self.ids[offset:offset + PAGE_SIZE]]
+
+
+@pytest.fixture
+def scraper(db, monkeypatch):
+    monkeypatch.setattr(hltv_scraper, 'RESULTS_PAGE_SIZE', PAGE_SIZE)
+    scraper = HLTVScraper()
+    scraper.set_database(db)
+    return scraper
+
+
+def ingest(scraper, site: FakeResults, max_pages: int = 10):
+    scraper._fetch_results_page_uncoalesced = site.fetch
+    results = scraper.get_new_results(max_pages)
+    if results:
+        scraper.db.mark_results_seen(r.match_id for r in results)
+    return None if results is None else [int(r.match_id) for r in results]
+
+
+def test_first_run_only_fetches_the_first_page(scraper):
+    site = FakeResults(range(100, 80, -1))
+    assert ingest(scraper, site) == [100, 99, 98]
+    assert site.offsets == [0]
+
+
+def test_pages_until_the_first_known_result(scraper):
+    ingest(scraper, FakeResults([95, 94, 93]))
+
+    site = FakeResults([101, 100, 99, 98, 97, 96, 95, 94, 93])
+    assert ingest(scraper, site) == [101, 100, 99, 98, 97, 96]
+    # 95 is on the third page - no fourth page is fetched
+    assert site.offsets == [0, 3, 6]
+
+
+def test_nothing_new_fetches_one_page(scraper):
+    ingest(scraper, FakeResults([95, 94, 93]))
+
+    site = FakeResults([95, 94, 93, 92])
+    assert ingest(scraper, site) == []
+    assert site.offsets == [0]
+
+
+def test_short_page_ends_paging(scraper):
+    ingest(scraper, FakeResults([90]))
+
+    site = FakeResults([103, 102, 101, 100])
+    assert ingest(scraper, site) == [103, 102, 101, 100]
+    assert site.offsets == [0, 3]
+
+
+def test_failed_page_returns_nothing_and_keeps_the_mark(scraper):
+    ingest(scraper, FakeResults([95, 94, 93]))
+
+    site = FakeResults([101, 100, 99, 98, 97, 96, 95], fail_at=3)
+    assert ingest(scraper, site) is None
+    assert not scraper.db.get_seen_result_ids(['101', '100', '99'])
+
+    # Next cycle picks up everything
+    assert ingest(scraper, FakeResults(site.ids)) == [101, 100, 99, 98, 97, 96]
+
+
+def test_result_shifting_to_the_next_page_is_not_duplicated(scraper):
+    ingest(scraper, FakeResults([95, 94, 93]))
+
+    class ShiftingResults(FakeResults):
+        def fetch(self, offset):
+            page = super().fetch(offset)
+            if offset == 0:
+                self.ids.insert(0, 102)  # A new result arrives while paging
+            return page
+
+    site = ShiftingResults([101, 100, 99, 98, 95])
+    assert ingest(scraper, site) == [101, 100, 99, 98]
+
+
+def test_page_limit_returns_what_was_found(scraper):
+    ingest(scraper, FakeResults([50]))
+
+    site = FakeResults(range(120, 60, -1))
+    assert ingest(scraper, site, max_pages=2) == [120, 119, 118, 117, 116, 115]
+    assert site.offsets == [0, 3]
+
+
+def test_without_database_nothing_is_ingested():
+    assert HLTVScraper().get_new_results() is None
+
+
+def test_snapshot_frontend_never_requests_hltv(db, monkeypatch):
+    from snapshots import SnapshotScraper
+
+    frontend = SnapshotScraper(db)
+    monkeypatch.setattr(frontend, '_rate_limit', lambda: None)
+    monkeypatch.setattr(frontend.session, 'get', lambda *args, **kwargs: pytest.fail("requested HLTV"))
+    assert frontend.get_new_results() is None
@@ -0,0 +1,17 @@
+import asyncio
+from datetime import datetime, timedelta
+
+from config import IDLE_POLL_MINUTES
+
+
+def test_first_result_check_runs_soon_after_startup(telegram_bot):
+    async def start():
+        telegram_bot.scheduler.start(paused=True)
+        try:
+            return telegram_bot.scheduler.get_job('check_results').next_run_time
+        finally:
+            telegram_bot.scheduler.shutdown(wait=False)
+
+    next_run = asyncio.run(start())
+    assert telegram_bot.worker.poll_minutes == IDLE_POLL_MINUTES
+    assert next_run - datetime.now(next_run.tzinfo) < timedelta(minutes=1)
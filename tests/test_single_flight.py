@@ -0,0 +1,117 @@
+import threading
+import time
+
+import pytest
+
+from hltv_scraper import SingleFlight
+
+
+def run_concurrently(n: int, fn):
+    """Start n threads calling fn() and collect their results or exceptions"""
+    outcomes = [None] * n
+
+    def call(i):
+        try:
+            outcomes[i] = ('ok', fn())
+        except Exception as e:
+            outcomes[i] = ('error', e)
+
+    threads = [threading.Thread(target=call, args=(i,)) for i in range(n)]
+    for thread in threads:
+        thread.start()
+    return threads, outcomes
+
+
+def test_concurrent_callers_share_one_execution():
+    flight = SingleFlight()
+    release = threading.Event()
+    calls = []
+
+    def fetch():
+        calls.append(1)
+        release.wait(5)
+        return ['match']
+
+    threads, outcomes = run_concurrently(5, lambda: flight.do('matches', fetch))
+    deadline = time.monotonic() + 5
+    while sum(flight.coalesced.values()) < 4 and time.monotonic() < deadline:
+        time.sleep(0.01)
+    release.set()
+    for thread in threads:
+        thread.join()
+
+    assert len(calls) == 1
+    assert outcomes == [('ok', ['match'])] * 5
+    assert flight.executed['matches'] == 1 and flight.coalesced['matches'] == 4
+
+
+def test_error_reaches_every_waiting_caller():
+    flight = SingleFlight()
+    started = threading.Event()
+    release = threading.Event()
+
+    def fetch():
+        started.set()
+        release.wait(5)
+        raise ConnectionError("HLTV down")
+
+    leader, = run_concurrently(1, lambda: flight.do('results:0', fetch))[0]
+    started.wait(5)
+    threads, outcomes = run_concurrently(3, lambda: flight.do('results:0', fetch))
+    deadline = time.monotonic() + 5
+    while flight.coalesced['results'] < 3 and time.monotonic() < deadline:
+        time.sleep(0.01)
+    release.set()
+    for thread in threads + [leader]:
+        thread.join()
+
+    assert all(kind == 'error' and isinstance(e, ConnectionError) for kind, e in outcomes)
+    assert flight.executed['results'] == 1
+
+
+def test_sequential_calls_run_again():
+    flight = SingleFlight()
+    values = iter([1, 2])
+
+    assert flight.do('rankings', lambda: next(values)) == 1
+    assert flight.do('rankings', lambda: next(values)) == 2
+    assert flight.executed['rankings'] == 2 and flight.coalesced['rankings'] == 0
+    assert not flight.in_flight('rankings')
+
+
+def test_failed_call_is_not_cached():
+    flight = SingleFlight()
+
+    def fail():
+        raise ValueError("empty page")
+
+    with pytest.raises(ValueError):
+        flight.do('matches', fail)
+    assert flight.do('matches', lambda: 'ok') == 'ok'
+
+
+def test_different_keys_run_independently():
+    flight = SingleFlight()
+    release = threading.Event()
+    started = []
+
+    def fetch(key):
+        started.append(key)
+        release.wait(5)
+        return key
+
+    threads = [threading.Thread(target=flight.do, args=(key, lambda key=key: fetch(key)))
+               for key in ('results:0', 'results:100')]
+    for thread in threads:
+        thread.start()
+    deadline = time.monotonic() + 5
+    while len(started) < 2 and time.monotonic() < deadline:
+        time.sleep(0.01)
+    assert flight.in_flight('results:0') and flight.in_flight('results:100')
+    release.set()
+    for thread in threads:
+        thread.join()
+
+    # Per resource: both pages count as executed results fetches
+    assert sorted(started) == ['results:0', 'results:100']
+    assert flight.executed['results'] == 2 and flight.coalesced['results'] == 0
@@ -0,0 +1,42 @@
+from bot import split_message
+
+
+def test_everything_fits_into_one_message():
+    assert split_message("Header\n\n", ["a", "b", "c"]) == [("Header\n\na\n\nb\n\nc", 3)]
+
+
+def test_no_parts_no_messages():
+    assert split_message("Header\n\n", []) == []
+
+
+def test_splits_only_at_the_limit():
+    parts = ["x" * 10] * 5
+    messages = split_message("H:", parts, separator="|", limit=35)
+
+    assert [count for _, count in messages] == [3, 2]
+    for text, _ in messages:
+        assert len(text) <= 35
+        assert text.startswith("H:")
+    assert messages[0][0] == "H:" + "|".join(["x" * 10] * 3)
+
+
+def test_parts_are_never_split_or_lost():
+    parts = [f"part {i} " + "y" * (i * 7 % 50) for i in range(40)]
+    messages = split_message("Results\n", parts, limit=200)
+
+    rejoined = [part for text, _ in messages for part in text[len("Results\n"):].split("\n\n")]
+    assert rejoined == parts
+    assert sum(count for _, count in messages) == len(parts)
+
+
+def test_message_exactly_at_the_limit_is_not_split():
+    messages = split_message("H", ["a" * 4, "b" * 4], separator="-", limit=10)
+    assert messages == [("Haaaa-bbbb", 2)]
+
+
+def test_oversized_part_is_truncated_to_fit():
+    messages = split_message("H:", ["short", "z" * 100, "tail"], limit=20)
+
+    assert [count for _, count in messages] == [1, 1, 1]
+    assert messages[1][0] == "H:" + "z" * 18
+    assert all(len(text) <= 20 for text, _ in messages)
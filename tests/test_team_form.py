@@ -0,0 +1,125 @@
+import random
+import sqlite3
+
+from config import FORM_LENGTH
+from database import Database
+
+
+def result(match_id: int, team1: str, team2: str, score: str, played_at: float) -> dict:
+    return {'match_id': str(match_id), 'team1': team1, 'team2': team2, 'event': "Event", 'time': played_at,
+            'score': score, 'stars': 1, 'match_url': f"/matches/{match_id}/x"}
+
+
+def season(n: int = 60, seed: int = 3) -> list:
+    """n results between a few teams in order of play, mixed bo3/bo1 scores and a forfeit"""
+    rng = random.Random(seed)
+    teams = ['Vitality', 'FaZe', 'G2', 'MOUZ', 'Spirit']
+    results = []
+    for i in range(n):
+        team1, team2 = rng.sample(teams, 2)
+        score = rng.choice(['2-0', '2-1', '1-2', '0-2', '16-14', '13-16', '1-1', 'FF'])
+        results.append(result(1000 + i, team1, team2, score, 1700000000 + i * 3600))
+    return results
+
+
+def forms(db: Database) -> dict:
+    with sqlite3.connect(db.db_path) as conn:
+        return {row[0]: row[1:] for row in conn.execute('SELECT * FROM team_form ORDER BY team')}
+
+
+def rebuilt(db: Database) -> dict:
+    """team_form recomputed from the whole archive, as after the migration"""
+    with sqlite3.connect(db.db_path) as conn:
+        conn.execute('DROP TABLE team_form')
+    return forms(Database(db.db_path))
+
+
+def test_counts_wins_losses_and_maps(db):
+    db.archive_results([
+        result(1, 'Vitality', 'FaZe', '2-1', 100),
+        result(2, 'FaZe', 'Vitality', '16-14', 200),  # bo1 in rounds: one map
+        result(3, 'Vitality', 'G2', '1-1', 300),
+        result(4, 'Vitality', 'G2', 'FF', 400),  # No score - not counted
+    ])
+
+    vitality = db.get_team_form('Vitality')
+    assert (vitality['wins'], vitality['losses'], vitality['draws']) == (1, 1, 1)
+    assert (vitality['maps_won'], vitality['maps_lost']) == (3, 3)
+    assert vitality['recent'] == 'DLW'  # Newest first
+    assert vitality['last_played_at'] == 300
+
+    faze = db.get_team_form('faze')
+    assert (faze['wins'], faze['losses'], faze['maps_won'], faze['maps_lost']) == (1, 1, 2, 2)
+
+
+def test_recent_form_is_capped(db):
+    db.archive_results(result(i, 'Vitality', 'FaZe', '2-0' if i % 2 else '0-2', i * 10) for i in range(1, 10))
+    assert db.get_team_form('Vitality')['recent'] == 'WLWLWLWLW'[:FORM_LENGTH]
+
+
+def test_archiving_twice_counts_once(db):
+    results = season(10)
+    assert db.archive_results(results)
+    before = forms(db)
+
+    assert db.archive_results(results[3:7])  # E.g. overlapping pages
+    assert db.archive_results([results[0], results[0]])
+    assert forms(db) == before
+
+
+def test_incremental_batches_match_a_full_rebuild(db):
+    results = season()
+    for i in range(0, len(results), 7):
+        db.archive_results(results[i:i + 7])
+    incremental = forms(db)
+
+    assert incremental == rebuilt(db)
+
+
+def test_backfilled_results_only_fill_a_short_form(db):
+    db.archive_results([result(i, 'Vitality', 'FaZe', '2-0', 1000 + i) for i in range(FORM_LENGTH)])
+    db.archive_results([result(99, 'Vitality', 'FaZe', '0-2', 10)])  # Played long before
+
+    vitality = db.get_team_form('Vitality')
+    assert vitality['recent'] == 'W' * FORM_LENGTH
+    assert vitality['losses'] == 1
+    assert vitality['last_played_at'] == 1000 + FORM_LENGTH - 1
+
+    # A team with a short form gets the older result appended
+    db.archive_results([result(100, 'G2', 'MOUZ', '2-0', 5000), result(101, 'G2', 'MOUZ', '0-2', 4000)])
+    db.archive_results([result(102, 'G2', 'MOUZ', '1-1', 3000)])
+    assert db.get_team_form('G2')['recent'] == 'WLD'
+
+
+def test_ranked_opponents(db):
+    db.update_team_rankings(['Vitality', 'FaZe'])
+    db.archive_results([
+        result(1, 'G2', 'Vitality', '2-0', 100),
+        result(2, 'G2', 'FaZe', '0-2', 200),
+        result(3, 'G2', 'MOUZ', '2-0', 300),
+    ])
+
+    g2 = db.get_team_form('G2')
+    assert (g2['ranked_wins'], g2['ranked_matches']) == (1, 2)
+    assert db.get_team_forms()['g2'] == 'WLW'
+
+
+def test_backfilled_batch_is_appended_newest_first(db):
+    db.archive_results([result(3, 'Vitality', 'FaZe', '2-0', 300)])
+    db.archive_results([result(1, 'Vitality', 'FaZe', '0-2', 100), result(2, 'Vitality', 'FaZe', '1-1', 200)])
+
+    assert db.get_team_form('Vitality')['recent'] == 'WDL'
+    assert db.get_team_form('FaZe')['recent'] == 'LDW'
+
+
+def test_batch_with_newer_and_older_results(db):
+    db.archive_results([result(5, 'Vitality', 'FaZe', '2-0', 500)])
+    db.archive_results([
+        result(7, 'Vitality', 'G2', '0-2', 700),
+        result(2, 'Vitality', 'G2', '1-1', 200),
+        result(6, 'Vitality', 'G2', '2-1', 600),
+        result(3, 'Vitality', 'G2', '0-2', 300),
+    ])
+
+    # Newest first: 700 L, 600 W, 500 W, 300 L, 200 D
+    assert db.get_team_form('Vitality')['recent'] == 'LWWLD'[:FORM_LENGTH]
@@ -0,0 +1,239 @@
+import contextvars
+import functools
+import json
+import logging
+import os
+import random
+import threading
+import time
+from contextlib import contextmanager
+from typing import Optional
+
+from config import TRACE_SAMPLE_RATE, TRACE_FILE, TRACE_FILE_MAX_BYTES
+
+logger = logging.getLogger(__name__)
+
+# Innermost open span of the current task/thread (asyncio.to_thread copies it along)
+_current_span: contextvars.ContextVar[Optional['Span']] = contextvars.ContextVar('current_span', default=None)
+
+
+class Span:
+    """One timed operation within a trace"""
+    __slots__ = ('trace_id', 'span_id', 'parent_id', 'name', 'attributes', 'sampled',
+                 'start', '_start_perf', 'duration_ms', 'error')
+
+    def __init__(self, name: str, trace_id: str, parent_id: Optional[str], sampled: bool, attributes: dict):
+        self.trace_id = trace_id
+        self.span_id = f"{random.getrandbits(64):016x}"
+        self.parent_id = parent_id
+        self.name = name
+        self.attributes = attributes
+        self.sampled = sampled
+        self.start = time.time()
+        self._start_perf = time.perf_counter()
+        self.duration_ms = None
+        self.error = None
+
+    def set(self, key: str, value):
+        """Add an attribute, e.g. the HTTP status once it is known"""
+        self.attributes[key] = value
+
+    def to_dict(self) -> dict:
+        return {
+            'trace_id': self.trace_id,
+            'span_id': self.span_id,
+            'parent_id': self.parent_id,
+            'name': self.name,
+            'start': self.start,
+            'duration_ms': self.duration_ms,
+            'thread': threading.current_thread().name,
+            'attributes': self.attributes,
+            'error': self.error,
+        }
+
+
+class _NoopSpan:
+    """Stands in for spans that are not recorded"""
+    sampled = False
+
+    def set(self, key: str, value):
+        pass
+
+
+NOOP_SPAN = _NoopSpan()
+# Active in traces that were not sampled, so nested trace() calls don't start new ones
+_UNSAMPLED = Span('unsampled', '0' * 32, None, False, {})
+
+
+class JsonlExporter:
+    """Appends finished spans as JSON lines to a file, rotating it at max_bytes"""
+
+    def __init__(self, path: str, max_bytes: int):
+        self.path = path
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+
+    def export(self, span: Span):
+        line = json.dumps(span.to_dict(), default=str) + '\n'
+        with self._lock:
+            try:
+                if os.path.exists(self.path) and os.path.getsize(self.path) >= self.max_bytes:
+                    os.replace(self.path, self.path + '.1')
+                with open(self.path, 'a', encoding='utf-8') as f:
+                    f.write(line)
+            except OSError as e:
+                logger.error(f"Error writing trace to {self.path}: {e}")
+
+
+_exporter = JsonlExporter(TRACE_FILE, TRACE_FILE_MAX_BYTES)
+
+
+def set_exporter(exporter):
+    """Replace the exporter (anything with export(span), e.g. a collector client)"""
+    global _exporter
+    _exporter = exporter
+
+
+@contextmanager
+def _record(span: Span):
+    token = _current_span.set(span)
+    try:
+        yield span
+    except BaseException as e:
+        span.error = f"{type(e).__name__}: {e}"
+        raise
+    finally:
+        _current_span.reset(token)
+        span.duration_ms = round((time.perf_counter() - span._start_perf) * 1000, 3)
+        if span.sampled:
+            _exporter.export(span)
+
+
+@contextmanager
+def trace(name: str, **attributes):
+    """Span that starts a new trace if none is active (handlers, jobs)
+
+    Whether a new trace is recorded is decided once, at its root, with
+    probability TRACE_SAMPLE_RATE; all of its spans follow that decision.
+    """
+    if TRACE_SAMPLE_RATE <= 0:
+        yield NOOP_SPAN
+        return
+
+    parent = _current_span.get()
+    if parent is not None:
+        with span(name, **attributes) as child:
+            yield child
+        return
+
+    if random.random() >= TRACE_SAMPLE_RATE:
+        token = _current_span.set(_UNSAMPLED)
+        try:
+            yield NOOP_SPAN
+        finally:
+            _current_span.reset(token)
+        return
+
+    root = Span(name, f"{random.getrandbits(128):032x}", None, True, attributes)
+    with _record(root) as recorded:
+        yield recorded
+
+
+@contextmanager
+def span(name: str, **attributes):
+    """Child span of the active trace - does nothing outside of a sampled trace"""
+    parent = _current_span.get()
+    if parent is None or not parent.sampled:
+        yield NOOP_SPAN
+        return
+
+    child = Span(name, parent.trace_id, parent.span_id, True, attributes)
+    with _record(child) as recorded:
+        yield recorded
+
+
+def traced(name: Optional[str] = None, root: bool = False):
+    """Decorator running a function (sync or async) in a span
+
+    Args:
+        name: Span name, defaults to the function's qualified name
+        root: Start a new trace when none is active (see trace)
+    """
+    import inspect  # Only needed by modules that decorate, keeps `import database` cheap
+
+    def decorator(fn):
+        span_name = name or fn.__qualname__
+        context = trace if root else span
+
+        if inspect.iscoroutinefunction(fn):
+            @functools.wraps(fn)
+            async def async_wrapper(*args, **kwargs):
+                with context(span_name):
+                    return await fn(*args, **kwargs)
+            return async_wrapper
+
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            with context(span_name):
+                return fn(*args, **kwargs)
+        return wrapper
+
+    return decorator
+
+
+def format_trace(spans: list) -> str:
+    """Render the spans of one trace as an indented tree"""
+    children = {}
+    for s in spans:
+        children.setdefault(s['parent_id'], []).append(s)
+
+    lines = []
+
+    def walk(parent_id, depth):
+        for s in sorted(children.get(parent_id, []), key=lambda s: s['start']):
+            attributes = ' '.join(f"{k}={v}" for k, v in s['attributes'].items() if k != 'sql')
+            error = f" ERROR {s['error']}" if s['error'] else ''
+            lines.append(f"{'  ' * depth}{s['name']} {s['duration_ms']:.1f}ms {attributes}{error}".rstrip())
+            walk(s['span_id'], depth + 1)
+
+    known = {s['span_id'] for s in spans}
+    # Roots, plus spans whose parent got lost (e.g. in a rotated file)
+    for parent_id in [None] + sorted({s['parent_id'] for s in spans if s['parent_id'] and s['parent_id'] not in known}):
+        walk(parent_id, 0)
+    return '\n'.join(lines)
+
+
+def main():
+    """Show the slowest recorded traces: python tracing.py [--min-ms 1000] [--limit 5] [--trace ID]"""
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Show recorded traces")
+    parser.add_argument('--file', default=TRACE_FILE)
+    parser.add_argument('--min-ms', type=float, default=0, help='only traces whose root took at least this long')
+    parser.add_argument('--limit', type=int, default=5, help='number of traces to show, slowest first')
+    parser.add_argument('--trace', help='show a single trace ID')
+    args = parser.parse_args()
+
+    traces = {}
+    with open(args.file, encoding='utf-8') as f:
+        for line in f:
+            s = json.loads(line)
+            traces.setdefault(s['trace_id'], []).append(s)
+
+    if args.trace:
+        selected = [traces.get(args.trace, [])]
+    else:
+        roots = [(next((s for s in spans if s['parent_id'] is None), None), spans) for spans in traces.values()]
+        roots = [(root, spans) for root, spans in roots if root and root['duration_ms'] >= args.min_ms]
+        roots.sort(key=lambda item: item[0]['duration_ms'], reverse=True)
+        selected = [spans for _, spans in roots[:args.limit]]
+
+    for spans in selected:
+        if spans:
+            print(f"trace {spans[0]['trace_id']}")
+            print(format_trace(spans))
+            print()
+
+
+if __name__ == '__main__':
+    main()